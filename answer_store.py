@@ -0,0 +1,349 @@
+"""
+Precomputed answers for the questions people ask most.
+
+An offline job asks the LLM once per canonical question in the catalogue
+(knowledge/questions.json) and writes the answers to a sqlite file. The
+running app loads that file into memory and answers matching questions
+before any LLM call. Run from the repository root:
+
+    python answer_store.py refresh [--all] [--max-age DAYS] [--workers N]
+    python answer_store.py report [--queries FILE]
+
+refresh (re)generates answers that are missing, older than --max-age, or
+built with another model or knowledge base version; --all regenerates
+everything. report shows the store's coverage and, given a file of past
+questions (one per line, or JSON lines with a "message" field), the share
+of them the store would have answered.
+"""
+
+import argparse
+import difflib
+import json
+import logging
+import os
+import sqlite3
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Set
+
+import config
+from concurrency import PartialAnswer
+from knowledge_base import KnowledgeBase
+from response_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS answers (id TEXT PRIMARY KEY, method TEXT NOT NULL, subject TEXT NOT NULL, "
+    "answer TEXT NOT NULL, model TEXT NOT NULL, knowledge_version TEXT, created REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS questions (key TEXT PRIMARY KEY, question TEXT NOT NULL, answer_id TEXT NOT NULL)",
+)
+
+# Shortest unknown word that is checked for a typo of a known one
+MIN_TYPO_LENGTH = 5
+
+
+class AnswerStore:
+    """
+    Question -> precomputed answer lookup, held in memory.
+
+    Questions are matched on their normalize_query() key. On a miss, words
+    the store does not know are corrected to a close known word ("dengu" ->
+    "dengue") and the stored question with the highest word overlap
+    (Jaccard) above min_similarity wins. A stored question must contain
+    every known word of the query, so "malaria and dengue" is never given
+    the dengue answer; unknown extra words only lower the overlap. Terms
+    after a relation word are distinct words in the key (see
+    normalize_query), so "can kidney disease cause diabetes" never gets the
+    answer about diabetes causing kidney disease.
+    """
+
+    def __init__(self, path: Optional[str] = None, min_similarity: float = 0.75):
+        self.path = path
+        self.min_similarity = min_similarity
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._answers: Dict[str, Dict[str, Any]] = {}
+        self._questions: Dict[str, str] = {}
+        self._index: Dict[str, Set[str]] = {}
+        self._vocabulary: List[str] = []
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        """(Re)load every answer and question from the sqlite file"""
+        try:
+            with closing(sqlite3.connect(self.path)) as db:
+                answers = {
+                    row[0]: {
+                        "id": row[0], "method": row[1], "subject": row[2], "answer": row[3],
+                        "model": row[4], "knowledge_version": row[5], "created": row[6],
+                    }
+                    for row in db.execute(
+                        "SELECT id, method, subject, answer, model, knowledge_version, created FROM answers"
+                    )
+                }
+                questions = {
+                    key: answer_id
+                    for key, answer_id in db.execute("SELECT key, answer_id FROM questions")
+                    if answer_id in answers
+                }
+        except sqlite3.Error as e:
+            logger.error(f"Could not load precomputed answers from {self.path}: {e}")
+            return
+
+        index: Dict[str, Set[str]] = {}
+        for key in questions:
+            for word in key.split():
+                index.setdefault(word, set()).add(key)
+        with self._lock:
+            self._answers = answers
+            self._questions = questions
+            self._index = index
+            self._vocabulary = sorted(index)
+        logger.info(f"Loaded {len(answers)} precomputed answers for {len(questions)} questions from {self.path}")
+
+    def lookup(self, query: str) -> Optional[str]:
+        """Return the precomputed answer for query, or None"""
+        key = normalize_query(query)
+        answer_id = self._questions.get(key)
+        if answer_id is None and key:
+            answer_id = self._closest_question(key)
+        with self._lock:
+            if answer_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return self._answers[answer_id]["answer"]
+
+    def _closest_question(self, key: str) -> Optional[str]:
+        words = set()
+        for word in key.split():
+            if word not in self._index and len(word) >= MIN_TYPO_LENGTH:
+                close = difflib.get_close_matches(word, self._vocabulary, n=1, cutoff=0.8)
+                word = close[0] if close else word
+            words.add(word)
+
+        known = [word for word in words if word in self._index]
+        if not known:
+            return None
+        candidates = set.intersection(*(self._index[word] for word in known))
+
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            candidate_words = set(candidate.split())
+            score = len(words & candidate_words) / len(words | candidate_words)
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is None or best_score < self.min_similarity:
+            return None
+        return self._questions[best]
+
+    def answers(self) -> List[Dict[str, Any]]:
+        return list(self._answers.values())
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "answers": len(self._answers),
+            "questions": len(self._questions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def load_catalogue(path: str, knowledge: KnowledgeBase) -> List[Dict[str, Any]]:
+    """
+    Expand the catalogue file into entries of id, method, subject and
+    questions; the answer for an entry is getattr(service, method)(subject).
+    """
+    with open(path, encoding="utf-8") as f:
+        catalogue = json.load(f)
+
+    entries = []
+    for kind, templates in catalogue.get("templates", {}).items():
+        for item in knowledge.entries:
+            if item["kind"] != kind:
+                continue
+            names = [item["name"]] + item.get("aliases", [])
+            for template in templates:
+                entries.append({
+                    "method": template["method"],
+                    "subject": template["subject"].format(name=item["name"]),
+                    "questions": [q.format(name=name) for q in template["questions"] for name in names],
+                })
+    entries.extend(dict(entry) for entry in catalogue.get("questions", []))
+
+    for entry in entries:
+        entry["id"] = f"{entry['method']}:{entry['subject']}"
+    return entries
+
+
+def is_stale(answer: Optional[Dict[str, Any]], model: str, knowledge_version: str,
+             max_age: Optional[float] = None) -> bool:
+    """Whether a stored answer needs regenerating; max_age is in seconds"""
+    if answer is None:
+        return True
+    if answer["model"] != model or answer["knowledge_version"] != knowledge_version:
+        return True
+    return max_age is not None and time.time() - answer["created"] > max_age
+
+
+def refresh(path: str, catalogue: List[Dict[str, Any]], service, force: bool = False,
+            max_age: Optional[float] = None, workers: int = 1) -> Dict[str, int]:
+    """
+    Generate the answers the store is missing (or all with force) and
+    rewrite its question index from the catalogue.
+
+    service is a LlamaService that does not itself read the store.
+    """
+    store = AnswerStore(path)
+    knowledge_version = service.knowledge.version if service.knowledge is not None else None
+    stored = {answer["id"]: answer for answer in store.answers()}
+    todo = [
+        entry for entry in catalogue
+        if force or is_stale(stored.get(entry["id"]), service.model_name, knowledge_version, max_age)
+    ]
+    counts = {"generated": 0, "failed": 0, "kept": len(catalogue) - len(todo)}
+    logger.info(f"Refreshing {len(todo)} of {len(catalogue)} precomputed answers")
+
+    def generate(entry):
+        try:
+            return entry, getattr(service, entry["method"])(entry["subject"])
+        except PartialAnswer as e:
+            logger.warning(f"{e} for {entry['id']}, keeping the old answer")
+            return entry, None
+
+    with closing(sqlite3.connect(path)) as db:
+        for statement in SCHEMA:
+            db.execute(statement)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for done, (entry, answer) in enumerate(executor.map(generate, todo), 1):
+                if not answer:
+                    counts["failed"] += 1
+                    logger.warning(f"[{done}/{len(todo)}] No answer for {entry['id']}")
+                    continue
+                db.execute(
+                    "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (entry["id"], entry["method"], entry["subject"], answer, service.model_name,
+                     knowledge_version, time.time()),
+                )
+                db.commit()
+                counts["generated"] += 1
+                logger.info(f"[{done}/{len(todo)}] {entry['id']}")
+
+        # The catalogue is the source of truth for which questions map where;
+        # the first entry claiming a normalized question keeps it
+        catalogue_ids = [entry["id"] for entry in catalogue]
+        db.execute(
+            f"DELETE FROM answers WHERE id NOT IN ({','.join('?' * len(catalogue_ids))})", catalogue_ids
+        )
+        db.execute("DELETE FROM questions")
+        for entry in catalogue:
+            for question in entry["questions"]:
+                db.execute(
+                    "INSERT OR IGNORE INTO questions VALUES (?, ?, ?)",
+                    (normalize_query(question), question, entry["id"]),
+                )
+        db.commit()
+    return counts
+
+
+def read_queries(path: str) -> List[str]:
+    """Questions from a text file, one per line, or JSON lines with a "message" field"""
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("{"):
+                line = json.loads(line).get("message", "")
+            if line:
+                queries.append(line.lower())
+    return queries
+
+
+def report(store: AnswerStore, catalogue: List[Dict[str, Any]], model: str, knowledge_version: str,
+           queries: Optional[List[str]] = None, top: int = 15):
+    answers = {answer["id"]: answer for answer in store.answers()}
+    missing = [entry["id"] for entry in catalogue if entry["id"] not in answers]
+    stale = [
+        answer_id for answer_id, answer in answers.items()
+        if is_stale(answer, model, knowledge_version)
+    ]
+    stats = store.stats()
+    print(f"Answer store {store.path}: {stats['answers']} answers for {stats['questions']} questions")
+    print(f"  catalogue entries: {len(catalogue)}, missing: {len(missing)}, "
+          f"stale (other model or knowledge base version): {len(stale)}")
+    if not queries:
+        return
+
+    misses = Counter()
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        answer = store.lookup(query)
+        timings.append(time.perf_counter() - started)
+        if answer is None:
+            misses[query] += 1
+    hits = len(queries) - sum(misses.values())
+    print(f"Hit rate over {len(queries)} questions: {hits / len(queries):.1%} "
+          f"({hits} hits), median lookup {statistics.median(timings) * 1e6:.1f} us")
+    print("Most frequent misses:")
+    for query, count in misses.most_common(top):
+        print(f"  {count:>5}  {query}")
+
+
+# Global instance; empty until `python answer_store.py refresh` has been run
+answer_store = AnswerStore(config.ANSWER_STORE_PATH, min_similarity=config.ANSWER_STORE_MIN_SIMILARITY)
+
+
+def main():
+    from knowledge_base import knowledge_base
+    from llama_service import GENERATION_BUDGETS, LlamaService, llama_service
+
+    parser = argparse.ArgumentParser(description="Build and inspect the precomputed answer store")
+    parser.add_argument("--path", default=config.ANSWER_STORE_PATH, help="sqlite file of the store")
+    parser.add_argument("--catalogue", default=config.ANSWER_CATALOGUE_PATH, help="canonical questions file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    refresh_parser = commands.add_parser("refresh", help="generate missing and stale answers")
+    refresh_parser.add_argument("--all", action="store_true", help="regenerate every answer")
+    refresh_parser.add_argument("--max-age", type=float, help="also regenerate answers older than this many days")
+    refresh_parser.add_argument("--workers", type=int, default=1,
+                                help="parallel generations (up to the total OLLAMA_NUM_PARALLEL of your hosts)")
+    refresh_parser.add_argument("--deadline", type=float, default=300, help="seconds allowed per answer")
+
+    report_parser = commands.add_parser("report", help="show coverage and the hit rate over past questions")
+    report_parser.add_argument("--queries", help="text or JSON lines file of past questions")
+    args = parser.parse_args()
+
+    catalogue = load_catalogue(args.catalogue, knowledge_base)
+    if args.command == "refresh":
+        # Batch generation has no user waiting: same output caps, longer deadlines
+        budgets = {route: dict(budget, deadline=args.deadline) for route, budget in GENERATION_BUDGETS.items()}
+        service = LlamaService(
+            llama_service.model_name,
+            hosts=config.OLLAMA_HOSTS,
+            keep_alive=config.OLLAMA_KEEP_ALIVE,
+            num_ctx=config.OLLAMA_NUM_CTX,
+            budgets=budgets,
+            knowledge=knowledge_base,
+            knowledge_top_k=config.KNOWLEDGE_TOP_K,
+        )
+        max_age = args.max_age * 86400 if args.max_age is not None else None
+        counts = refresh(args.path, catalogue, service, force=args.all, max_age=max_age, workers=args.workers)
+        service.pool.stop()
+        print(f"Generated {counts['generated']}, failed {counts['failed']}, kept {counts['kept']} answers in {args.path}")
+    else:
+        queries = read_queries(args.queries) if args.queries else None
+        report(AnswerStore(args.path), catalogue, llama_service.model_name, knowledge_base.version, queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,329 +1,676 @@
-from flask import Flask, render_template, request, jsonify
-import json
-from datetime import datetime
-from llama_service import llama_service
-import logging
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-app = Flask(__name__)
-
-# Sample medical knowledge base
-MEDICAL_KB = {
-    "fever": {
-        "symptoms": [
-            "high temperature",
-            "chills",
-            "sweating",
-            "headache",
-            "muscle aches",
-        ],
-        "prevention": [
-            "Stay hydrated",
-            "Get adequate rest",
-            "Maintain good hygiene",
-            "Avoid crowded places",
-        ],
-        "when_to_seek_help": "Seek immediate medical attention if fever exceeds 103°F (39.4°C) or persists for more than 3 days",
-    },
-    "cold": {
-        "symptoms": ["runny nose", "sneezing", "cough", "sore throat", "mild fever"],
-        "prevention": [
-            "Wash hands frequently",
-            "Avoid touching face",
-            "Stay away from sick people",
-            "Get enough sleep",
-        ],
-        "when_to_seek_help": "See a doctor if symptoms worsen after 7-10 days or if you develop high fever",
-    },
-    "diabetes": {
-        "symptoms": [
-            "excessive thirst",
-            "frequent urination",
-            "fatigue",
-            "blurred vision",
-            "slow healing wounds",
-        ],
-        "prevention": [
-            "Maintain healthy weight",
-            "Exercise regularly",
-            "Eat balanced diet",
-            "Limit sugar intake",
-        ],
-        "when_to_seek_help": "Consult doctor immediately if you experience severe symptoms or blood sugar irregularities",
-    },
-    "hypertension": {
-        "symptoms": [
-            "headache",
-            "shortness of breath",
-            "chest pain",
-            "dizziness",
-            "nosebleeds",
-        ],
-        "prevention": [
-            "Reduce salt intake",
-            "Exercise regularly",
-            "Maintain healthy weight",
-            "Limit alcohol",
-            "Quit smoking",
-        ],
-        "when_to_seek_help": "Seek immediate help if blood pressure readings are consistently above 140/90 mmHg",
-    },
-}
-
-# Vaccination schedule data
-VACCINATION_SCHEDULE = {
-    "children": {
-        "0-2 months": ["Hepatitis B", "BCG"],
-        "2 months": ["DPT", "Polio", "Hib", "PCV"],
-        "4 months": ["DPT", "Polio", "Hib", "PCV"],
-        "6 months": ["DPT", "Polio", "Hib", "PCV", "Hepatitis B"],
-        "9 months": ["Measles"],
-        "12 months": ["MMR", "Varicella"],
-        "15-18 months": ["DPT", "Polio", "Hib", "PCV"],
-    },
-    "adults": {
-        "annual": ["Influenza"],
-        "every_10_years": ["Tetanus", "Diphtheria"],
-        "one_time": ["Hepatitis A", "Hepatitis B", "HPV (for young adults)"],
-    },
-}
-
-
-@app.route("/")
-def home():
-    return render_template("index.html")
-
-
-@app.route("/chat", methods=["POST"])
-def chat():
-    user_message = request.json.get("message", "").lower()
-
-    # Simple keyword-based response system
-    response = get_medical_response(user_message)
-
-    return jsonify(
-        {"response": response, "timestamp": datetime.now().strftime("%H:%M:%S")}
-    )
-
-
-@app.route("/vaccination-schedule")
-def vaccination_schedule():
-    return jsonify(VACCINATION_SCHEDULE)
-
-
-@app.route("/health-alert")
-def health_alert():
-    # Simulate health alerts (in real implementation, this would connect to government health databases)
-    alerts = [
-        {
-            "type": "outbreak",
-            "disease": "Dengue",
-            "location": "Urban areas",
-            "severity": "medium",
-            "prevention": "Use mosquito repellent, remove stagnant water",
-        },
-        {
-            "type": "vaccination_drive",
-            "vaccine": "COVID-19 Booster",
-            "location": "Community health centers",
-            "dates": "Available throughout the month",
-        },
-    ]
-    return jsonify(alerts)
-
-
-def get_medical_response(message):
-    """Generate AI-powered medical response using Llama 3.2 with intelligent fallback"""
-
-    original_message = message
-
-    # Greetings - Keep simple responses for basic interactions
-    if any(word in message for word in ["hello", "hi", "hey", "namaste"]):
-        return "Hello! I'm your AI-powered health assistant using advanced AI to provide personalized medical information. I can help you with diseases, symptoms, prevention tips, and vaccination schedules. How can I assist you today?"
-
-    # Emergency queries - Always handle these immediately without AI delay
-    if any(
-        word in message
-        for word in ["emergency", "urgent", "severe", "critical", "help me"]
-    ):
-        emergency_response = llama_service.get_emergency_guidance(message)
-        if emergency_response:
-            return emergency_response
-        # Fallback for emergencies
-        return "🚨 **EMERGENCY:** If you're experiencing a medical emergency, please:\n• Call emergency services immediately (108 in India)\n• Go to the nearest hospital\n• Contact your doctor\n\nThis chatbot is for informational purposes only and cannot handle medical emergencies."
-
-    # Try AI-powered response first for medical queries
-    try:
-        # Detect query type and use appropriate AI method
-        # if detect_disease_query(message):
-        #     logger.info(f"Processing disease query: {message}")
-        #     # Extract disease name
-        #     disease_names = extract_disease_names(message)
-        #     if disease_names:
-        #         ai_response = llama_service.get_disease_info(disease_names[0])
-        #         if ai_response:
-        #             return f"🤖 **AI-Powered Response:**\n\n{ai_response}"
-
-        if detect_symptom_query(message):
-            logger.info(f"Processing symptom query: {message}")
-            ai_response = llama_service.analyze_symptoms(message)
-            if ai_response:
-                return f"{ai_response}"
-
-        elif detect_prevention_query(message):
-            logger.info(f"Processing prevention query: {message}")
-            ai_response = llama_service.get_prevention_tips(message)
-            if ai_response:
-                return f"{ai_response}"
-
-        elif "vaccination" in message or "vaccine" in message:
-            # Handle vaccination with AI enhancement
-            ai_response = llama_service.get_medical_response(
-                f"Provide information about vaccination: {message}"
-            )
-            if ai_response:
-                return f"{ai_response}"
-
-        # General medical query - let AI handle it
-        else:
-            logger.info(f"Processing general medical query: {message}")
-            ai_response = llama_service.get_medical_response(message)
-            if ai_response:
-                return f"{ai_response}"
-
-    except Exception as e:
-        logger.error(f"Error in AI processing: {e}")
-
-    # Fallback to static responses if AI is unavailable
-    logger.info("Using fallback static responses")
-    return get_fallback_response(message)
-
-
-# def detect_disease_query(message):
-#     """Detect if message is asking about a specific disease"""
-#     disease_indicators = ['tell me about', 'what is', 'information about', 'about', 'disease', 'condition']
-#     disease_names = list(MEDICAL_KB.keys()) + ['cancer', 'covid', 'malaria', 'tuberculosis', 'asthma', 'migraine']
-
-#     has_disease_indicator = any(indicator in message for indicator in disease_indicators)
-#     has_disease_name = any(disease in message for disease in disease_names)
-
-#     return has_disease_indicator or has_disease_name
-
-
-def detect_symptom_query(message):
-    """Detect if message is describing symptoms"""
-    symptom_indicators = [
-        "i have",
-        "experiencing",
-        "symptoms",
-        "feeling",
-        "pain",
-        "ache",
-        "hurt",
-        "sick",
-    ]
-    common_symptoms = [
-        "headache",
-        "fever",
-        "cough",
-        "cold",
-        "nausea",
-        "vomiting",
-        "diarrhea",
-        "fatigue",
-        "tired",
-    ]
-
-    has_symptom_indicator = any(
-        indicator in message for indicator in symptom_indicators
-    )
-    has_symptom = any(symptom in message for symptom in common_symptoms)
-
-    return has_symptom_indicator or has_symptom
-
-
-def detect_prevention_query(message):
-    """Detect if message is asking about prevention"""
-    prevention_indicators = [
-        "prevent",
-        "prevention",
-        "avoid",
-        "protect",
-        "stay healthy",
-        "tips",
-        "how to",
-    ]
-    return any(indicator in message for indicator in prevention_indicators)
-
-
-def extract_disease_names(message):
-    """Extract disease names from message"""
-    all_diseases = list(MEDICAL_KB.keys()) + [
-        "cancer",
-        "covid",
-        "malaria",
-        "tuberculosis",
-        "asthma",
-        "migraine",
-        "pneumonia",
-        "bronchitis",
-    ]
-    found_diseases = [disease for disease in all_diseases if disease in message]
-    return found_diseases if found_diseases else ["general health condition"]
-
-
-def get_fallback_response(message):
-    """Provide fallback static responses when AI is unavailable"""
-
-    # Vaccination queries
-    if "vaccination" in message or "vaccine" in message:
-        if "child" in message or "baby" in message:
-            return "📋 **Vaccination Information (Static):**\n\nFor children's vaccination schedule:\n• BCG, DPT, Polio at early months\n• Measles, MMR as they grow\n• Consult pediatrician for complete schedule\n\n⚠️ **Note:** AI assistant temporarily unavailable. Consult healthcare provider for detailed information."
-        else:
-            return "📋 **Adult Vaccination (Static):**\n\n• Annual flu shots\n• Tetanus boosters every 10 years\n• Hepatitis vaccines as recommended\n\n⚠️ **Note:** AI assistant temporarily unavailable. Consult healthcare provider for personalized recommendations."
-
-    # Disease-specific queries
-    for disease, info in MEDICAL_KB.items():
-        if disease in message:
-            response = f"📋 **{disease.title()} Information (Static):**\n\n"
-            response += f"**Common Symptoms:** {', '.join(info['symptoms'])}\n\n"
-            response += f"**Prevention Tips:** {', '.join(info['prevention'])}\n\n"
-            response += f"**When to Seek Help:** {info['when_to_seek_help']}\n\n"
-            response += "⚠️ **Note:** AI assistant temporarily unavailable. This is basic information only. Please consult a healthcare professional for proper diagnosis and treatment."
-            return response
-
-    # Symptom queries
-    symptoms_mentioned = []
-    all_symptoms = []
-    for disease, info in MEDICAL_KB.items():
-        all_symptoms.extend([(symptom, disease) for symptom in info["symptoms"]])
-
-    for symptom, disease in all_symptoms:
-        if symptom in message:
-            symptoms_mentioned.append((symptom, disease))
-
-    if symptoms_mentioned:
-        diseases = list(set([disease for _, disease in symptoms_mentioned]))
-        response = f"📋 **Symptom Analysis (Static):**\n\nBased on the symptoms you mentioned, you might be experiencing: {', '.join(diseases)}.\n\n"
-        response += "**General Recommendations:**\n"
-        response += "• Stay hydrated and get adequate rest\n"
-        response += "• Monitor your symptoms\n"
-        response += (
-            "• Consult a healthcare professional if symptoms persist or worsen\n\n"
-        )
-        response += "⚠️ **Important:** This is not a medical diagnosis. AI assistant temporarily unavailable. Please consult a doctor for proper evaluation."
-        return response
-
-    # Prevention queries
-    if "prevent" in message or "prevention" in message:
-        return "📋 **General Prevention Tips (Static):**\n\n• Wash hands frequently\n• Eat a balanced diet\n• Exercise regularly\n• Get adequate sleep\n• Stay hydrated\n• Avoid smoking and limit alcohol\n• Get regular health checkups\n• Follow vaccination schedules\n\n⚠️ **Note:** AI assistant temporarily unavailable. Consult healthcare provider for personalized prevention strategies."
-
-    # Default response
-    return "**Medical Assistant:**\n\nI can help you with information about diseases, symptoms, prevention tips, and vaccination schedules.\n\n**Try asking me about:**\n• Specific diseases (fever, cold, diabetes, hypertension)\n• Symptoms you're experiencing\n• Prevention tips\n• Vaccination schedules\n• Health alerts\n\n⚠️ **Note:** AI-powered responses may be temporarily unavailable. For immediate concerns, consult a healthcare professional.\n\nWhat would you like to know?"
-
-
-if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0", port=5000)
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
+import json
+from datetime import datetime
+from batch import BatchProgress, parse_lines, run_batch
+from compression import DYNAMIC_LEVELS, STREAM_ENCODINGS, compress, compress_stream, compressible, negotiate
+from concurrency import DeadlineExceeded, PartialAnswer
+from intent_matcher import TermMatcher
+from knowledge_base import knowledge_base
+from llama_service import llama_service
+from sessions import new_session_id, session_store, valid_session_id
+from static_payloads import JSONFilePayload, StaticPayload
+import logging
+import time
+import config
+import metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+# UTF-8 rather than \u escapes: emoji and Indic scripts take half the bytes or less
+app.json.ensure_ascii = False
+
+metrics.REGISTRY.register_collector(metrics.stats_collector(
+    "chatbot_response_cache", "Response cache", llama_service.cache.stats, counters=["hits", "misses"]
+))
+metrics.REGISTRY.register_collector(metrics.stats_collector(
+    "chatbot_single_flight", "Coalesced LLM generations", llama_service.single_flight.stats,
+    counters=["generations", "coalesced"],
+))
+metrics.REGISTRY.register_collector(llama_service.pool.collect)
+if llama_service.scheduler is not None:
+    metrics.REGISTRY.register_collector(metrics.stats_collector(
+        "chatbot_llm_scheduler", "LLM slots", llama_service.scheduler.stats, counters=["rejected"]
+    ))
+metrics.REGISTRY.register_collector(metrics.stats_collector(
+    "chatbot_sessions", "Conversation sessions", session_store.stats, counters=["summarized"]
+))
+metrics.REGISTRY.register_collector(metrics.stats_collector(
+    "chatbot_answer_store", "Precomputed answers", llama_service.answers.stats, counters=["hits", "misses"]
+))
+
+metrics.REGISTRY.register_collector(metrics.stats_collector(
+    "chatbot_knowledge_base", "Knowledge base size", knowledge_base.stats
+))
+
+# Medical knowledge base: condition name -> entry (symptoms, prevention,
+# when_to_seek_help, ...), loaded from the files in config.KNOWLEDGE_PATH
+MEDICAL_KB = knowledge_base.conditions
+
+# Vaccination schedule data
+VACCINATION_SCHEDULE = {
+    "children": {
+        "0-2 months": ["Hepatitis B", "BCG"],
+        "2 months": ["DPT", "Polio", "Hib", "PCV"],
+        "4 months": ["DPT", "Polio", "Hib", "PCV"],
+        "6 months": ["DPT", "Polio", "Hib", "PCV", "Hepatitis B"],
+        "9 months": ["Measles"],
+        "12 months": ["MMR", "Varicella"],
+        "15-18 months": ["DPT", "Polio", "Hib", "PCV"],
+    },
+    "adults": {
+        "annual": ["Influenza"],
+        "every_10_years": ["Tetanus", "Diphtheria"],
+        "one_time": ["Hepatitis A", "Hepatitis B", "HPV (for young adults)"],
+    },
+}
+
+# Polled constantly by mobile clients: serialized and compressed once, then
+# served with ETags so unchanged data costs a 304 and no body
+VACCINATION_SCHEDULE_PAYLOAD = StaticPayload(VACCINATION_SCHEDULE, max_age=config.VACCINATION_SCHEDULE_MAX_AGE)
+
+# Health alerts (in a real deployment the file would be fed from government
+# health databases); rebuilt whenever the file changes
+HEALTH_ALERTS = JSONFilePayload(
+    config.HEALTH_ALERTS_PATH,
+    max_age=config.HEALTH_ALERTS_MAX_AGE,
+    check_interval=config.HEALTH_ALERTS_CHECK_INTERVAL,
+)
+metrics.REGISTRY.register_collector(metrics.stats_collector(
+    "chatbot_health_alerts", "Health alerts file", HEALTH_ALERTS.stats, counters=["reloads"]
+))
+
+
+# Keywords used to classify incoming messages
+GREETING_KEYWORDS = ["hello", "hi", "hey", "namaste"]
+EMERGENCY_KEYWORDS = ["emergency", "urgent", "severe", "critical", "help me"]
+SYMPTOM_INDICATORS = [
+    "i have",
+    "experiencing",
+    "symptoms",
+    "feeling",
+    "pain",
+    "ache",
+    "hurt",
+    "sick",
+]
+COMMON_SYMPTOMS = [
+    "headache",
+    "fever",
+    "cough",
+    "cold",
+    "nausea",
+    "vomiting",
+    "diarrhea",
+    "fatigue",
+    "tired",
+]
+PREVENTION_INDICATORS = [
+    "prevent",
+    "prevention",
+    "avoid",
+    "protect",
+    "stay healthy",
+    "tips",
+    "how to",
+]
+VACCINATION_KEYWORDS = ["vaccination", "vaccine"]
+CHILD_KEYWORDS = ["child", "children", "baby"]
+OTHER_DISEASES = [
+    "cancer",
+    "covid",
+    "malaria",
+    "tuberculosis",
+    "asthma",
+    "migraine",
+    "pneumonia",
+    "bronchitis",
+]
+
+# Knowledge-base symptom -> diseases it is listed under
+SYMPTOM_DISEASES = knowledge_base.symptoms
+
+# Categories naming what a message is about; a message with none of them is a
+# follow-up to the conversation (see follow_up_history)
+TOPIC_CATEGORIES = ("emergency", "common_symptom", "kb_disease", "kb_vaccine", "disease", "kb_symptom")
+
+# All keywords compiled once at startup; one scan per message finds every category
+QUERY_MATCHER = TermMatcher(
+    {
+        "greeting": GREETING_KEYWORDS,
+        "emergency": EMERGENCY_KEYWORDS,
+        "symptom_indicator": SYMPTOM_INDICATORS,
+        "common_symptom": COMMON_SYMPTOMS,
+        "prevention": PREVENTION_INDICATORS,
+        "vaccination": VACCINATION_KEYWORDS,
+        "child": CHILD_KEYWORDS,
+        "kb_disease": knowledge_base.condition_terms(),
+        "kb_vaccine": knowledge_base.vaccine_terms(),
+        "disease": knowledge_base.condition_terms() + OTHER_DISEASES,
+        "kb_symptom": SYMPTOM_DISEASES.keys(),
+    },
+    exact_categories=["greeting"],
+)
+
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    # Label by route pattern, not raw path, to keep the number of series bounded
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.HTTP_REQUESTS.inc(route=route, status=response.status_code)
+    metrics.HTTP_SECONDS.observe(time.perf_counter() - g.request_started, route=route)
+    if request.method != "HEAD":
+        encoding = response.headers.get("Content-Encoding", "identity")
+        if response.is_streamed:
+            response.response = counted(response.response, route, encoding)
+        else:
+            metrics.HTTP_RESPONSE_BYTES.inc(response.calculate_content_length() or 0, route=route, encoding=encoding)
+    return response
+
+
+def counted(chunks, route, encoding):
+    """Pass a streamed body through, adding its size to HTTP_RESPONSE_BYTES once it ends"""
+    size = 0
+    try:
+        for chunk in chunks:
+            size += len(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+            yield chunk
+    finally:
+        metrics.HTTP_RESPONSE_BYTES.inc(size, route=route, encoding=encoding)
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+# Registered after record_request so it runs first (Flask calls these hooks in
+# reverse order) and the compressed sizes are what gets counted
+@app.after_request
+def compress_response(response):
+    """gzip/brotli-encode a response the client accepts compressed; streams are compressed chunk by chunk"""
+    if (
+        not config.RESPONSE_COMPRESSION
+        or request.method == "HEAD"
+        or response.status_code in (204, 304)
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or "Accept-Encoding" in response.vary  # negotiated already (static payloads)
+        or not compressible(response.mimetype)
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    accept_encoding = request.environ.get("HTTP_ACCEPT_ENCODING")
+    if response.is_streamed:
+        encoding = negotiate(accept_encoding, STREAM_ENCODINGS)
+        if encoding is None:
+            return response
+        response.response = compress_stream(response.response, encoding)
+    else:
+        encoding = negotiate(accept_encoding)
+        data = response.get_data()
+        if encoding is None or len(data) < config.COMPRESSION_MIN_BYTES:
+            return response
+        response.set_data(compress(data, encoding, DYNAMIC_LEVELS[encoding]))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+@app.route("/")
+def home():
+    return render_template("index.html", fallback_templates=FALLBACK_TEMPLATES)
+
+
+def session_id_from(payload):
+    """The client's session id, or a new one if it sent none (or an invalid one)"""
+    session_id = payload.get("session_id")
+    return session_id if valid_session_id(session_id) else new_session_id()
+
+
+def ndjson(payload):
+    """One line of a newline-delimited JSON response, in its most compact form"""
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+@app.route("/chat", methods=["POST"])
+def chat():
+    user_message = request.json.get("message", "").lower()
+    session_id = session_id_from(request.json)
+    compact = bool(request.json.get("compact"))
+
+    # Simple keyword-based response system
+    response = get_medical_response(user_message, session_store.history(session_id))
+    remember(session_id, user_message, response)
+
+    return jsonify(
+        {
+            **answer_fields(response, compact),
+            "timestamp": datetime.now().strftime("%H:%M:%S"),
+            "session_id": session_id,
+        }
+    )
+
+
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    user_message = request.json.get("message", "").lower()
+    session_id = session_id_from(request.json)
+    compact = bool(request.json.get("compact"))
+    history = session_store.history(session_id)
+
+    def generate():
+        # Newline-delimited JSON: one {"token": ...} line per chunk (a static
+        # answer is a {"template": ..., "params": ...} line for compact
+        # clients), then a final done line
+        chunks = []
+        for chunk in stream_medical_response(user_message, history):
+            chunks.append(chunk)
+            yield ndjson(stream_fields(chunk, compact))
+        remember(session_id, user_message, chunks[0] if len(chunks) == 1 else "".join(chunks))
+        yield ndjson(
+            {
+                "done": True,
+                "timestamp": datetime.now().strftime("%H:%M:%S"),
+                "session_id": session_id,
+            }
+        )
+
+    return Response(
+        generate(),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/chat/batch", methods=["POST"])
+def chat_batch():
+    # JSON lines in, JSON lines out in input order (see batch.py); the body is
+    # read line by line as answers are produced, so large batches stay cheap
+    workers = min(request.args.get("workers", config.BATCH_WORKERS, type=int), config.BATCH_MAX_WORKERS)
+    progress = BatchProgress()
+
+    def generate():
+        results = run_batch(
+            parse_lines(request.stream),
+            get_medical_response,
+            workers=max(workers, 1),
+            dedup_size=config.BATCH_DEDUP_SIZE,
+            progress=progress,
+        )
+        for result in results:
+            yield ndjson(result)
+        yield ndjson(dict(progress.summary(), done=True, timestamp=datetime.now().strftime("%H:%M:%S")))
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/healthz")
+def healthz():
+    # The app can always answer from static fallbacks, so this stays 200;
+    # "degraded" means LLM calls are being skipped on some or all hosts
+    llama_service.pool.start()
+    llm = llama_service.pool.stats()
+    circuits = [backend["circuit"] for backend in llm["backends"]]
+    status = "ok" if all(circuit == "closed" for circuit in circuits) else "degraded"
+    return jsonify({"status": status, "llm": llm})
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
+def static_json(payload):
+    """Serve a precomputed payload, honoring If-None-Match and Accept-Encoding"""
+    environ = request.environ
+    status, headers, body = payload.respond(environ.get("HTTP_IF_NONE_MATCH"), environ.get("HTTP_ACCEPT_ENCODING"))
+    return Response(body, status=status, headers=headers)
+
+
+@app.route("/vaccination-schedule")
+def vaccination_schedule():
+    return static_json(VACCINATION_SCHEDULE_PAYLOAD)
+
+
+@app.route("/health-alert")
+def health_alert():
+    return static_json(HEALTH_ALERTS)
+
+
+@app.route("/chat/templates")
+def chat_templates():
+    return static_json(FALLBACK_TEMPLATES_PAYLOAD)
+
+
+UNAVAILABLE_NOTE = "⚠️ **Note:** AI assistant temporarily unavailable. Consult healthcare provider for detailed information."
+
+# Static answers by template id; {name} fields are filled from the answer's
+# parameters. Clients that ask for compact responses get the id and the
+# parameters instead of the text and expand them with this same table
+# (inlined into index.html, and served at /chat/templates).
+FALLBACK_TEMPLATES = {
+    "greeting": "Hello! I'm your AI-powered health assistant using advanced AI to provide personalized medical information. I can help you with diseases, symptoms, prevention tips, and vaccination schedules. How can I assist you today?",
+    "emergency": "🚨 **EMERGENCY:** If you're experiencing a medical emergency, please:\n• Call emergency services immediately (108 in India)\n• Go to the nearest hospital\n• Contact your doctor\n\nThis chatbot is for informational purposes only and cannot handle medical emergencies.",
+    "vaccine": "📋 **{name} Vaccine (Static):**\n\n**When:** {schedule}\n\n**Protects Against:** {protects_against}\n\n{notes}\n\n" + UNAVAILABLE_NOTE,
+    "vaccination_children": "📋 **Vaccination Information (Static):**\n\nFor children's vaccination schedule:\n{vaccines}\n" + UNAVAILABLE_NOTE,
+    "vaccination_adults": "📋 **Adult Vaccination (Static):**\n\n{vaccines}\n" + UNAVAILABLE_NOTE,
+    "disease": "📋 **{name} Information (Static):**\n\n{summary}**Common Symptoms:** {symptoms}\n\n**Prevention Tips:** {prevention}\n\n**When to Seek Help:** {when_to_seek_help}\n\n⚠️ **Note:** AI assistant temporarily unavailable. This is basic information only. Please consult a healthcare professional for proper diagnosis and treatment.",
+    "symptoms": "📋 **Symptom Analysis (Static):**\n\nBased on the symptoms you mentioned, you might be experiencing: {conditions}.\n\n**General Recommendations:**\n• Stay hydrated and get adequate rest\n• Monitor your symptoms\n• Consult a healthcare professional if symptoms persist or worsen\n\n⚠️ **Important:** This is not a medical diagnosis. AI assistant temporarily unavailable. Please consult a doctor for proper evaluation.",
+    "prevention": "📋 **General Prevention Tips (Static):**\n\n• Wash hands frequently\n• Eat a balanced diet\n• Exercise regularly\n• Get adequate sleep\n• Stay hydrated\n• Avoid smoking and limit alcohol\n• Get regular health checkups\n• Follow vaccination schedules\n\n⚠️ **Note:** AI assistant temporarily unavailable. Consult healthcare provider for personalized prevention strategies.",
+    "default": "**Medical Assistant:**\n\nI can help you with information about diseases, symptoms, prevention tips, and vaccination schedules.\n\n**Try asking me about:**\n• Specific diseases (fever, dengue, malaria, diabetes, hypertension and more)\n• Symptoms you're experiencing\n• Prevention tips\n• Vaccination schedules\n• Health alerts\n\n⚠️ **Note:** AI-powered responses may be temporarily unavailable. For immediate concerns, consult a healthcare professional.\n\nWhat would you like to know?",
+}
+# Templates only change with a deploy; the ETag covers that
+FALLBACK_TEMPLATES_PAYLOAD = StaticPayload(FALLBACK_TEMPLATES, max_age=3600)
+
+
+class StaticAnswer(str):
+    """
+    A static answer: the text of one of FALLBACK_TEMPLATES filled with params.
+
+    It is the rendered string everywhere (sessions, batch results, logs);
+    only answer_fields() sends template and params in its place.
+    """
+
+    def __new__(cls, template, params=None):
+        params = params or {}
+        answer = super().__new__(cls, FALLBACK_TEMPLATES[template].format_map(params))
+        answer.template = template
+        answer.params = params
+        return answer
+
+
+def answer_fields(response, compact=False):
+    """The JSON fields carrying an answer: its text, or for compact clients a static answer's template and params"""
+    if compact and isinstance(response, StaticAnswer):
+        return {"template": response.template, "params": response.params}
+    return {"response": response}
+
+
+def stream_fields(chunk, compact=False):
+    """The JSON fields of one streamed chunk, see answer_fields()"""
+    if compact and isinstance(chunk, StaticAnswer):
+        return {"template": chunk.template, "params": chunk.params}
+    return {"token": chunk}
+
+
+GREETING_RESPONSE = StaticAnswer("greeting")
+
+PARTIAL_ANSWER_NOTE = "\n\n⏱️ **Note:** This answer was cut short. Please ask again or consult a healthcare professional for complete information."
+
+EMERGENCY_FALLBACK_RESPONSE = StaticAnswer("emergency")
+
+
+def analyze_query(message):
+    """Scan the message once; return its query type and the matched keywords by category"""
+
+    with metrics.STAGE_SECONDS.time(stage="intent_detection"):
+        terms = QUERY_MATCHER.scan(message)
+        query_type = query_type_from_terms(terms)
+    metrics.QUERIES.inc(query_type=query_type)
+    return query_type, terms
+
+
+def query_type_from_terms(terms):
+    """Pick the query type from a QUERY_MATCHER scan"""
+
+    # Greetings - Keep simple responses for basic interactions
+    if "greeting" in terms:
+        return "greeting"
+
+    # Emergency queries - Always handle these immediately without AI delay
+    if "emergency" in terms:
+        return "emergency"
+
+    # Detect query type and use appropriate AI method
+    # if detect_disease_query(message):
+    #     return "disease"
+
+    if "symptom_indicator" in terms or "common_symptom" in terms:
+        return "symptom"
+
+    if "prevention" in terms:
+        return "prevention"
+
+    if "vaccination" in terms:
+        return "vaccination"
+
+    return "general"
+
+
+def follow_up_history(history, terms):
+    """
+    history if the message is a follow-up, else None
+
+    A follow-up names no condition, symptom or vaccine of its own ("what
+    about for kids?") and only makes sense with the earlier turns. Any
+    other message is answered on its own, so it can still be served from
+    the precomputed answers and the response cache.
+    """
+    if not history or any(category in terms for category in TOPIC_CATEGORIES):
+        return None
+    return history
+
+
+def remember(session_id, message, response):
+    """Record a turn in the session, unless its answer is a static one (greeting or fallback)"""
+    if not isinstance(response, StaticAnswer):
+        session_store.append(session_id, message, response)
+
+
+def classify_query(message):
+    """Classify a message as greeting, emergency, symptom, prevention, vaccination or general"""
+    return analyze_query(message)[0]
+
+
+def ask_llama(query_type, message, stream=False, service=None, history=None):
+    """Send the message to the Llama method matching its query type
+
+    service defaults to the global llama_service; with an AsyncLlamaService the
+    result is a coroutine (or an async iterator when streaming). history holds
+    the conversation's earlier messages, if the message is part of a session.
+    """
+    service = service or llama_service
+
+    # if query_type == "disease":
+    #     # Extract disease name
+    #     disease_names = extract_disease_names(message)
+    #     return service.get_disease_info(disease_names[0], stream=stream)
+
+    if query_type == "emergency":
+        return service.get_emergency_guidance(message, stream=stream, history=history)
+
+    if query_type == "symptom":
+        logger.info(f"Processing symptom query: {message}")
+        return service.analyze_symptoms(message, stream=stream, history=history)
+
+    if query_type == "prevention":
+        logger.info(f"Processing prevention query: {message}")
+        return service.get_prevention_tips(message, stream=stream, history=history)
+
+    context = None
+    if query_type == "vaccination":
+        # Handle vaccination with AI enhancement; passed as context so the
+        # question itself still matches precomputed and cached answers
+        context = {"topic": "vaccination"}
+    else:
+        # General medical query - let AI handle it
+        logger.info(f"Processing general medical query: {message}")
+
+    if stream:
+        return service.stream_medical_response(message, context, history)
+    return service.get_medical_response(message, context, history)
+
+
+def get_medical_response(message, history=None):
+    """Generate AI-powered medical response using Llama 3.2 with intelligent fallback"""
+
+    query_type, terms = analyze_query(message)
+    history = follow_up_history(history, terms)
+
+    if query_type == "greeting":
+        return GREETING_RESPONSE
+
+    # Try AI-powered response first; emergencies get a shorter time budget
+    try:
+        ai_response = ask_llama(query_type, message, history=history)
+        if ai_response:
+            return f"{ai_response}"
+
+    except PartialAnswer as e:
+        record_cut_short(query_type, e, e.partial)
+        if e.partial:
+            return e.partial + PARTIAL_ANSWER_NOTE
+
+    except Exception as e:
+        logger.error(f"Error in AI processing: {e}")
+
+    # Fallback to static responses if AI is unavailable, too slow or failed before answering
+    logger.info("Using fallback static responses")
+    return fallback_response(query_type, message, terms)
+
+
+def stream_medical_response(message, history=None):
+    """Stream the AI-powered medical response chunk by chunk, with the same fallbacks as get_medical_response"""
+
+    query_type, terms = analyze_query(message)
+    history = follow_up_history(history, terms)
+
+    if query_type == "greeting":
+        yield GREETING_RESPONSE
+        return
+
+    streamed = False
+    try:
+        for chunk in ask_llama(query_type, message, stream=True, history=history):
+            streamed = True
+            yield chunk
+
+    except PartialAnswer as e:
+        record_cut_short(query_type, e, streamed)
+        if streamed:
+            yield PARTIAL_ANSWER_NOTE
+
+    except Exception as e:
+        logger.error(f"Error in AI processing: {e}")
+
+    # A partially streamed answer is kept; fall back only if nothing was produced
+    if streamed:
+        return
+
+    logger.info("Using fallback static responses")
+    yield fallback_response(query_type, message, terms)
+
+
+def record_cut_short(query_type, error, partial):
+    """Log a query whose LLM answer was cut short, with or without a partial answer; deadlines are counted"""
+    logger.warning(f"{error} for {query_type} query ({'partial answer' if partial else 'no answer'})")
+    if isinstance(error, DeadlineExceeded):
+        metrics.DEADLINES_EXCEEDED.inc(query_type=query_type, partial="yes" if partial else "no")
+
+
+def fallback_response(query_type, message, terms=None):
+    """Static answer used when the LLM gives nothing; counted and timed in /metrics"""
+    metrics.FALLBACKS.inc(query_type=query_type)
+    if query_type == "emergency":
+        return EMERGENCY_FALLBACK_RESPONSE
+    with metrics.STAGE_SECONDS.time(stage="fallback_render"):
+        return get_fallback_response(message, terms)
+
+
+# def detect_disease_query(message):
+#     """Detect if message is asking about a specific disease"""
+#     disease_indicators = ['tell me about', 'what is', 'information about', 'about', 'disease', 'condition']
+#     disease_names = list(MEDICAL_KB.keys()) + ['cancer', 'covid', 'malaria', 'tuberculosis', 'asthma', 'migraine']
+
+#     has_disease_indicator = any(indicator in message for indicator in disease_indicators)
+#     has_disease_name = any(disease in message for disease in disease_names)
+
+#     return has_disease_indicator or has_disease_name
+
+
+def detect_symptom_query(message):
+    """Detect if message is describing symptoms"""
+    terms = QUERY_MATCHER.scan(message)
+    return "symptom_indicator" in terms or "common_symptom" in terms
+
+
+def detect_prevention_query(message):
+    """Detect if message is asking about prevention"""
+    return "prevention" in QUERY_MATCHER.scan(message)
+
+
+def extract_disease_names(message):
+    """Extract disease names from message"""
+    found_diseases = QUERY_MATCHER.scan(message).get("disease")
+    return found_diseases if found_diseases else ["general health condition"]
+
+
+def get_fallback_response(message, terms=None):
+    """Provide fallback static responses when AI is unavailable
+
+    terms is the QUERY_MATCHER scan of message, when the caller already has it.
+    """
+
+    if terms is None:
+        terms = QUERY_MATCHER.scan(message)
+
+    # A specific vaccine
+    if "kb_vaccine" in terms:
+        vaccine = knowledge_base.lookup(terms["kb_vaccine"][0])
+        return StaticAnswer("vaccine", {
+            "name": vaccine["name"],
+            "schedule": vaccine["schedule"],
+            "protects_against": ", ".join(vaccine["protects_against"]),
+            "notes": vaccine["notes"],
+        })
+
+    # Vaccination queries
+    if "vaccination" in terms:
+        group = "children" if "child" in terms else "adults"
+        vaccines = "".join(
+            f"• {vaccine['name']}: {vaccine['schedule']}\n"
+            for vaccine in knowledge_base.vaccines if vaccine["group"] == group
+        )
+        return StaticAnswer(f"vaccination_{group}", {"vaccines": vaccines})
+
+    # Disease-specific queries
+    if "kb_disease" in terms:
+        info = knowledge_base.lookup(terms["kb_disease"][0])
+        return StaticAnswer("disease", {
+            "name": info["name"].title(),
+            "summary": f"{info['summary']}\n\n" if info.get("summary") else "",
+            "symptoms": ", ".join(info["symptoms"]),
+            "prevention": ", ".join(info["prevention"]),
+            "when_to_seek_help": info["when_to_seek_help"],
+        })
+
+    # Symptom queries: the best-matching conditions for the whole message
+    diseases = []
+    if "kb_symptom" in terms:
+        results = knowledge_base.search(message, k=3, kind="condition", min_score=config.KNOWLEDGE_MIN_SCORE)
+        diseases = [entry["name"] for score, entry in results]
+
+    if diseases:
+        return StaticAnswer("symptoms", {"conditions": ", ".join(diseases)})
+
+    # Prevention queries
+    if {"prevent", "prevention"} & set(terms.get("prevention", [])):
+        return StaticAnswer("prevention")
+
+    # Default response
+    return StaticAnswer("default")
+
+
+if __name__ == "__main__":
+    # Development server (FLASK_DEBUG=1 for the reloader); in production run gunicorn -c gunicorn.conf.py
+    app.run(debug=config.FLASK_DEBUG, host="0.0.0.0", port=5000)
@@ -0,0 +1,326 @@
+"""
+Async serving mode.
+
+/chat and /chat/stream are served natively with the async Ollama client and
+a bounded number of in-flight generations; every other route is delegated to
+the Flask app. Run with:
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+
+from asgiref.wsgi import WsgiToAsgi
+
+import config
+import metrics
+from app import (
+    app,
+    answer_fields,
+    analyze_query,
+    ask_llama,
+    fallback_response,
+    follow_up_history,
+    ndjson,
+    record_cut_short,
+    remember,
+    session_id_from,
+    stream_fields,
+    GREETING_RESPONSE,
+    PARTIAL_ANSWER_NOTE,
+)
+from compression import DYNAMIC_LEVELS, STREAM_ENCODINGS, StreamCompressor, compress, negotiate
+from concurrency import AsyncPriorityScheduler, OverloadedError, PartialAnswer
+from llama_service import AsyncLlamaService, llama_service
+from sessions import new_session_id, session_store
+
+logger = logging.getLogger(__name__)
+
+scheduler = AsyncPriorityScheduler(
+    max_in_flight=config.ASYNC_MAX_IN_FLIGHT,
+    max_waiting=config.ASYNC_MAX_WAITING,
+    max_wait_seconds=config.ASYNC_MAX_WAIT_SECONDS,
+    weights=config.PRIORITY_WEIGHTS,
+    emergency_reserve=config.PRIORITY_EMERGENCY_RESERVE,
+    aging_seconds=config.PRIORITY_AGING_SECONDS,
+    shed_depth=config.PRIORITY_SHED_DEPTH,
+)
+
+# Shares the response cache and backend pool with the synchronous service
+async_llama_service = AsyncLlamaService(
+    llama_service.model_name,
+    cache=llama_service.cache,
+    cache_emergency=llama_service.cache_emergency,
+    pool=llama_service.pool,
+    keep_alive=llama_service.keep_alive,
+    num_ctx=llama_service.num_ctx,
+    knowledge=llama_service.knowledge,
+    knowledge_top_k=llama_service.knowledge_top_k,
+    answers=llama_service.answers,
+    router=llama_service.router,
+    scheduler=scheduler,
+)
+
+metrics.REGISTRY.register_collector(metrics.stats_collector(
+    "chatbot_async_scheduler", "Async server LLM slots", scheduler.stats, counters=["rejected"]
+))
+metrics.REGISTRY.register_collector(metrics.stats_collector(
+    "chatbot_async_single_flight", "Coalesced LLM generations (async server)",
+    async_llama_service.single_flight.stats, counters=["generations", "coalesced"],
+))
+
+flask_application = WsgiToAsgi(app)
+
+
+def static_response(query_type, message):
+    return fallback_response(query_type, message)
+
+
+def timestamp():
+    return datetime.now().strftime("%H:%M:%S")
+
+
+def request_header(scope, name):
+    """A request header's value, or None; name is lowercase bytes"""
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def read_message(receive):
+    """Return the request's lowercased message, session id and whether it asks for compact responses"""
+    body = b""
+    while True:
+        event = await receive()
+        body += event.get("body", b"")
+        if not event.get("more_body"):
+            break
+    try:
+        payload = json.loads(body or b"{}")
+        return payload.get("message", "").lower(), session_id_from(payload), bool(payload.get("compact"))
+    except (ValueError, AttributeError):
+        return "", new_session_id(), False
+
+
+async def until_disconnected(receive):
+    """Return once the client has gone away (call after the request body was read)"""
+    while True:
+        event = await receive()
+        if event["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(receive, coro):
+    """Run coro, cancelling it if the client disconnects first so its generation is stopped"""
+    task = asyncio.ensure_future(coro)
+    watcher = asyncio.ensure_future(until_disconnected(receive))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            logger.info("Client disconnected, cancelling generation")
+            task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def send_json(send, status, payload, extra_headers=(), accept_encoding=None):
+    """Send a JSON response, compressed if the client accepts it (see app.compress_response)"""
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = [(b"content-type", b"application/json"), (b"vary", b"Accept-Encoding")]
+    encoding = negotiate(accept_encoding) if config.RESPONSE_COMPRESSION else None
+    if encoding and len(body) >= config.COMPRESSION_MIN_BYTES:
+        body = compress(body, encoding, DYNAMIC_LEVELS[encoding])
+        headers.append((b"content-encoding", encoding.encode()))
+    headers.append((b"content-length", str(len(body)).encode()))
+    headers.extend(extra_headers)
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_overloaded(send, query_type, message, compact=False, accept_encoding=None):
+    """Fast 503 carrying the static answer, so the user still gets something useful"""
+    logger.warning("LLM queue full, answering with static fallback")
+    await send_json(
+        send,
+        503,
+        {
+            **answer_fields(static_response(query_type, message), compact),
+            "timestamp": timestamp(),
+            "overloaded": True,
+        },
+        [(b"retry-after", b"5")],
+        accept_encoding,
+    )
+
+
+async def chat(scope, receive, send):
+    message, session_id, compact = await read_message(receive)
+    accept_encoding = request_header(scope, b"accept-encoding")
+    await cancel_on_disconnect(receive, answer(send, message, session_id, compact, accept_encoding))
+
+
+async def answer(send, message, session_id, compact=False, accept_encoding=None):
+    query_type, terms = analyze_query(message)
+
+    if query_type == "greeting":
+        await send_json(
+            send, 200,
+            {**answer_fields(GREETING_RESPONSE, compact), "timestamp": timestamp(), "session_id": session_id},
+            accept_encoding=accept_encoding,
+        )
+        return
+
+    history = follow_up_history(session_store.history(session_id), terms)
+    try:
+        ai_response = await ask_llama(query_type, message, service=async_llama_service, history=history)
+    except OverloadedError:
+        await send_overloaded(send, query_type, message, compact, accept_encoding)
+        return
+    except PartialAnswer as e:
+        record_cut_short(query_type, e, e.partial)
+        ai_response = e.partial + PARTIAL_ANSWER_NOTE if e.partial else None
+    except Exception as e:
+        logger.error(f"Error in AI processing: {e}")
+        ai_response = None
+
+    response = ai_response or static_response(query_type, message)
+    remember(session_id, message, response)
+    await send_json(
+        send, 200,
+        {**answer_fields(response, compact), "timestamp": timestamp(), "session_id": session_id},
+        accept_encoding=accept_encoding,
+    )
+
+
+async def chat_stream(scope, receive, send):
+    message, session_id, compact = await read_message(receive)
+    accept_encoding = request_header(scope, b"accept-encoding")
+    await cancel_on_disconnect(receive, answer_stream(send, message, session_id, compact, accept_encoding))
+
+
+async def answer_stream(send, message, session_id, compact=False, accept_encoding=None):
+    query_type, terms = analyze_query(message)
+
+    chunks = None
+    first_chunk = GREETING_RESPONSE
+    if query_type != "greeting":
+        history = follow_up_history(session_store.history(session_id), terms)
+        chunks = ask_llama(query_type, message, stream=True, service=async_llama_service, history=history)
+        try:
+            # Pull the first chunk before committing to a 200 status
+            first_chunk = await chunks.__anext__()
+        except OverloadedError:
+            await send_overloaded(send, query_type, message, compact, accept_encoding)
+            return
+        except PartialAnswer as e:
+            record_cut_short(query_type, e, "")
+            chunks = None
+            first_chunk = static_response(query_type, message)
+        except StopAsyncIteration:
+            chunks = None
+            first_chunk = static_response(query_type, message)
+        except Exception as e:
+            logger.error(f"Error in AI processing: {e}")
+            chunks = None
+            first_chunk = static_response(query_type, message)
+
+    headers = [
+        (b"content-type", b"application/x-ndjson"),
+        (b"cache-control", b"no-cache"),
+        (b"x-accel-buffering", b"no"),
+        (b"vary", b"Accept-Encoding"),
+    ]
+    # Compressed line by line, each flushed so tokens still arrive as they are generated
+    compressor = None
+    encoding = negotiate(accept_encoding, STREAM_ENCODINGS) if config.RESPONSE_COMPRESSION else None
+    if encoding:
+        compressor = StreamCompressor(encoding)
+        headers.append((b"content-encoding", encoding.encode()))
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+
+    async def send_line(payload, more_body=True):
+        line = ndjson(payload).encode("utf-8")
+        if compressor is not None:
+            line = compressor.compress(line) + (b"" if more_body else compressor.finish())
+        await send({"type": "http.response.body", "body": line, "more_body": more_body})
+
+    streamed = [first_chunk]
+    await send_line(stream_fields(first_chunk, compact))
+    if chunks is not None:
+        try:
+            async for chunk in chunks:
+                streamed.append(chunk)
+                await send_line(stream_fields(chunk, compact))
+        except Exception as e:
+            # Keep what was streamed and say it was cut short
+            if isinstance(e, PartialAnswer):
+                record_cut_short(query_type, e, first_chunk)
+            else:
+                logger.error(f"Error in AI processing: {e}")
+            streamed.append(PARTIAL_ANSWER_NOTE)
+            await send_line({"token": PARTIAL_ANSWER_NOTE})
+    remember(session_id, message, first_chunk if len(streamed) == 1 else "".join(streamed))
+    await send_line({"done": True, "timestamp": timestamp(), "session_id": session_id}, more_body=False)
+
+
+ROUTES = {
+    "/chat": chat,
+    "/chat/stream": chat_stream,
+}
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            event = await receive()
+            if event["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif event["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    route = scope.get("path")
+    handler = ROUTES.get(route)
+    if scope["type"] == "http" and handler and scope["method"] == "POST":
+        # Same HTTP metrics the Flask hooks record for delegated routes
+        started = time.perf_counter()
+        status = 499  # nginx's "client closed request", if no response was started
+        encoding = "identity"
+        size = 0
+
+        async def send_and_record(event):
+            nonlocal status, encoding, size
+            if event["type"] == "http.response.start":
+                status = event["status"]
+                encoding = dict(event["headers"]).get(b"content-encoding", b"identity").decode()
+                metrics.HTTP_SECONDS.observe(time.perf_counter() - started, route=route)
+            elif event["type"] == "http.response.body":
+                size += len(event.get("body", b""))
+            await send(event)
+
+        try:
+            await handler(scope, receive, send_and_record)
+        except Exception:
+            status = 500
+            raise
+        finally:
+            metrics.HTTP_REQUESTS.inc(route=route, status=status)
+            metrics.HTTP_RESPONSE_BYTES.inc(size, route=route, encoding=encoding)
+        return
+
+    await flask_application(scope, receive, send)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(application, host="0.0.0.0", port=5000)
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+import ollama
+
+from health import HealthMonitor
+
+logger = logging.getLogger(__name__)
+
+
+class Backend:
+    """One Ollama host with its own clients, health monitor and load counters"""
+
+    # Weight of the newest sample in the latency moving average
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(self, host: Optional[str], model_name: str, timeout: Optional[float] = None,
+                 other_models: Iterable[str] = (), **health_options):
+        self.host = host or "default"
+        self.model_name = model_name
+        self.other_models = [model for model in other_models if model and model != model_name]
+        # httpx timeout: bounds connecting and each read, i.e. the wait for the next chunk
+        self.client = ollama.Client(host=host, timeout=timeout)
+        self._host = host
+        self._timeout = timeout
+        self._async_client = None
+        self.health = HealthMonitor(self.check, name=self.host, **health_options)
+        self.models: Optional[set] = None  # as of the last successful check; None until then
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.cancelled = 0
+        self.latency_ewma: Optional[float] = None
+        self.latency_total = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def async_client(self) -> ollama.AsyncClient:
+        # Created on first use, inside the event loop that will drive it
+        if self._async_client is None:
+            self._async_client = ollama.AsyncClient(host=self._host, timeout=self._timeout)
+        return self._async_client
+
+    def check(self) -> bool:
+        """Check if this host is up and has the model or one of other_models"""
+        try:
+            response = self.client.list()
+            available_models = [model['name'] for model in response.get('models', [])]
+            self.models = set(available_models)
+
+            if self.model_name in available_models:
+                logger.info(f"Llama model {self.model_name} is available on {self.host}")
+                return True
+            usable = [model for model in self.other_models if model in self.models]
+            if usable:
+                # pick() only sends this host requests for the models it has
+                logger.warning(f"Model {self.model_name} not found on {self.host}, serving only {usable}")
+                return True
+            logger.warning(f"Model {self.model_name} not found on {self.host}. Available models: {available_models}")
+            return False
+
+        except Exception as e:
+            logger.error(f"Ollama not available on {self.host}: {e}")
+            return False
+
+    def serves(self, model: Optional[str]) -> bool:
+        """True unless the last check showed this host lacks model"""
+        return model is None or self.models is None or model in self.models
+
+    def begin(self):
+        with self._lock:
+            self.outstanding += 1
+            self.requests += 1
+
+    def end(self, started: float, ok: Optional[bool]):
+        """Release a call; ok is None when the caller gave up on it, which records neither outcome"""
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.outstanding -= 1
+            if ok is None:
+                self.cancelled += 1
+                return
+            if ok:
+                self.latency_total += elapsed
+                if self.latency_ewma is None:
+                    self.latency_ewma = elapsed
+                else:
+                    self.latency_ewma += self.LATENCY_SMOOTHING * (elapsed - self.latency_ewma)
+            else:
+                self.failures += 1
+        if ok:
+            self.health.record_success()
+        else:
+            self.health.record_failure()
+
+    def stats(self) -> Dict[str, Any]:
+        succeeded = self.requests - self.failures - self.cancelled - self.outstanding
+        return {
+            "host": self.host,
+            "circuit": self.health.breaker.state,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+            "latency_ewma": self.latency_ewma,
+            "latency_avg": self.latency_total / succeeded if succeeded > 0 else None,
+        }
+
+
+class BackendPool:
+    """
+    Routes LLM calls across several Ollama hosts.
+
+    pick() returns the healthy backend with the fewest outstanding requests
+    (ties go to the lower recent latency). Callers wrap each call in track()
+    and, when it fails, ask pick() again with the failed host excluded, up
+    to max_attempts hosts per request.
+    """
+
+    def __init__(self, hosts: Iterable[Optional[str]], model_name: str,
+                 max_attempts: int = 2, timeout: Optional[float] = None,
+                 other_models: Iterable[str] = (), **health_options):
+        self.model_name = model_name
+        other_models = list(other_models)
+        self.backends: List[Backend] = [
+            Backend(host, model_name, timeout=timeout, other_models=other_models, **health_options)
+            for host in (list(hosts) or [None])
+        ]
+        self.max_attempts = max(1, min(max_attempts, len(self.backends)))
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def available(self, model: Optional[str] = None) -> bool:
+        """True if at least one backend (serving model, if given) would accept a request right now"""
+        return any(backend.health.available() and backend.serves(model) for backend in self.backends)
+
+    def outstanding(self) -> int:
+        """LLM calls in flight across all hosts"""
+        return sum(backend.outstanding for backend in self.backends)
+
+    def pick(self, exclude: Iterable[Backend] = (), model: Optional[str] = None) -> Optional[Backend]:
+        with self._lock:
+            candidates = [
+                backend for backend in self.backends
+                if backend not in exclude and backend.health.available() and backend.serves(model)
+            ]
+            candidates.sort(key=lambda b: (b.outstanding, b.latency_ewma or 0.0))
+            for backend in candidates:
+                # allow_request() lets only one trial call through a half-open circuit
+                if backend.health.allow_request():
+                    backend.begin()
+                    if exclude:
+                        self.retries += 1
+                    return backend
+        return None
+
+    @contextmanager
+    def track(self, backend: Backend):
+        """Time a call on a backend picked with pick(); an exception counts as a failure"""
+        started = time.monotonic()
+        ok: Optional[bool] = False
+        try:
+            yield backend
+            ok = True
+        except (GeneratorExit, asyncio.CancelledError):
+            # The caller stopped listening; that says nothing about the host
+            ok = None
+            raise
+        finally:
+            backend.end(started, ok)
+
+    def start(self):
+        for backend in self.backends:
+            backend.health.start()
+
+    def stop(self):
+        for backend in self.backends:
+            backend.health.stop()
+
+    def collect(self):
+        """Per-host metrics for metrics.REGISTRY.register_collector()"""
+        backends = [(backend.host, backend.stats()) for backend in self.backends]
+        yield "chatbot_llm_retries_total", "counter", "LLM calls retried on another host", [({}, self.retries)]
+        for field, kind, documentation in (
+            ("outstanding", "gauge", "LLM calls in flight per host"),
+            ("requests", "counter", "LLM calls sent per host"),
+            ("failures", "counter", "Failed LLM calls per host"),
+            ("cancelled", "counter", "LLM calls abandoned by the caller per host"),
+            ("latency_ewma", "gauge", "Recent LLM call latency per host in seconds (moving average)"),
+        ):
+            name = f"chatbot_backend_{field}" + ("_total" if kind == "counter" else "")
+            yield name, kind, documentation, [({"host": host}, stats[field]) for host, stats in backends]
+        yield (
+            "chatbot_backend_circuit_open", "gauge", "1 while a host's circuit breaker is not closed",
+            [({"host": host}, int(stats["circuit"] != "closed")) for host, stats in backends],
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "backends": [backend.stats() for backend in self.backends],
+        }
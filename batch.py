@@ -0,0 +1,183 @@
+"""
+Bulk question answering: JSON lines in, JSON lines out.
+
+Each input line is an object with a "message" (and optionally an "id",
+echoed back) or a bare JSON string. Answers come out in input order, one
+object per line, while up to `workers` messages are answered in parallel.
+Input is read lazily and at most `window` answers are held back waiting
+for an earlier, slower one, so memory stays flat however long the input.
+Repeated messages are answered once. Served as POST /chat/batch, or from
+the command line:
+
+    python batch.py questions.jsonl -o answers.jsonl --workers 8
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class BatchProgress:
+    """Counts batch items and logs throughput every interval seconds"""
+
+    def __init__(self, interval: float = 10.0, report: Optional[Callable[[str], None]] = None):
+        self.interval = interval
+        self.report = report or logger.info
+        self.items = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+
+    def record(self, outcome: str):
+        """outcome is answered, duplicate, invalid or error"""
+        self.items += 1
+        if outcome == "duplicate":
+            self.duplicates += 1
+        elif outcome in ("invalid", "error"):
+            self.errors += 1
+        metrics.BATCH_ITEMS.inc(outcome=outcome)
+
+        now = time.monotonic()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            summary = self.summary()
+            self.report(
+                f"Batch progress: {summary['items']} items ({summary['duplicates']} duplicates, "
+                f"{summary['errors']} errors), {summary['items_per_second']} items/s"
+            )
+
+    def summary(self) -> Dict[str, Any]:
+        seconds = time.monotonic() - self.started
+        return {
+            "items": self.items,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "seconds": round(seconds, 3),
+            "items_per_second": round(self.items / seconds, 2) if seconds else 0.0,
+        }
+
+
+def parse_lines(lines: Iterable) -> Iterator[Dict[str, Any]]:
+    """Turn raw input lines (str or bytes) into items with index and message, or an error"""
+    index = 0
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        line = line.strip()
+        if not line:
+            continue
+        item = {"index": index}
+        index += 1
+        try:
+            data = json.loads(line)
+        except ValueError:
+            item["error"] = "invalid JSON"
+            yield item
+            continue
+        if isinstance(data, dict):
+            if "id" in data:
+                item["id"] = data["id"]
+            data = data.get("message")
+        if isinstance(data, str) and data.strip():
+            item["message"] = data.lower()
+        else:
+            item["error"] = "missing message"
+        yield item
+
+
+def run_batch(items: Iterable[Dict[str, Any]], answer: Callable[[str], str], workers: int = 4,
+              window: Optional[int] = None, dedup_size: int = 10000,
+              progress: Optional[BatchProgress] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Answer parsed items with answer(message) on a thread pool, yielding
+    results in input order.
+
+    window bounds how many items are in flight or finished but waiting for
+    an earlier one (default 4 per worker). The last dedup_size distinct
+    messages are remembered, so a repeat within that span reuses the first
+    answer instead of asking again.
+    """
+    window = window or workers * 4
+    progress = progress or BatchProgress()
+    pending: "deque[tuple]" = deque()
+    recent: "OrderedDict[str, Future]" = OrderedDict()
+
+    def finish(item: Dict[str, Any], future: Optional[Future], duplicate: bool) -> Dict[str, Any]:
+        result = {key: item[key] for key in ("index", "id") if key in item}
+        if future is None:
+            result["error"] = item["error"]
+            progress.record("invalid")
+            return result
+        try:
+            result["response"] = future.result()
+            progress.record("duplicate" if duplicate else "answered")
+        except Exception as e:
+            logger.error(f"Batch item {item['index']} failed: {e}")
+            result["error"] = "could not answer"
+            progress.record("error")
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+        try:
+            for item in items:
+                future, duplicate = None, False
+                message = item.get("message")
+                if message is not None:
+                    key = " ".join(message.split())
+                    future = recent.get(key)
+                    if future is not None:
+                        duplicate = True
+                        recent.move_to_end(key)
+                    else:
+                        future = recent[key] = executor.submit(answer, message)
+                        if len(recent) > dedup_size:
+                            recent.popitem(last=False)
+                pending.append((item, future, duplicate))
+
+                while len(pending) >= window:
+                    yield finish(*pending.popleft())
+
+            while pending:
+                yield finish(*pending.popleft())
+        finally:
+            # The consumer went away (e.g. the client disconnected): drop queued work
+            for _, future, _ in pending:
+                if future is not None:
+                    future.cancel()
+
+
+def main():
+    from app import get_medical_response
+
+    parser = argparse.ArgumentParser(description="Answer a JSON lines file of questions")
+    parser.add_argument("input", help="JSON lines file, or - for stdin")
+    parser.add_argument("-o", "--output", help="file for the JSON lines answers (default: stdout)")
+    parser.add_argument("--workers", type=int, default=config.BATCH_WORKERS, help="messages answered in parallel")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="seconds between progress lines")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    target = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    progress = BatchProgress(args.progress_interval, report=lambda line: print(line, file=sys.stderr))
+    try:
+        with source, target:
+            for result in run_batch(parse_lines(source), get_medical_response, workers=args.workers,
+                                    dedup_size=config.BATCH_DEDUP_SIZE, progress=progress):
+                target.write(json.dumps(result) + "\n")
+    finally:
+        print(f"Batch done: {json.dumps(progress.summary())}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Multi-backend benchmark: one Ollama host vs several behind BackendPool,
+measured against mock Ollama servers.
+
+Run from the repository root:
+
+    python benchmarks/bench_backends.py [--hosts 3] [--requests 60] [--concurrency 6]
+
+Each mock serves one generation at a time (OLLAMA_NUM_PARALLEL=1), so
+throughput should grow with the number of hosts. The last run takes one
+host down (every request gets 503) halfway through to show failover:
+failed calls are retried on another host and, once its circuit opens,
+new requests skip it.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_ollama import MockOllamaServer  # noqa: E402
+from llama_service import LlamaService  # noqa: E402
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def run(host_count, args, take_down=False):
+    servers = [
+        MockOllamaServer(slots=1, load_time=0, time_scale=args.time_scale).start()
+        for _ in range(host_count)
+    ]
+    service = LlamaService(hosts=[server.url for server in servers], keep_alive="-1")
+    done = []
+    latencies = []
+    failed = 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal failed
+        started = time.monotonic()
+        # Distinct questions, so single-flight does not merge them
+        answer = service.get_medical_response(f"question {i}: how to treat a mild fever")
+        with lock:
+            latencies.append(time.monotonic() - started)
+            done.append(i)
+            if answer is None:
+                failed += 1
+            if take_down and len(done) == args.requests // 2:
+                servers[0].mock.down = True
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(one, range(args.requests)))
+    elapsed = time.monotonic() - started
+
+    stats = service.pool.stats()
+    service.pool.stop()
+    for server in servers:
+        server.stop()
+    return {
+        "throughput": args.requests / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "failed": failed,
+        "retries": stats["retries"],
+        "per_host": [backend["requests"] for backend in stats["backends"]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=3, help="Ollama hosts in the pool")
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=6, help="client threads")
+    parser.add_argument("--time-scale", type=float, default=0.05, help="scale for simulated durations")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    results = [
+        ("1 host", run(1, args)),
+        (f"{args.hosts} hosts", run(args.hosts, args)),
+        (f"{args.hosts} hosts, one down midway", run(args.hosts, args, take_down=True)),
+    ]
+
+    print(f"{'pool':<32}{'req/s':>7}{'p50 s':>8}{'p95 s':>8}{'failed':>8}{'retries':>9}  per host")
+    for name, r in results:
+        print(
+            f"{name:<32}{r['throughput']:>7.1f}{r['p50']:>8.2f}{r['p95']:>8.2f}"
+            f"{r['failed']:>8}{r['retries']:>9}  {r['per_host']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
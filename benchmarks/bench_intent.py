@@ -0,0 +1,116 @@
+"""
+Micro-benchmark: precompiled QUERY_MATCHER vs the original per-call keyword scans.
+
+Run from the repository root:
+
+    python benchmarks/bench_intent.py [--repeat 2000]
+
+The legacy_* functions are the pre-matcher implementations from app.py,
+kept here verbatim as the baseline.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from app import MEDICAL_KB, analyze_query  # noqa: E402
+
+SAMPLE_MESSAGES = [
+    "hello",
+    "namaste doctor",
+    "this is my first question about diet",
+    "i have a headache and chills since yesterday",
+    "what are symptoms of dengue",
+    "how to prevent malaria during monsoon",
+    "vaccination schedule for my baby",
+    "is the flu vaccine safe for adults",
+    "my father has severe chest pain, help me",
+    "tell me about diabetes",
+    "what should i eat to keep my blood pressure under control",
+    "feeling tired and dizzy with shortness of breath",
+    "which vitamins are good for children",
+    "runny nose, sneezing and a sore throat",
+]
+
+
+def legacy_detect_symptom_query(message):
+    symptom_indicators = ["i have", "experiencing", "symptoms", "feeling", "pain", "ache", "hurt", "sick"]
+    common_symptoms = ["headache", "fever", "cough", "cold", "nausea", "vomiting", "diarrhea", "fatigue", "tired"]
+    has_symptom_indicator = any(indicator in message for indicator in symptom_indicators)
+    has_symptom = any(symptom in message for symptom in common_symptoms)
+    return has_symptom_indicator or has_symptom
+
+
+def legacy_detect_prevention_query(message):
+    prevention_indicators = ["prevent", "prevention", "avoid", "protect", "stay healthy", "tips", "how to"]
+    return any(indicator in message for indicator in prevention_indicators)
+
+
+def legacy_classify(message):
+    if any(word in message for word in ["hello", "hi", "hey", "namaste"]):
+        return "greeting"
+    if any(word in message for word in ["emergency", "urgent", "severe", "critical", "help me"]):
+        return "emergency"
+    if legacy_detect_symptom_query(message):
+        return "symptom"
+    if legacy_detect_prevention_query(message):
+        return "prevention"
+    if "vaccination" in message or "vaccine" in message:
+        return "vaccination"
+    return "general"
+
+
+def legacy_fallback_scan(message):
+    """The keyword work get_fallback_response used to redo on every call"""
+    found = [disease for disease in MEDICAL_KB if disease in message]
+    all_symptoms = []
+    for disease, info in MEDICAL_KB.items():
+        all_symptoms.extend([(symptom, disease) for symptom in info["symptoms"]])
+    mentioned = [(symptom, disease) for symptom, disease in all_symptoms if symptom in message]
+    return found, mentioned
+
+
+def legacy_pipeline(message):
+    legacy_classify(message)
+    legacy_fallback_scan(message)
+
+
+def matcher_pipeline(message):
+    # One scan serves both classification and the fallback
+    analyze_query(message)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000, help="passes over the sample messages")
+    args = parser.parse_args()
+
+    def run(fn):
+        return min(
+            timeit.repeat(lambda: [fn(m) for m in SAMPLE_MESSAGES], number=args.repeat, repeat=3)
+        )
+
+    calls = args.repeat * len(SAMPLE_MESSAGES)
+    results = [
+        ("legacy classify", run(legacy_classify)),
+        ("matcher classify", run(app.classify_query)),
+        ("legacy classify + fallback scan", run(legacy_pipeline)),
+        ("matcher (single scan)", run(matcher_pipeline)),
+    ]
+    print(f"{'variant':<34}{'us/message':>12}")
+    for name, seconds in results:
+        print(f"{name:<34}{seconds / calls * 1e6:>12.2f}")
+
+    print("\nClassification differences (legacy -> matcher):")
+    for message in SAMPLE_MESSAGES:
+        before, after = legacy_classify(message), app.classify_query(message)
+        if before != after:
+            print(f"  {message!r}: {before} -> {after}")
+
+
+if __name__ == "__main__":
+    main()
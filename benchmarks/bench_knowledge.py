@@ -0,0 +1,101 @@
+"""
+Micro-benchmark: knowledge base load time and BM25 search latency.
+
+Run from the repository root:
+
+    python benchmarks/bench_knowledge.py [--repeat 200] [--scale 1000 5000]
+
+Besides the shipped data, the index is rebuilt over synthetic copies of it
+(names suffixed, text shuffled between entries) to show how search time
+grows with thousands of entries.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+from knowledge_base import KnowledgeBase  # noqa: E402
+
+SAMPLE_QUERIES = [
+    "i have a headache and chills since yesterday",
+    "what are symptoms of dengue",
+    "how to prevent malaria during monsoon",
+    "vaccination schedule for my baby",
+    "my father has severe chest pain, help me",
+    "tell me about diabetes",
+    "what should i eat to keep my blood pressure under control",
+    "feeling tired and dizzy with shortness of breath",
+    "yellow eyes and dark urine for a week",
+    "itching at night that gets worse, whole family has it",
+    "runny nose, sneezing and a sore throat",
+    "when is the bcg vaccine given",
+]
+
+
+def synthetic(knowledge, size, seed=0):
+    """size entries made from the real ones, with text mixed between entries of the same kind"""
+    rng = random.Random(seed)
+    entries = []
+    while len(entries) < size:
+        base = rng.choice(knowledge.entries)
+        donor = rng.choice([entry for entry in knowledge.entries if entry["kind"] == base["kind"]])
+        entry = dict(base, name=f"{base['name']} {len(entries)}", aliases=[])
+        for field in ("symptoms", "prevention", "protects_against"):
+            if field in base:
+                entry[field] = base[field][:3] + donor.get(field, [])[:2]
+        entries.append(entry)
+    return KnowledgeBase(entries, version=f"synthetic-{size}")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def bench_search(knowledge, repeat):
+    timings = []
+    for _ in range(repeat):
+        for query in SAMPLE_QUERIES:
+            started = time.perf_counter()
+            knowledge.search(query, k=config.KNOWLEDGE_TOP_K)
+            timings.append(time.perf_counter() - started)
+    return percentile(timings, 0.5), percentile(timings, 0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the sample queries")
+    parser.add_argument("--scale", type=int, nargs="*", default=[1000, 5000],
+                        help="synthetic knowledge base sizes to index")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    knowledge = KnowledgeBase.load(config.KNOWLEDGE_PATH)
+    load_ms = (time.perf_counter() - started) * 1000
+    print(f"Loaded {config.KNOWLEDGE_PATH} ({knowledge.stats()}) in {load_ms:.1f} ms\n")
+
+    print(f"{'entries':>8}{'terms':>8}{'index ms':>10}{'p50 us':>10}{'p99 us':>10}")
+    bases = [(knowledge, load_ms)]
+    for size in args.scale:
+        started = time.perf_counter()
+        scaled = synthetic(knowledge, size)
+        bases.append((scaled, (time.perf_counter() - started) * 1000))
+    for base, build_ms in bases:
+        p50, p99 = bench_search(base, args.repeat)
+        stats = base.stats()
+        print(f"{stats['entries']:>8}{stats['terms']:>8}{build_ms:>10.1f}{p50 * 1e6:>10.1f}{p99 * 1e6:>10.1f}")
+
+    print("\nTop matches on the shipped data:")
+    for query in SAMPLE_QUERIES:
+        results = knowledge.search(query, k=config.KNOWLEDGE_TOP_K, min_score=config.KNOWLEDGE_MIN_SCORE)
+        matches = ", ".join(f"{entry['name']} ({score:.1f})" for score, entry in results)
+        print(f"  {query!r}: {matches or '-'}")
+
+
+if __name__ == "__main__":
+    main()
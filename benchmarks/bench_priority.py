@@ -0,0 +1,125 @@
+"""
+Priority scheduling benchmark: latency per priority class (emergency,
+symptom, general) with every request queued at Ollama in arrival order vs
+the priority scheduler vs the scheduler shedding general work, measured
+against a mock Ollama that is kept saturated.
+
+Run from the repository root:
+
+    python benchmarks/bench_priority.py [--requests 300] [--concurrency 24] [--slots 4]
+
+Queries come from the load test workload (benchmarks/workloads/default.jsonl)
+and are classified and dispatched like /chat does; --concurrency client
+threads send them back to back, several times more than the mock's --slots
+parallel generations. "static" is the share answered from the static
+fallback because no slot was given (shed, displaced or waited too long).
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from benchmarks import workload  # noqa: E402
+from benchmarks.mock_ollama import MockOllamaServer  # noqa: E402
+from concurrency import PRIORITIES, PriorityScheduler, priority_for  # noqa: E402
+from llama_service import LlamaService  # noqa: E402
+from model_router import route_for  # noqa: E402
+
+# The LlamaService method ask_llama calls per query type
+QUERY_METHODS = {
+    "emergency": "get_emergency_guidance",
+    "symptom": "analyze_symptoms",
+    "prevention": "get_prevention_tips",
+}
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def priority_of(query_type):
+    context = {"topic": "vaccination"} if query_type == "vaccination" else None
+    return priority_for(route_for(QUERY_METHODS.get(query_type, "get_medical_response"), context))
+
+
+def run(queries, scheduler, args):
+    server = MockOllamaServer(slots=args.slots, load_time=0, time_scale=args.time_scale).start()
+    # No cache, answer store or knowledge base: every query is a generation
+    service = LlamaService(hosts=[server.url], keep_alive="-1", scheduler=scheduler)
+    latencies = {priority: [] for priority in PRIORITIES}
+    static = {priority: 0 for priority in PRIORITIES}
+    lock = threading.Lock()
+
+    def one(item):
+        query_type, message = item
+        priority = priority_of(query_type)
+        started = time.monotonic()
+        answer = app.ask_llama(query_type, message, service=service)
+        with lock:
+            latencies[priority].append(time.monotonic() - started)
+            static[priority] += answer is None
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(one, queries))
+    elapsed = time.monotonic() - started
+
+    service.pool.stop()
+    server.stop()
+    return {
+        "throughput": len(queries) / elapsed,
+        "classes": {
+            priority: {
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "static": static[priority] / len(values),
+            }
+            for priority, values in latencies.items() if values
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workload", default=workload.DEFAULT_PATH, help="JSON lines file of queries")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=24, help="client threads")
+    parser.add_argument("--slots", type=int, default=4, help="parallel generations in the mock Ollama")
+    parser.add_argument("--shed-depth", type=int, default=16, help="PRIORITY_SHED_DEPTH for the last run")
+    parser.add_argument("--time-scale", type=float, default=0.02, help="scale for simulated durations")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    queries = []
+    for item in workload.load(args.workload):
+        query_type, _ = app.analyze_query(item["message"])
+        if query_type != "greeting":
+            # Numbered so identical questions are not merged by single-flight
+            queries.append((query_type, f"{item['message']} ({len(queries)})"))
+        if len(queries) == args.requests:
+            break
+
+    results = [
+        ("arrival order (no scheduler)", run(queries, None, args)),
+        ("priority scheduler", run(queries, PriorityScheduler(max_in_flight=args.slots), args)),
+        (f"+ shed general at depth {args.shed_depth}",
+         run(queries, PriorityScheduler(max_in_flight=args.slots, shed_depth=args.shed_depth), args)),
+    ]
+
+    print(f"{'scheduling':<32}{'req/s':>7}{'class':>11}{'p50 s':>8}{'p95 s':>8}{'static':>8}")
+    for name, r in results:
+        for index, (priority, c) in enumerate(r["classes"].items()):
+            label, throughput = (name, f"{r['throughput']:.1f}") if index == 0 else ("", "")
+            print(f"{label:<32}{throughput:>7}{priority:>11}{c['p50']:>8.2f}{c['p95']:>8.2f}{c['static']:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Prompt-evaluation benchmark: legacy single-message prompts vs the current
+system-message layout, measured against the mock Ollama server.
+
+Run from the repository root:
+
+    python benchmarks/bench_prompt_layout.py [--bursts 3] [--idle 600]
+
+The workload is sent in bursts separated by `idle` simulated seconds, so the
+keep_alive setting shows up as model reloads. LegacyLayoutService reproduces
+the previous prompt layout verbatim and leaves keep_alive at Ollama's default.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_ollama import MockOllamaServer  # noqa: E402
+from llama_service import LlamaService  # noqa: E402
+
+WORKLOAD = [
+    ("analyze_symptoms", "i have fever and body ache since two days"),
+    ("analyze_symptoms", "headache and nausea in the morning"),
+    ("analyze_symptoms", "my child has a cough and runny nose"),
+    ("get_prevention_tips", "how to prevent dengue"),
+    ("get_prevention_tips", "how to avoid malaria in monsoon"),
+    ("get_prevention_tips", "tips to stay healthy in summer"),
+    ("get_disease_info", "diabetes"),
+    ("get_disease_info", "tuberculosis"),
+    ("get_emergency_guidance", "severe chest pain, help me"),
+    ("get_medical_response", "what foods are good for blood pressure"),
+    ("get_medical_response", "Provide information about vaccination: vaccination for my baby"),
+]
+
+
+class LegacyLayoutService(LlamaService):
+    """The previous prompt layout: everything in one user message, query in the middle"""
+
+    def _build_messages(self, user_query, context=None):
+        return [{'role': 'user', 'content': self._create_medical_prompt(user_query, context)}]
+
+    def _create_medical_prompt(self, user_query, context=None):
+        base_prompt = """You are an AI medical education assistant designed to provide helpful health information for educational purposes. Your responses should be:
+
+1. ACCURATE and based on established medical knowledge
+2. EDUCATIONAL - focus on general health information and awareness
+3. SAFE - always include disclaimers about consulting healthcare professionals
+4. APPROPRIATE for rural and semi-urban populations
+5. CONCISE but comprehensive
+6. Include prevention tips when relevant
+
+IMPORTANT DISCLAIMERS TO ALWAYS INCLUDE:
+- This information is for educational purposes only
+- Not a substitute for professional medical advice
+- Consult a healthcare provider for proper diagnosis and treatment
+- For emergencies, contact emergency services immediately
+
+"""
+        if context:
+            base_prompt += f"\nAdditional context: {json.dumps(context, indent=2)}\n"
+        base_prompt += f"\nUser Question: {user_query}\n"
+        base_prompt += """
+Please provide a helpful response that includes:
+1. Direct answer to the question (if appropriate)
+2. Key symptoms or signs to watch for
+3. Prevention or self-care tips
+4. When to seek professional medical help
+5. Appropriate medical disclaimers
+
+Format your response in a clear, easy-to-read manner suitable for general public education.
+"""
+        return base_prompt
+
+    def get_disease_info(self, disease_name, stream=False):
+        prompt = f"""Provide comprehensive educational information about {disease_name} including:
+
+1. **Overview**: Brief description of the condition
+2. **Common Symptoms**: List main symptoms people should watch for
+3. **Causes**: What typically causes this condition
+4. **Prevention**: Practical prevention tips
+5. **When to Seek Help**: Clear guidance on when to see a doctor
+6. **Self-Care**: Safe home management tips (if applicable)
+
+Focus on information relevant to rural and semi-urban populations. Include appropriate medical disclaimers.
+"""
+        return self._respond("get_disease_info", disease_name, prompt, stream=stream)
+
+    def analyze_symptoms(self, symptoms, stream=False):
+        prompt = f"""A person is experiencing these symptoms: {symptoms}
+
+Please provide:
+1. **General Assessment**: What these symptoms might commonly indicate (be careful not to diagnose)
+2. **Immediate Care**: Safe self-care measures they can take
+3. **Warning Signs**: Symptoms that would require immediate medical attention
+4. **Next Steps**: Recommended actions (rest, hydration, when to see doctor)
+5. **Important Reminders**: That this is not a diagnosis and professional consultation is needed
+
+Be very careful to avoid making specific diagnoses. Focus on general health education and when to seek professional help.
+"""
+        return self._respond("analyze_symptoms", symptoms, prompt, {"symptoms": symptoms}, stream=stream)
+
+    def get_prevention_tips(self, condition_or_general="general health", stream=False):
+        prompt = f"""Provide practical prevention tips for {condition_or_general} that are:
+
+1. **Actionable**: Things people can realistically do
+2. **Accessible**: Suitable for rural/semi-urban populations  
+3. **Evidence-based**: Based on established medical knowledge
+4. **Culturally appropriate**: Suitable for diverse populations
+
+Include tips about:
+- Diet and nutrition
+- Exercise and physical activity
+- Hygiene practices
+- Lifestyle modifications
+- When to get check-ups or screenings
+
+Focus on practical, everyday measures people can take to stay healthy.
+"""
+        return self._respond("get_prevention_tips", condition_or_general, prompt, stream=stream)
+
+    def get_emergency_guidance(self, situation, stream=False):
+        prompt = f"""Provide emergency guidance for: {situation}
+
+Include:
+1. **Immediate Actions**: What to do right now
+2. **Emergency Contacts**: Remind about calling emergency services
+3. **Do NOT Do**: Important things to avoid
+4. **While Waiting**: Safe actions while waiting for help
+
+Keep responses focused on immediate safety and getting professional help quickly. Emphasize calling emergency services (108 in India) for true emergencies.
+"""
+        return self._respond("get_emergency_guidance", situation, prompt, {"emergency": True},
+                             stream=stream, cacheable=self.cache_emergency)
+
+
+def run(service_class, keep_alive, args):
+    with MockOllamaServer(time_scale=args.time_scale, slots=args.slots) as server:
+        service = service_class(hosts=[server.url], keep_alive=keep_alive)
+
+        rng = random.Random(args.seed)
+        for burst in range(args.bursts):
+            if burst:
+                server.mock.advance(args.idle)
+            for _ in range(args.requests):
+                method, query = rng.choice(WORKLOAD)
+                getattr(service, method)(query)
+        service.pool.stop()
+        return dict(server.mock.stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bursts", type=int, default=3, help="bursts of requests")
+    parser.add_argument("--requests", type=int, default=40, help="requests per burst")
+    parser.add_argument("--idle", type=float, default=600.0, help="simulated idle seconds between bursts")
+    parser.add_argument("--slots", type=int, default=1, help="KV-cache slots in the mock (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--time-scale", type=float, default=0.0, help="sleep for simulated durations (0 = no)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    results = [
+        ("before (legacy layout, default keep_alive)", run(LegacyLayoutService, None, args)),
+        ("after (system prefix, keep_alive=30m)", run(LlamaService, "30m", args)),
+    ]
+
+    print(f"{'layout':<44}{'prompt tok':>11}{'evaluated':>11}{'reused':>8}{'eval s':>9}{'load s':>8}")
+    for name, stats in results:
+        reused = 1 - stats["prompt_eval_count"] / stats["prompt_tokens"]
+        print(
+            f"{name:<44}{stats['prompt_tokens']:>11}{stats['prompt_eval_count']:>11}"
+            f"{reused:>8.0%}{stats['prompt_eval_seconds']:>9.1f}{stats['load_seconds']:>8.1f}"
+        )
+    requests = results[0][1]["requests"]
+    print(f"\n{requests} requests per run; times are simulated prompt-eval and model-load seconds.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Model routing benchmark: every query on the large model vs the small model
+for simple query types vs that plus the downgrade under load, measured
+against a mock Ollama serving both models.
+
+Run from the repository root:
+
+    python benchmarks/bench_routing.py [--requests 300] [--concurrency 12] [--small-speed 3]
+
+Queries come from the load test workload (benchmarks/workloads/default.jsonl)
+and are classified and dispatched like /chat does. The small model runs
+--small-speed times faster than the large one. "GPU s" is the simulated
+Ollama compute time (prompt evaluation plus generation) summed over all
+calls, i.e. the cost of serving the run.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from benchmarks import workload  # noqa: E402
+from benchmarks.mock_ollama import MockOllamaServer  # noqa: E402
+from llama_service import LlamaService  # noqa: E402
+from model_router import ModelRouter  # noqa: E402
+
+LARGE_MODEL = "llama3.2:latest"
+SMALL_MODEL = "llama3.2:1b"
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def run(queries, router, args):
+    server = MockOllamaServer(
+        models=(LARGE_MODEL, SMALL_MODEL), speeds={SMALL_MODEL: args.small_speed},
+        slots=args.slots, load_time=0, time_scale=args.time_scale,
+    ).start()
+    # No cache, answer store or knowledge base: every query is a generation
+    service = LlamaService(LARGE_MODEL, hosts=[server.url], keep_alive="-1", router=router)
+    latencies = {}
+    lock = threading.Lock()
+
+    def one(item):
+        query_type, message = item
+        started = time.monotonic()
+        app.ask_llama(query_type, message, service=service)
+        with lock:
+            latencies.setdefault(query_type, []).append(time.monotonic() - started)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(one, queries))
+    elapsed = time.monotonic() - started
+
+    per_model = server.mock.stats["models"]
+    service.pool.stop()
+    server.stop()
+    everything = [latency for values in latencies.values() for latency in values]
+    return {
+        "throughput": len(queries) / elapsed,
+        "p50": percentile(everything, 50),
+        "p95": percentile(everything, 95),
+        "emergency_p95": percentile(latencies["emergency"], 95) if "emergency" in latencies else None,
+        "small_share": per_model.get(SMALL_MODEL, {}).get("requests", 0) / len(queries),
+        "gpu_seconds": sum(model["seconds"] for model in per_model.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workload", default=workload.DEFAULT_PATH, help="JSON lines file of queries")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=12, help="client threads")
+    parser.add_argument("--slots", type=int, default=4, help="parallel generations in the mock Ollama")
+    parser.add_argument("--small-speed", type=float, default=3.0, help="small model speed relative to the large one")
+    parser.add_argument("--downgrade-depth", type=int, default=8, help="LLM_DOWNGRADE_QUEUE_DEPTH for the last run")
+    parser.add_argument("--time-scale", type=float, default=0.02, help="scale for simulated durations")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    queries = []
+    for item in workload.load(args.workload):
+        query_type, _ = app.analyze_query(item["message"])
+        if query_type != "greeting":
+            # Numbered so identical questions are not merged by single-flight
+            queries.append((query_type, f"{item['message']} ({len(queries)})"))
+        if len(queries) == args.requests:
+            break
+
+    results = [
+        ("one model", run(queries, None, args)),
+        ("small model for simple types", run(queries, ModelRouter(LARGE_MODEL, SMALL_MODEL), args)),
+        (f"+ downgrade at depth {args.downgrade_depth}",
+         run(queries, ModelRouter(LARGE_MODEL, SMALL_MODEL, downgrade_depth=args.downgrade_depth), args)),
+    ]
+
+    print(f"{'routing':<34}{'req/s':>7}{'p50 s':>8}{'p95 s':>8}{'emerg p95':>11}{'small':>7}{'GPU s':>8}")
+    for name, r in results:
+        emergency = f"{r['emergency_p95']:.2f}" if r["emergency_p95"] is not None else "-"
+        print(
+            f"{name:<34}{r['throughput']:>7.1f}{r['p50']:>8.2f}{r['p95']:>8.2f}"
+            f"{emergency:>11}{r['small_share']:>7.0%}{r['gpu_seconds']:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark: conversation session memory and prompt growth.
+
+Run from the repository root:
+
+    python benchmarks/bench_sessions.py [--sessions 10000] [--turns 6]
+
+Reports the memory held per 1000 sessions (measured with tracemalloc and
+as estimated by SessionStore.stats()), and the history tokens sent with
+each turn of a long conversation when resending everything vs with the
+trimmed, summarized history.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+from sessions import SessionStore, estimate_tokens  # noqa: E402
+
+QUESTIONS = [
+    "what are the symptoms of dengue",
+    "what about for children?",
+    "how long does the fever last",
+    "when should we go to the hospital",
+    "how to prevent it during monsoon",
+    "is there a vaccine",
+    "what should she eat while recovering",
+    "can it happen again next year",
+]
+
+# A typical generated answer, about 450 tokens
+ANSWER = (
+    "Dengue usually starts with a sudden high fever, severe headache and pain behind the eyes. "
+    "Many people also have joint and muscle pain, nausea and a rash a few days later. "
+    + "Keep drinking fluids, rest, and use paracetamol for fever; avoid aspirin and ibuprofen. " * 20
+    + "This information is for educational purposes only; consult a healthcare provider."
+)
+
+
+def new_store(sessions):
+    return SessionStore(
+        max_sessions=sessions,
+        history_tokens=config.SESSION_HISTORY_TOKENS,
+        summary_tokens=config.SESSION_SUMMARY_TOKENS,
+    )
+
+
+def bench_memory(sessions, turns):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = new_store(sessions)
+    started = time.perf_counter()
+    for number in range(sessions):
+        session_id = f"session-{number:08d}"
+        for turn in range(turns):
+            # Distinct text per session, as real conversations are
+            store.append(session_id, f"{QUESTIONS[turn % len(QUESTIONS)]} ({number})", f"{ANSWER} [{number}]")
+    elapsed = time.perf_counter() - started
+    measured = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    stats = store.stats()
+    print(f"{sessions} sessions x {turns} turns, {elapsed / (sessions * turns) * 1e6:.1f} us per turn")
+    print(f"  measured (tracemalloc): {measured / sessions * 1000 / 1024:.0f} KiB per 1000 sessions")
+    print(f"  estimated (stats):      {stats['bytes_per_1000_sessions'] / 1024:.0f} KiB per 1000 sessions")
+
+
+def bench_prompt_growth(turns):
+    store = new_store(1)
+    full_history = 0
+    print(f"\n{'turn':>4}{'resend all':>12}{'trimmed':>10}")
+    for turn in range(turns):
+        question = QUESTIONS[turn % len(QUESTIONS)]
+        trimmed = sum(estimate_tokens(message["content"]) for message in store.history("conversation"))
+        print(f"{turn + 1:>4}{full_history:>12}{trimmed:>10}")
+        store.append("conversation", question, ANSWER)
+        full_history += estimate_tokens(question) + estimate_tokens(ANSWER)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10000, help="sessions to create")
+    parser.add_argument("--turns", type=int, default=6, help="turns per session")
+    args = parser.parse_args()
+
+    bench_memory(args.sessions, args.turns)
+    bench_prompt_growth(12)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark: precomputed static JSON endpoints vs jsonify per request.
+
+Run from the repository root:
+
+    python benchmarks/bench_static.py [--repeat 20000] [--polls 100]
+
+Reports the time to build a /vaccination-schedule and /health-alert
+response (jsonify on every hit, as before, vs the precomputed payload),
+the body size per content encoding, and the bytes a client polling an
+unchanged endpoint receives with and without ETag revalidation.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from flask import jsonify  # noqa: E402
+
+ENDPOINTS = [
+    ("/vaccination-schedule", lambda: app.VACCINATION_SCHEDULE, app.VACCINATION_SCHEDULE_PAYLOAD),
+    ("/health-alert", lambda: app.HEALTH_ALERTS.current().data, app.HEALTH_ALERTS),
+]
+
+
+def per_call_us(fn, repeat):
+    return min(timeit.repeat(fn, number=repeat, repeat=3)) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20000)
+    parser.add_argument("--polls", type=int, default=100, help="polls of an unchanged endpoint")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f"{'endpoint':<24}{'jsonify us':>12}{'precomputed us':>16}{'304 us':>9}")
+    for path, data, payload in ENDPOINTS:
+        etag = dict(payload.respond(accept_encoding="br, gzip")[1])["ETag"]
+        with app.app.test_request_context(path, headers={"Accept-Encoding": "gzip, deflate, br"}):
+            old = per_call_us(lambda: jsonify(data()), args.repeat)
+            new = per_call_us(lambda: app.static_json(payload), args.repeat)
+        with app.app.test_request_context(path, headers={"Accept-Encoding": "gzip, deflate, br", "If-None-Match": etag}):
+            cached = per_call_us(lambda: app.static_json(payload), args.repeat)
+        print(f"{path:<24}{old:>12.1f}{new:>16.1f}{cached:>9.1f}")
+
+    print(f"\n{'endpoint':<24}{'identity B':>12}{'gzip B':>9}{'br B':>7}"
+          f"{f'{args.polls} polls, before':>24}{'with ETags + br':>17}")
+    for path, data, payload in ENDPOINTS:
+        sizes = payload.stats()
+        identity = sizes.get("identity_bytes", 0)
+        compressed = sizes.get("br_bytes", sizes.get("gzip_bytes", identity))
+        # Before: the full uncompressed body on every poll. After: one compressed
+        # body, then an empty 304 for each poll while the data is unchanged
+        print(f"{path:<24}{identity:>12}{sizes.get('gzip_bytes', '-'):>9}{sizes.get('br_bytes', '-'):>7}"
+              f"{identity * args.polls:>24}{compressed:>17}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Wire size benchmark: bytes per /chat and /chat/stream response in the
+original format (ASCII-escaped JSON, uncompressed) vs the compact format,
+gzip and brotli.
+
+Run from the repository root:
+
+    python benchmarks/bench_wire.py [--requests 200]
+
+Static answers are measured with Ollama unreachable, so every question
+from the load test workload gets its fallback; LLM answers come from a
+mock Ollama returning a typical markdown answer. "2G ms" is the transfer
+time of the average body at 40 kbit/s, without protocol overhead.
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_ollama import MockOllamaServer  # noqa: E402
+
+# A typical LLM answer: markdown, bullets and emoji
+LLM_ANSWER = """🦟 **Dengue Fever**
+
+Dengue is a viral infection spread by the bite of infected *Aedes* mosquitoes, which bite mostly during the day.
+
+**Key symptoms to watch for:**
+• Sudden high fever (up to 40°C / 104°F)
+• Severe headache and pain behind the eyes
+• Muscle and joint pain ("breakbone fever")
+• Nausea, vomiting and skin rash
+
+**Prevention tips:**
+• Empty or cover water containers around your home every week 🪣
+• Use mosquito nets and repellents, especially during the day
+• Wear long sleeves and trousers
+
+**When to seek help:** 🏥 Go to a health centre right away if you notice bleeding gums, blood in vomit or stool, severe stomach pain or extreme tiredness.
+
+⚠️ *This information is for educational purposes only and is not a substitute for professional medical advice. In an emergency call 108.*"""
+
+BITS_PER_SECOND_2G = 40_000
+
+
+def legacy_size(payload):
+    """Size of payload as the original /chat sent it (Flask's jsonify: ASCII escapes)"""
+    return len(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+def legacy_stream_size(lines):
+    """Size of a stream's lines as the original /chat/stream sent them"""
+    return sum(len((json.dumps(line) + "\n").encode("utf-8")) for line in lines)
+
+
+def decode(response):
+    encoding = response.headers.get("Content-Encoding")
+    if encoding == "gzip":
+        return gzip.decompress(response.data)
+    if encoding == "br":
+        import brotli
+        return brotli.decompress(response.data)
+    return response.data
+
+
+def measure(client, messages, path, compact, accept_encoding):
+    """Total wire bytes, and the total in the original format, for messages sent to path"""
+    total = legacy = 0
+    for message in messages:
+        response = client.post(
+            path, json={"message": message, "compact": compact},
+            headers={"Accept-Encoding": accept_encoding},
+        )
+        total += len(response.data)
+        body = decode(response).decode("utf-8")
+        if path == "/chat":
+            payload = json.loads(body)
+            if "template" in payload:
+                continue  # compact runs do not need the original size
+            legacy += legacy_size(payload)
+        else:
+            legacy += legacy_stream_size(json.loads(line) for line in body.splitlines())
+    return total, legacy
+
+
+def report(title, client, messages, path):
+    count = len(messages)
+    # Streams are only ever sent as gzip (see compression.STREAM_ENCODINGS)
+    encodings = ("identity", "gzip", "br") if path == "/chat" else ("identity", "gzip")
+    runs = [
+        (f"{'compact' if compact else 'full text'}, {encoding}", compact, encoding)
+        for compact in (False, True) for encoding in encodings
+    ]
+    print(f"\n{title} ({count} responses)")
+    print(f"{'format':<26}{'bytes/resp':>11}{'vs orig':>9}{'2G ms':>8}")
+    original = None
+    for name, compact, accept_encoding in runs:
+        total, legacy = measure(client, messages, path, compact, accept_encoding)
+        if original is None:
+            original = legacy / count
+            print(f"{'original':<26}{original:>11.0f}{'':>9}{original * 8 / BITS_PER_SECOND_2G * 1000:>8.0f}")
+        average = total / count
+        print(f"{name:<26}{average:>11.0f}{average / original:>9.0%}{average * 8 / BITS_PER_SECOND_2G * 1000:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workload", help="JSON lines file of queries (default: the load test workload)")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with MockOllamaServer(load_time=0, time_scale=0, answer=LLM_ANSWER) as server:
+        # The app (and the knowledge base the workload uses) read their
+        # settings at import time, so import them only now
+        os.environ["OLLAMA_HOSTS"] = server.url
+        os.environ["ANSWER_STORE_PATH"] = ""
+        import app
+        from benchmarks import workload
+        from llama_service import llama_service
+
+        messages = [item["message"] for item in workload.load(args.workload or workload.DEFAULT_PATH)]
+        messages = messages[: args.requests]
+
+        client = app.app.test_client()
+        # Numbered so every question is a new generation, not a cache hit
+        llm_messages = [f"{message} ({number})" for number, message in enumerate(messages)]
+        report("LLM answers, /chat", client, llm_messages[:50], "/chat")
+        report("LLM answers, /chat/stream", client, llm_messages[:50], "/chat/stream")
+
+        for backend in llama_service.pool.backends:
+            backend.health.breaker.trip()
+        report("Static answers (Ollama down), /chat", client, messages, "/chat")
+        report("Static answers (Ollama down), /chat/stream", client, messages, "/chat/stream")
+
+
+if __name__ == "__main__":
+    main()
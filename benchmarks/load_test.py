@@ -0,0 +1,388 @@
+"""
+Load test: throughput, latency percentiles and time to first token for /chat.
+
+Run from the repository root, either against a running server:
+
+    python benchmarks/load_test.py --url http://127.0.0.1:5000
+
+or let it start the mock Ollama server and the app itself:
+
+    python benchmarks/load_test.py --spawn flask --latency 0.05 --error-rate 0.02
+
+Requests replay a workload file (benchmarks/workload.py; default
+benchmarks/workloads/default.jsonl) against /chat and /chat/stream,
+from --concurrency client threads, or at a fixed --rate of arrivals per
+second. With --rate, latency is counted from when a request was due, so
+a server that falls behind is not flattered by clients waiting for it.
+
+Time to first token (TTFT) is when the first text of the answer reaches
+the client: the first token line on /chat/stream, and the whole reply
+on /chat, which sends nothing until the answer is complete.
+
+Results are saved as JSON (default benchmarks/results/<time>-<commit>.json),
+together with the git commit, settings and the server-side counters that
+moved during the run (fallbacks, cache hits, retries, ...). Compare two
+versions with:
+
+    python benchmarks/load_test.py --spawn flask --compare benchmarks/results/baseline.json
+
+which prints the change of every figure and exits with status 1 if one
+got worse by more than --tolerance.
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.mock_ollama import MockOllamaServer  # noqa: E402
+from benchmarks.workload import DEFAULT_PATH, load  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+ENDPOINTS = {"chat": "/chat", "stream": "/chat/stream"}
+_METRIC_RE = re.compile(r"^(chatbot_\w+_total)(?:\{[^}]*\})? ([0-9.eE+-]+)$")
+
+# Figures compared between runs, and whether a higher value is better
+COMPARED = [
+    ("throughput", True),
+    ("error_rate", False),
+    ("latency_ms.p50", False),
+    ("latency_ms.p95", False),
+    ("latency_ms.p99", False),
+    ("ttft_ms.p50", False),
+    ("ttft_ms.p95", False),
+    ("ttft_ms.p99", False),
+]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def distribution(seconds):
+    """p50/p95/p99/mean/max of durations, in milliseconds"""
+    if not seconds:
+        return {}
+    return {
+        "p50": round(percentile(seconds, 50) * 1000, 2),
+        "p95": round(percentile(seconds, 95) * 1000, 2),
+        "p99": round(percentile(seconds, 99) * 1000, 2),
+        "mean": round(sum(seconds) / len(seconds) * 1000, 2),
+        "max": round(max(seconds) * 1000, 2),
+    }
+
+
+class Client:
+    """Keep-alive HTTP connection per client thread"""
+
+    def __init__(self, url, timeout=120.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def _reset(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+        self._local.connection = None
+
+    def get(self, path):
+        connection = self._connection()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self._reset()
+            raise
+
+    def chat(self, path, message, started):
+        """POST one message; returns (ok, seconds to first answer text) measured from started"""
+        body = json.dumps({"message": message})
+        connection = self._connection()
+        try:
+            connection.request("POST", path, body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            if response.status != 200:
+                response.read()
+                return False, None
+            if path == ENDPOINTS["chat"]:
+                ok = "response" in json.loads(response.read())
+                return ok, time.perf_counter() - started
+            first_token, done = None, False
+            for line in iter(response.readline, b""):
+                event = json.loads(line)
+                if first_token is None and "token" in event:
+                    first_token = time.perf_counter() - started
+                done = done or event.get("done", False)
+            return done and first_token is not None, first_token
+        except (OSError, ValueError, http.client.HTTPException):
+            self._reset()
+            return False, None
+
+
+def server_counters(client):
+    """Sum of each chatbot_*_total counter on /metrics, over all label sets"""
+    try:
+        status, body = client.get("/metrics")
+    except (OSError, http.client.HTTPException):
+        return {}
+    counters = {}
+    if status == 200:
+        for line in body.decode("utf-8").splitlines():
+            match = _METRIC_RE.match(line)
+            if match:
+                counters[match.group(1)] = counters.get(match.group(1), 0.0) + float(match.group(2))
+    return counters
+
+
+def run_endpoint(client, endpoint, queries, args):
+    """Replay args.requests queries against one endpoint and summarize the timings"""
+    path = ENDPOINTS[endpoint]
+    warmup = min(args.warmup, len(queries))
+    for query in queries[:warmup]:
+        client.chat(path, query["message"], time.perf_counter())
+
+    count = args.requests or len(queries)
+    latencies, ttfts, by_intent = [], [], {}
+    errors = 0
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def one(number):
+        nonlocal errors
+        query = queries[number % len(queries)]
+        due = started + number / args.rate if args.rate else time.perf_counter()
+        if args.rate:
+            time.sleep(max(0.0, due - time.perf_counter()))
+        ok, ttft = client.chat(path, query["message"], due)
+        latency = time.perf_counter() - due
+        with lock:
+            if not ok:
+                errors += 1
+                return
+            latencies.append(latency)
+            ttfts.append(ttft)
+            by_intent.setdefault(query.get("intent", "unknown"), []).append(latency)
+
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(one, range(count)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4),
+        "seconds": round(elapsed, 3),
+        "throughput": round((count - errors) / elapsed, 2),
+        "latency_ms": distribution(latencies),
+        "ttft_ms": distribution(ttfts),
+        "by_intent": {
+            intent: {"requests": len(values), **distribution(values)}
+            for intent, values in sorted(by_intent.items())
+        },
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_app(server, ollama_url):
+    """Start the app (Flask or ASGI) on a free port, pointed at the mock Ollama"""
+    port = free_port()
+    env = dict(os.environ, OLLAMA_HOSTS=ollama_url)
+    if server == "flask":
+        command = [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port),
+                   "--no-reload", "--no-debugger", "--with-threads"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "asgi:application", "--port", str(port),
+                   "--log-level", "warning"]
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    client = Client(url, timeout=2.0)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{server} server exited with status {process.returncode}")
+        try:
+            if client.get("/healthz")[0] in (200, 503):
+                return process, url
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{server} server did not start within 60s")
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def lookup(result, dotted):
+    for key in dotted.split("."):
+        result = (result or {}).get(key)
+    return result
+
+
+def compare(baseline, current, tolerance):
+    """Print the change of every compared figure; returns the regressions"""
+    regressions = []
+    print(f"\nvs {baseline.get('revision', '?')} ({baseline.get('created', '?')})")
+    changed = sorted(
+        key for key in set(baseline.get("settings", {})) | set(current["settings"])
+        if baseline.get("settings", {}).get(key) != current["settings"].get(key)
+    )
+    if changed:
+        print(f"Note: settings differ ({', '.join(changed)}), so the runs are not strictly comparable")
+    print(f"{'figure':<30}{'before':>12}{'after':>12}{'change':>10}")
+    for endpoint in current["endpoints"]:
+        for figure, higher_is_better in COMPARED:
+            before = lookup(baseline.get("endpoints", {}).get(endpoint), figure)
+            after = lookup(current["endpoints"][endpoint], figure)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else (0.0 if after == before else float("inf"))
+            worse = -change if higher_is_better else change
+            # Error rates are compared in absolute terms, as they are usually near zero
+            if figure == "error_rate":
+                worse = before - after if higher_is_better else after - before
+            flag = "  REGRESSION" if worse > tolerance else ""
+            name = f"{endpoint} {figure}"
+            print(f"{name:<30}{before:>12}{after:>12}{change:>+10.1%}{flag}")
+            if flag:
+                regressions.append(name)
+    return regressions
+
+
+def print_summary(endpoint, summary):
+    latency, ttft = summary["latency_ms"], summary["ttft_ms"]
+    print(
+        f"{ENDPOINTS[endpoint]:<14}{summary['requests']:>7}{summary['errors']:>7}{summary['throughput']:>8.1f}"
+        + "".join(f"{latency.get(p, 0):>9.1f}" for p in ("p50", "p95", "p99"))
+        + "".join(f"{ttft.get(p, 0):>9.1f}" for p in ("p50", "p95", "p99"))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://127.0.0.1:5000", help="running server to test")
+    target.add_argument("--spawn", choices=["flask", "asgi"], help="start the mock Ollama and this app server")
+    parser.add_argument("--workload", default=DEFAULT_PATH, help="JSON lines file from benchmarks/workload.py")
+    parser.add_argument("--endpoint", choices=["chat", "stream", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=0, help="requests per endpoint (default: the whole workload)")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads")
+    parser.add_argument("--rate", type=float, default=0.0, help="arrivals per second (default: as fast as clients go)")
+    parser.add_argument("--warmup", type=int, default=20, help="requests sent first and not measured")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change counted as a regression")
+    mock_options = parser.add_argument_group("mock Ollama (with --spawn)")
+    mock_options.add_argument("--latency", type=float, default=0.0, help="extra seconds per Ollama request")
+    mock_options.add_argument("--jitter", type=float, default=0.5, help="latency varies by up to this fraction")
+    mock_options.add_argument("--eval-rate", type=float, default=25.0, help="generated tokens/s")
+    mock_options.add_argument("--prompt-eval-rate", type=float, default=400.0, help="prompt tokens/s")
+    mock_options.add_argument("--error-rate", type=float, default=0.0, help="share of Ollama requests failing with 500")
+    mock_options.add_argument("--drop-rate", type=float, default=0.0, help="share of streams cut off halfway")
+    mock_options.add_argument("--slots", type=int, default=4, help="parallel generations (OLLAMA_NUM_PARALLEL)")
+    mock_options.add_argument("--time-scale", type=float, default=0.1, help="scale for simulated durations")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    queries = load(args.workload)
+    settings = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    settings["workload_queries"] = len(queries)
+
+    mock_server = app_process = None
+    url = args.url
+    if args.spawn:
+        mock_server = MockOllamaServer(
+            load_time=0, slots=args.slots, time_scale=args.time_scale, eval_rate=args.eval_rate,
+            prompt_eval_rate=args.prompt_eval_rate, latency=args.latency, jitter=args.jitter,
+            error_rate=args.error_rate, drop_rate=args.drop_rate, seed=0,
+        ).start()
+        app_process, url = spawn_app(args.spawn, mock_server.url)
+    else:
+        for key in [action.dest for action in mock_options._group_actions]:
+            settings.pop(key)
+
+    client = Client(url)
+    endpoints = ["chat", "stream"] if args.endpoint == "both" else [args.endpoint]
+    result = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "settings": settings,
+        "endpoints": {},
+    }
+    try:
+        before = server_counters(client)
+        print(f"{'endpoint':<14}{'reqs':>7}{'errors':>7}{'req/s':>8}"
+              f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'ttft50':>9}{'ttft95':>9}{'ttft99':>9}")
+        for endpoint in endpoints:
+            result["endpoints"][endpoint] = run_endpoint(client, endpoint, queries, args)
+            print_summary(endpoint, result["endpoints"][endpoint])
+        after = server_counters(client)
+        result["server_counters"] = {
+            name: round(value - before.get(name, 0.0), 3) for name, value in sorted(after.items())
+            if value != before.get(name, 0.0)
+        }
+        if mock_server is not None:
+            result["mock_ollama"] = dict(mock_server.mock.stats)
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait()
+        if mock_server is not None:
+            mock_server.stop()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{result['revision']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), result, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+"""
+Local mock of the Ollama HTTP API for benchmarks.
+
+Implements GET /api/tags and POST /api/chat (streaming and blocking) and
+models what matters for latency:
+
+* prompt evaluation at prompt_eval_rate tokens/s, minus the longest prefix
+  already held in one of `slots` KV caches (Ollama reuses a slot's cache
+  for a shared prompt prefix);
+* generation at eval_rate tokens/s, up to num_predict tokens; `speeds`
+  maps a model name to a multiplier of both rates (a 1B model runs about
+  three times faster than a 3B one);
+* model residency: after keep_alive expires (default 5m) the next request
+  pays load_time and starts with empty caches;
+* parallelism: at most `slots` requests are served at once (like
+  OLLAMA_NUM_PARALLEL), the rest wait;
+* network and scheduling overhead: `latency` seconds per request, varied
+  by up to +/- `jitter` of itself;
+* failures: a share `error_rate` of chat requests gets a 500, and a share
+  `drop_rate` of streams is cut off halfway through the answer.
+
+Durations are reported in Ollama's fields (prompt_eval_count,
+prompt_eval_duration, eval_count, ...) and slept for real, scaled by
+time_scale (0 = report only, do not sleep).
+
+Run standalone:
+
+    python benchmarks/mock_ollama.py --port 11434
+    python benchmarks/mock_ollama.py --model llama3.2:latest --model llama3.2:1b=3
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]|\s+")
+
+DEFAULT_ANSWER = (
+    "Stay hydrated, rest, and watch for warning signs such as high fever, "
+    "difficulty breathing or confusion. This information is for educational "
+    "purposes only; consult a healthcare provider for diagnosis and treatment, "
+    "and call 108 in an emergency."
+)
+
+
+def tokenize(text):
+    """Rough stand-in for a BPE tokenizer: words, punctuation and whitespace runs"""
+    return _TOKEN_RE.findall(text)
+
+
+def render_chat(messages):
+    """Flatten chat messages the way a chat template would, before tokenizing"""
+    return "".join(
+        f"<|{message.get('role', 'user')}|>\n{message.get('content', '')}<|end|>\n"
+        for message in messages
+    ) + "<|assistant|>\n"
+
+
+def parse_keep_alive(value, default=300.0):
+    """Seconds a model stays loaded; negative means forever"""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)\s*([smh]?)", str(value).strip())
+    if not match:
+        return default
+    number, unit = float(match.group(1)), match.group(2)
+    return number * {"": 1, "s": 1, "m": 60, "h": 3600}[unit]
+
+
+def common_prefix(a, b):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class MockOllama:
+    """Simulated model state shared by all request handler threads"""
+
+    def __init__(self, models=("llama3.2:latest",), prompt_eval_rate=400.0, eval_rate=25.0,
+                 slots=4, load_time=2.0, time_scale=1.0, answer=DEFAULT_ANSWER,
+                 latency=0.0, jitter=0.0, error_rate=0.0, drop_rate=0.0, seed=None, speeds=None):
+        self.models = list(models)
+        self.speeds = dict(speeds or {})
+        self.prompt_eval_rate = prompt_eval_rate
+        self.eval_rate = eval_rate
+        self.load_time = load_time
+        self.time_scale = time_scale
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self._random = random.Random(seed)
+        self.answer_tokens = tokenize(answer)
+        self._slots = [[] for _ in range(slots)]
+        self._slot_used = [0.0] * slots
+        self._loaded_until = 0.0
+        self._clock_offset = 0.0
+        self._lock = threading.Lock()
+        self.busy = threading.Semaphore(slots)
+        self.down = False  # set to simulate an outage: every request gets 503
+        self.reset_stats()
+
+    def now(self):
+        return time.monotonic() + self._clock_offset
+
+    def advance(self, seconds):
+        """Pretend the server sat idle, e.g. to let keep_alive expire"""
+        with self._lock:
+            self._clock_offset += seconds
+
+    def reset_stats(self):
+        self.stats = {
+            "requests": 0,
+            "prompt_tokens": 0,
+            "prompt_eval_count": 0,
+            "prompt_eval_seconds": 0.0,
+            "eval_count": 0,
+            "eval_seconds": 0.0,
+            "load_seconds": 0.0,
+            "cancelled": 0,
+            "errors": 0,
+            "dropped": 0,
+            "models": {},  # per model: requests and seconds of prompt evaluation plus generation
+        }
+
+    def roll(self):
+        """Draw this request's fate: (overhead seconds, fail with a 500, drop the stream midway)"""
+        with self._lock:
+            overhead = self.latency * (1 + self.jitter * self._random.uniform(-1, 1))
+            fail = self._random.random() < self.error_rate
+            drop = not fail and self._random.random() < self.drop_rate
+            if fail:
+                self.stats["errors"] += 1
+            elif drop:
+                self.stats["dropped"] += 1
+        return max(overhead, 0.0), fail, drop
+
+    def plan(self, messages, options, keep_alive, model=None):
+        """Work out the cost of one chat request and update the slot caches"""
+        tokens = tokenize(render_chat(messages))
+        now = self.now()
+        with self._lock:
+            load = 0.0
+            if now > self._loaded_until:
+                load = self.load_time
+                self._slots = [[] for _ in self._slots]
+            ttl = parse_keep_alive(keep_alive)
+            self._loaded_until = float("inf") if ttl < 0 else now + ttl
+
+            # Reuse the slot with the longest matching prefix, else the least recently used
+            best = max(range(len(self._slots)), key=lambda i: (common_prefix(self._slots[i], tokens), -self._slot_used[i]))
+            reused = common_prefix(self._slots[best], tokens)
+            if reused == 0:
+                best = min(range(len(self._slots)), key=lambda i: self._slot_used[i])
+            self._slots[best] = tokens
+            self._slot_used[best] = now
+
+            num_predict = (options or {}).get("num_predict", -1)
+            eval_count = len(self.answer_tokens) if num_predict is None or num_predict < 0 else min(num_predict, len(self.answer_tokens))
+            prompt_eval_count = max(len(tokens) - reused, 1)
+            speed = self.speeds.get(model, 1.0)
+            cost = {
+                "load_duration": load,
+                "prompt_eval_count": prompt_eval_count,
+                "prompt_eval_duration": prompt_eval_count / (self.prompt_eval_rate * speed),
+                "eval_count": eval_count,
+                "eval_duration": eval_count / (self.eval_rate * speed),
+                "token_interval": 1 / (self.eval_rate * speed),
+            }
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += len(tokens)
+            self.stats["prompt_eval_count"] += prompt_eval_count
+            self.stats["prompt_eval_seconds"] += cost["prompt_eval_duration"]
+            self.stats["eval_count"] += eval_count
+            self.stats["eval_seconds"] += cost["eval_duration"]
+            self.stats["load_seconds"] += load
+            per_model = self.stats["models"].setdefault(model, {"requests": 0, "seconds": 0.0})
+            per_model["requests"] += 1
+            per_model["seconds"] += cost["prompt_eval_duration"] + cost["eval_duration"]
+        return cost
+
+    def sleep(self, seconds):
+        if self.time_scale > 0 and seconds > 0:
+            time.sleep(seconds * self.time_scale)
+
+
+def _ns(seconds):
+    return int(seconds * 1e9)
+
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if mock.down:
+                self._send_json(503, {"error": "server unavailable"})
+            elif self.path == "/api/tags":
+                self._send_json(200, {"models": [{"name": m, "model": m} for m in mock.models]})
+            elif self.path == "/":
+                self._send_json(200, {"status": "Ollama is running"})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if mock.down:
+                self._send_json(503, {"error": "server unavailable"})
+                return
+            if self.path != "/api/chat":
+                self._send_json(404, {"error": "not found"})
+                return
+            if request.get("model") not in mock.models:
+                self._send_json(404, {"error": f"model '{request.get('model')}' not found"})
+                return
+            overhead, fail, drop = mock.roll()
+            mock.sleep(overhead)
+            if fail:
+                self._send_json(500, {"error": "simulated server error"})
+                return
+            with mock.busy:
+                self._chat(request, drop)
+
+        def _chat(self, request, drop=False):
+            started = time.monotonic()
+            cost = mock.plan(request.get("messages", []), request.get("options"), request.get("keep_alive"),
+                             request.get("model"))
+            mock.sleep(cost["load_duration"] + cost["prompt_eval_duration"])
+            tokens = mock.answer_tokens[: cost["eval_count"]]
+            final = {
+                "model": request["model"],
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "done": True,
+                "done_reason": "stop",
+                "load_duration": _ns(cost["load_duration"]),
+                "prompt_eval_count": cost["prompt_eval_count"],
+                "prompt_eval_duration": _ns(cost["prompt_eval_duration"]),
+                "eval_count": cost["eval_count"],
+                "eval_duration": _ns(cost["eval_duration"]),
+            }
+
+            if request.get("stream", True):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for number, token in enumerate(tokens):
+                        if drop and number == len(tokens) // 2:
+                            # Simulated crash mid-answer: end the connection without the final chunk
+                            self.close_connection = True
+                            return
+                        mock.sleep(cost["token_interval"])
+                        self._write_chunk({
+                            "model": request["model"],
+                            "created_at": final["created_at"],
+                            "message": {"role": "assistant", "content": token},
+                            "done": False,
+                        })
+                    final["message"] = {"role": "assistant", "content": ""}
+                    final["total_duration"] = _ns(time.monotonic() - started)
+                    self._write_chunk(final)
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client went away; like Ollama, stop generating
+                    with mock._lock:
+                        mock.stats["cancelled"] += 1
+                    self.close_connection = True
+            else:
+                mock.sleep(cost["eval_duration"])
+                final["message"] = {"role": "assistant", "content": "".join(tokens)}
+                final["total_duration"] = _ns(time.monotonic() - started)
+                self._send_json(200, final)
+
+        def _write_chunk(self, payload):
+            data = (json.dumps(payload) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+class MockOllamaServer:
+    """Runs a MockOllama on a background thread; use as a context manager"""
+
+    def __init__(self, host="127.0.0.1", port=0, **mock_options):
+        self.mock = MockOllama(**mock_options)
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.mock))
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Ollama server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", action="append", dest="models",
+                        help="model name to advertise, optionally with a speed multiplier: name=3 (repeatable)")
+    parser.add_argument("--prompt-eval-rate", type=float, default=400.0, help="prompt tokens/s")
+    parser.add_argument("--eval-rate", type=float, default=25.0, help="generated tokens/s")
+    parser.add_argument("--slots", type=int, default=4, help="parallel KV-cache slots")
+    parser.add_argument("--load-time", type=float, default=2.0, help="seconds to load the model")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiply simulated sleeps (0 = no sleeping)")
+    parser.add_argument("--latency", type=float, default=0.0, help="extra seconds per request (network, scheduling)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="vary latency by up to this fraction of itself")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of chat requests answered with a 500")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="share of streams cut off halfway")
+    parser.add_argument("--seed", type=int, help="random seed for latency jitter and failures")
+    args = parser.parse_args()
+
+    models, speeds = [], {}
+    for spec in args.models or ["llama3.2:latest"]:
+        name, _, speed = spec.partition("=")
+        models.append(name)
+        if speed:
+            speeds[name] = float(speed)
+    server = MockOllamaServer(
+        args.host,
+        args.port,
+        models=models,
+        speeds=speeds,
+        prompt_eval_rate=args.prompt_eval_rate,
+        eval_rate=args.eval_rate,
+        slots=args.slots,
+        load_time=args.load_time,
+        time_scale=args.time_scale,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        drop_rate=args.drop_rate,
+        seed=args.seed,
+    )
+    print(f"Mock Ollama listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Replayable workload of realistic chatbot queries for load tests.
+
+Run from the repository root:
+
+    python benchmarks/workload.py [-n 1000] [--seed 2026] [-o benchmarks/workloads/default.jsonl]
+
+Queries cover the intents get_medical_response handles (greeting,
+emergency, symptom, prevention, vaccination, and general questions,
+including questions about a named disease), in the mix given by MIX.
+Templates are filled from the knowledge base, so the names, symptoms and
+vaccines asked about are the ones the app knows. Within each intent a few
+questions are asked far more often than the rest (Zipf-distributed, as
+real traffic is), so caches see a realistic share of repeats. Case and
+punctuation vary the way users type.
+
+The same seed and knowledge base always give the same queries; save them
+with -o to replay exactly the same workload against later versions. Each
+line is {"intent": "...", "message": "..."}.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from itertools import accumulate
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_base import knowledge_base  # noqa: E402
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workloads", "default.jsonl")
+
+# Share of each intent in the workload
+MIX = {
+    "symptom": 0.30,
+    "general": 0.15,
+    "disease": 0.12,
+    "prevention": 0.15,
+    "vaccination": 0.12,
+    "greeting": 0.10,
+    "emergency": 0.06,
+}
+
+TEMPLATES = {
+    "symptom": [
+        "i have {symptom}",
+        "i have {symptom} and {symptom2}",
+        "experiencing {symptom} since yesterday",
+        "feeling {symptom} and tired",
+        "my child has {symptom}",
+        "what does {symptom} mean",
+        "{symptom} and {symptom2} for two days, what should i do",
+        "what are the symptoms of {condition}",
+    ],
+    "general": [
+        "what should i eat to keep my blood pressure under control",
+        "how much water should i drink every day",
+        "is it safe to take paracetamol every day",
+        "how many hours of sleep do adults need",
+        "what is a normal blood sugar level",
+        "which vitamins are good for children",
+        "how can i lose weight safely",
+        "is walking good for the heart",
+        "what is the treatment for {condition}",
+        "can {condition} be cured",
+        "is {condition} contagious",
+    ],
+    "disease": [
+        "what is {condition}",
+        "tell me about {condition}",
+        "information about {condition}",
+        "{condition}",
+        "how is {condition} diagnosed",
+    ],
+    "prevention": [
+        "how to prevent {condition}",
+        "{condition} prevention tips",
+        "how to avoid {condition} during monsoon",
+        "how to protect my family from {condition}",
+        "tips to stay healthy",
+        "how to stay healthy in summer",
+    ],
+    "vaccination": [
+        "vaccination schedule for my baby",
+        "vaccination schedule for children",
+        "which vaccines do adults need",
+        "when is the {vaccine} vaccine given",
+        "{vaccine} vaccine",
+        "is the {vaccine} vaccine safe",
+        "vaccine for {condition}",
+    ],
+    "greeting": [
+        "hello",
+        "hi",
+        "hey there",
+        "namaste",
+        "hello doctor",
+    ],
+    "emergency": [
+        "severe chest pain, help me",
+        "emergency: my father collapsed",
+        "urgent, my child swallowed medicine",
+        "severe bleeding that will not stop",
+        "critical breathing problem, what to do",
+        "severe allergic reaction and swelling",
+    ],
+}
+
+
+def expand(template: str, rng: random.Random) -> List[str]:
+    """Every question a template yields, with slots filled from the knowledge base"""
+    conditions = list(knowledge_base.conditions)
+    symptoms = list(knowledge_base.symptoms)
+    vaccines = [vaccine["name"] for vaccine in knowledge_base.vaccines]
+    if "{symptom2}" in template:
+        pairs = [rng.sample(symptoms, 2) for _ in range(len(symptoms))] if len(symptoms) > 1 else []
+        return [template.format(symptom=a, symptom2=b) for a, b in pairs]
+    if "{symptom}" in template:
+        return [template.format(symptom=symptom) for symptom in symptoms]
+    if "{condition}" in template:
+        return [template.format(condition=condition) for condition in conditions]
+    if "{vaccine}" in template:
+        return [template.format(vaccine=vaccine) for vaccine in vaccines]
+    return [template]
+
+
+def question_pool(intent: str, rng: random.Random) -> List[str]:
+    """All distinct questions for an intent, in a seeded order of popularity"""
+    pool = sorted({question for template in TEMPLATES[intent] for question in expand(template, rng)})
+    rng.shuffle(pool)
+    return pool
+
+
+def restyle(message: str, rng: random.Random) -> str:
+    """Vary case and punctuation the way users type"""
+    roll = rng.random()
+    if roll < 0.3:
+        message = message[:1].upper() + message[1:]
+    elif roll < 0.35:
+        message = message.upper()
+    if rng.random() < 0.3:
+        message += "?"
+    return message
+
+
+def generate(count: int, seed: int = 2026, mix: Dict[str, float] = None, zipf: float = 1.1) -> List[Dict[str, str]]:
+    """count queries drawn from the intent mix; zipf sets how skewed popularity is (0 = uniform)"""
+    rng = random.Random(seed)
+    mix = mix or MIX
+    intents = list(mix)
+    intent_weights = list(accumulate(mix[intent] for intent in intents))
+    pools = {intent: question_pool(intent, rng) for intent in intents}
+    pool_weights = {
+        intent: list(accumulate(1 / (rank + 1) ** zipf for rank in range(len(pool))))
+        for intent, pool in pools.items()
+    }
+
+    queries = []
+    for _ in range(count):
+        intent = rng.choices(intents, cum_weights=intent_weights)[0]
+        message = rng.choices(pools[intent], cum_weights=pool_weights[intent])[0]
+        queries.append({"intent": intent, "message": restyle(message, rng)})
+    return queries
+
+
+def save(queries: List[Dict[str, str]], path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for query in queries:
+            f.write(json.dumps(query) + "\n")
+
+
+def load(path: str) -> List[Dict[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--count", type=int, default=1000, help="queries to generate")
+    parser.add_argument("--seed", type=int, default=2026)
+    parser.add_argument("--zipf", type=float, default=1.1, help="popularity skew within an intent (0 = uniform)")
+    parser.add_argument("-o", "--output", help="JSON lines file to write (default: stdout)")
+    args = parser.parse_args()
+
+    queries = generate(args.count, args.seed, zipf=args.zipf)
+    if args.output:
+        save(queries, args.output)
+        distinct = len({query["message"].lower().rstrip("?") for query in queries})
+        print(f"Wrote {len(queries)} queries ({distinct} distinct) to {args.output}")
+    else:
+        for query in queries:
+            print(json.dumps(query))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import gzip
+import zlib
+from typing import Iterable, Iterator, Optional, Union
+
+try:
+    import brotli
+except ImportError:  # optional: pip install Brotli
+    brotli = None
+
+# Content codings we can produce, most preferred first (brotli compresses JSON and text best)
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Codings for streams, which are flushed after every token: brotli's cost per
+# flush outweighs its better compression there (a token stream sent as br is
+# about a third larger than as gzip)
+STREAM_ENCODINGS = ("gzip",)
+
+# Levels for responses compressed per request: most of the size reduction of
+# the maximum levels for a small fraction of their CPU time
+DYNAMIC_LEVELS = {"br": 5, "gzip": 6}
+
+# Content types worth compressing (images and the like already are)
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript")
+
+
+def parse_accept_encoding(header: Optional[str]) -> dict:
+    """Accept-Encoding header -> {coding: quality}"""
+    qualities = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def negotiate(accept_encoding: Optional[str], available=ENCODINGS) -> Optional[str]:
+    """
+    Best of the available codings the client accepts, or None for identity.
+
+    The client's quality values decide; on a tie our order in available
+    does. "*" covers codings the header does not name.
+    """
+    qualities = parse_accept_encoding(accept_encoding)
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """Compress data with "br" or "gzip"; level defaults to the smallest output"""
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if level is None else level)
+    if encoding == "gzip":
+        # mtime=0 keeps the output identical for identical input
+        return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def compressible(mimetype: Optional[str]) -> bool:
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+class StreamCompressor:
+    """
+    Compresses a body written in pieces, e.g. a token stream.
+
+    Every piece is flushed, so the client can decode all of it as soon as
+    it arrives; later pieces still reuse the earlier ones as dictionary.
+    """
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        self.encoding = encoding
+        level = DYNAMIC_LEVELS.get(encoding) if level is None else level
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        elif encoding == "gzip":
+            # wbits 16 + MAX_WBITS writes the gzip header and trailer
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        else:
+            raise ValueError(f"Unsupported content encoding: {encoding}")
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def compress_stream(chunks: Iterable[Union[str, bytes]], encoding: str,
+                    level: Optional[int] = None) -> Iterator[bytes]:
+    """Compress a streamed body chunk by chunk (str chunks are UTF-8 encoded); closing it closes chunks"""
+    compressor = StreamCompressor(encoding, level)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        # Lets the producer stop its work (e.g. an LLM generation) when the client goes away
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,273 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Deque, Dict, Iterable, Optional
+
+import metrics
+
+
+class OverloadedError(Exception):
+    """Raised when a request cannot get an LLM slot in time"""
+
+
+class PartialAnswer(Exception):
+    """The LLM stopped before its answer was complete; partial holds the text generated so far"""
+
+    def __init__(self, message: str, partial: str = ""):
+        super().__init__(message)
+        self.partial = partial
+
+
+class DeadlineExceeded(PartialAnswer):
+    """Raised when a request's time budget runs out"""
+
+    def __init__(self, partial: str = ""):
+        super().__init__("LLM deadline exceeded", partial)
+
+
+class GenerationInterrupted(PartialAnswer):
+    """Raised when an Ollama host fails partway through an answer, which no other host can continue"""
+
+    def __init__(self, partial: str = ""):
+        super().__init__("LLM generation interrupted", partial)
+
+
+# Priority class of each route (query type, see model_router.route_for);
+# every other route is "general". Listed from most to least urgent.
+ROUTE_PRIORITIES = {"emergency": "emergency", "symptom": "symptom"}
+PRIORITIES = ("emergency", "symptom", "general")
+
+# Share of the slots each non-emergency class gets while several are waiting
+DEFAULT_WEIGHTS = {"symptom": 3.0, "general": 1.0}
+
+
+def priority_for(route: str) -> str:
+    return ROUTE_PRIORITIES.get(route, "general")
+
+
+class _Waiter:
+    """A request queued for a generation slot"""
+
+    __slots__ = ("priority", "queued", "granted", "error", "wake")
+
+    def __init__(self, priority: str, wake: Callable[[], Any]):
+        self.priority = priority
+        self.queued = time.monotonic()
+        self.granted = False
+        self.error: Optional[OverloadedError] = None
+        self.wake = wake
+
+
+class PriorityScheduler:
+    """
+    Hands out LLM generation slots by priority class (thread version).
+
+    At most max_in_flight generations run at once, and the last
+    emergency_reserve of them are only given to emergencies, so one can
+    start without waiting for routine answers to finish. Waiting requests
+    are served emergency first; symptom and general requests share what
+    is left by weighted fair queuing (weights), except that one that has
+    waited aging_seconds goes next so neither class starves.
+
+    Up to max_waiting requests may queue for at most max_wait_seconds;
+    past that OverloadedError is raised so the caller can answer with a
+    static fallback. An emergency finding the queue full takes the place
+    of the newest waiter of a lower class, and while shed_depth or more
+    requests wait, new shed_priorities requests are turned away at once.
+    """
+
+    def __init__(self, max_in_flight: int = 4, max_waiting: int = 32, max_wait_seconds: float = 10.0,
+                 weights: Optional[Dict[str, float]] = None, emergency_reserve: int = 1,
+                 aging_seconds: float = 5.0, shed_depth: int = 0,
+                 shed_priorities: Iterable[str] = ("general",)):
+        self.max_waiting = max_waiting
+        self.max_wait_seconds = max_wait_seconds
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self._emergency_reserve = emergency_reserve
+        self._set_limit(max_in_flight)
+        self.aging_seconds = aging_seconds
+        self.shed_depth = shed_depth
+        self.shed_priorities = set(shed_priorities)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._queues: Dict[str, Deque[_Waiter]] = {priority: deque() for priority in PRIORITIES}
+        # Weighted fair queuing: a class's pass advances by 1/weight per slot
+        # it gets, and the waiting class with the lowest pass goes next
+        self._pass = {priority: 0.0 for priority in PRIORITIES}
+        self._virtual_time = 0.0
+        self._lock = threading.Lock()
+
+    def _set_limit(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        # At least one slot stays open to routine answers
+        self.emergency_reserve = min(self._emergency_reserve, max_in_flight - 1)
+
+    def resize(self, max_in_flight: int):
+        """Change the number of generation slots, e.g. to a pre-fork worker's share"""
+        with self._lock:
+            self._set_limit(max_in_flight)
+            self._dispatch()
+
+    def _can_start(self, priority: str) -> bool:
+        limit = self.max_in_flight if priority == "emergency" else self.max_in_flight - self.emergency_reserve
+        return self.in_flight < limit
+
+    def _start(self, priority: str, waited: float):
+        self.in_flight += 1
+        metrics.LLM_QUEUE_WAIT_SECONDS.observe(waited, priority=priority)
+
+    def _reject(self, priority: str, reason: str, message: str) -> OverloadedError:
+        self.rejected += 1
+        metrics.LLM_QUEUE_REJECTED.inc(priority=priority, reason=reason)
+        return OverloadedError(message)
+
+    def _enqueue(self, priority: str, wake: Callable[[], Any]) -> Optional[_Waiter]:
+        """Take a slot (returns None) or queue for one (returns the waiter); raises OverloadedError"""
+        if priority not in self._queues:
+            priority = "general"
+        with self._lock:
+            # Whenever anyone waits, no slot is free for the class at the head
+            # of the queue, so this only lets emergencies pass the queue
+            if self._can_start(priority):
+                self._start(priority, 0.0)
+                return None
+            if self.shed_depth and self.waiting >= self.shed_depth and priority in self.shed_priorities:
+                raise self._reject(priority, "shed", f"{self.waiting} requests waiting, {priority} requests shed")
+            if self.waiting >= self.max_waiting and not self._displace(priority):
+                raise self._reject(priority, "full", f"{self.waiting} requests already waiting")
+
+            queue = self._queues[priority]
+            if not queue:
+                # A class that was idle rejoins at the current virtual time
+                # rather than catching up on the slots it did not use
+                self._pass[priority] = max(self._pass[priority], self._virtual_time)
+            waiter = _Waiter(priority, wake)
+            queue.append(waiter)
+            self.waiting += 1
+            return waiter
+
+    def _displace(self, priority: str) -> bool:
+        """For an emergency, turn away the newest waiter of the lowest class waiting to make room"""
+        if priority != "emergency":
+            return False
+        for lower in reversed(PRIORITIES[1:]):
+            queue = self._queues[lower]
+            if queue:
+                waiter = queue.pop()
+                self.waiting -= 1
+                waiter.error = self._reject(lower, "displaced", "displaced by a waiting emergency")
+                waiter.wake()
+                return True
+        return False
+
+    def _next(self) -> Optional[str]:
+        """The class whose oldest waiter should get the next slot"""
+        if self._queues["emergency"]:
+            return "emergency"
+        heads = [(queue[0].queued, priority) for priority, queue in self._queues.items() if queue]
+        if not heads:
+            return None
+        queued, priority = min(heads)
+        if self.aging_seconds and time.monotonic() - queued >= self.aging_seconds:
+            return priority
+        return min(heads, key=lambda head: self._pass[head[1]])[1]
+
+    def _dispatch(self):
+        """Start waiters while slots are free for them (call with the lock held)"""
+        while True:
+            priority = self._next()
+            if priority is None or not self._can_start(priority):
+                return
+            waiter = self._queues[priority].popleft()
+            self.waiting -= 1
+            if priority != "emergency":
+                self._virtual_time = self._pass[priority]
+                self._pass[priority] += 1 / self.weights.get(priority, 1.0)
+            waiter.granted = True
+            self._start(priority, time.monotonic() - waiter.queued)
+            waiter.wake()
+
+    def _settle(self, waiter: _Waiter):
+        """After waiting: keep the slot if it was granted, else leave the queue and raise OverloadedError"""
+        with self._lock:
+            if waiter.granted:
+                return
+            if waiter.error is None:
+                self._queues[waiter.priority].remove(waiter)
+                self.waiting -= 1
+                waiter.error = self._reject(
+                    waiter.priority, "timeout", f"no slot free after {time.monotonic() - waiter.queued:.1f}s"
+                )
+        raise waiter.error
+
+    def _abandon(self, waiter: _Waiter):
+        """Leave the queue without raising, giving the slot back if it was granted meanwhile"""
+        with self._lock:
+            if waiter.granted:
+                self.in_flight -= 1
+                self._dispatch()
+            elif waiter.error is None:
+                self._queues[waiter.priority].remove(waiter)
+                self.waiting -= 1
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._dispatch()
+
+    def _wait_limit(self, timeout: Optional[float]) -> float:
+        if timeout is None:
+            return self.max_wait_seconds
+        return max(0.0, min(timeout, self.max_wait_seconds))
+
+    @contextmanager
+    def slot(self, priority: str = "general", timeout: Optional[float] = None):
+        """Hold one generation slot for the duration of the block; timeout caps the wait"""
+        event = threading.Event()
+        waiter = self._enqueue(priority, event.set)
+        if waiter is not None:
+            event.wait(self._wait_limit(timeout))
+            self._settle(waiter)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_in_flight": self.max_in_flight,
+            "max_waiting": self.max_waiting,
+        }
+        for priority, queue in self._queues.items():
+            stats[f"waiting_{priority}"] = len(queue)
+        return stats
+
+
+class AsyncPriorityScheduler(PriorityScheduler):
+    """asyncio version of PriorityScheduler for the async server"""
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "general", timeout: Optional[float] = None):
+        """Hold one generation slot for the duration of the block; timeout caps the wait"""
+        granted = asyncio.get_running_loop().create_future()
+        waiter = self._enqueue(priority, lambda: granted.done() or granted.set_result(None))
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(granted), self._wait_limit(timeout))
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                # The client went away while waiting
+                self._abandon(waiter)
+                raise
+            self._settle(waiter)
+        try:
+            yield
+        finally:
+            self._release()
@@ -0,0 +1,159 @@
+import os
+
+# Runtime settings, read from environment variables with sensible defaults
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Response cache
+RESPONSE_CACHE_SIZE = env_int("RESPONSE_CACHE_SIZE", 1024)
+RESPONSE_CACHE_TTL = env_float("RESPONSE_CACHE_TTL", 6 * 3600)
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH")  # e.g. response_cache.db
+CACHE_EMERGENCY_RESPONSES = env_bool("CACHE_EMERGENCY_RESPONSES", False)
+
+# Knowledge base (knowledge_base.py): data directory and how many snippets go into a prompt
+KNOWLEDGE_PATH = os.getenv("KNOWLEDGE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge"))
+KNOWLEDGE_TOP_K = env_int("KNOWLEDGE_TOP_K", 3)
+# BM25 score below which a snippet is considered unrelated to the question
+KNOWLEDGE_MIN_SCORE = env_float("KNOWLEDGE_MIN_SCORE", 3.0)
+
+# Precomputed answers (answer_store.py): sqlite store, question catalogue, and
+# how much word overlap a question needs with a stored one to reuse its answer
+ANSWER_STORE_PATH = os.getenv("ANSWER_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "answers.db"))
+ANSWER_CATALOGUE_PATH = os.getenv("ANSWER_CATALOGUE_PATH", os.path.join(KNOWLEDGE_PATH, "questions.json"))
+ANSWER_STORE_MIN_SIMILARITY = env_float("ANSWER_STORE_MIN_SIMILARITY", 0.75)
+
+# Static JSON endpoints (/vaccination-schedule, /health-alert): how long clients
+# may reuse a response before revalidating, the alerts file (edits are picked
+# up without a restart) and how often it is checked for changes
+VACCINATION_SCHEDULE_MAX_AGE = env_int("VACCINATION_SCHEDULE_MAX_AGE", 3600)
+HEALTH_ALERTS_PATH = os.getenv("HEALTH_ALERTS_PATH", os.path.join(KNOWLEDGE_PATH, "alerts.json"))
+HEALTH_ALERTS_MAX_AGE = env_int("HEALTH_ALERTS_MAX_AGE", 60)
+HEALTH_ALERTS_CHECK_INTERVAL = env_float("HEALTH_ALERTS_CHECK_INTERVAL", 5.0)
+
+# Response compression (gzip/brotli, negotiated per request): off when a proxy
+# in front already compresses, and the smallest body worth compressing in bytes
+RESPONSE_COMPRESSION = env_bool("RESPONSE_COMPRESSION", True)
+COMPRESSION_MIN_BYTES = env_int("COMPRESSION_MIN_BYTES", 256)
+
+# Batch API (/chat/batch and batch.py): default and largest worker count, and
+# how many distinct recent messages are remembered to answer repeats once
+BATCH_WORKERS = env_int("BATCH_WORKERS", 4)
+BATCH_MAX_WORKERS = env_int("BATCH_MAX_WORKERS", 16)
+BATCH_DEDUP_SIZE = env_int("BATCH_DEDUP_SIZE", 10000)
+
+# Conversation sessions (sessions.py): how many are kept and for how long, the
+# token budget for recent turns and for the summary of older ones, and an
+# optional sqlite file shared by all workers
+SESSION_MAX = env_int("SESSION_MAX", 10000)
+SESSION_TTL = env_float("SESSION_TTL", 30 * 60)
+SESSION_HISTORY_TOKENS = env_int("SESSION_HISTORY_TOKENS", 400)
+SESSION_SUMMARY_TOKENS = env_int("SESSION_SUMMARY_TOKENS", 120)
+SESSION_PATH = os.getenv("SESSION_PATH")  # e.g. sessions.db
+
+# Ollama hosts to balance across, comma separated (default: OLLAMA_HOST or localhost)
+OLLAMA_HOSTS = [host.strip() for host in os.getenv("OLLAMA_HOSTS", "").split(",") if host.strip()]
+# Hosts tried per request before giving up
+OLLAMA_MAX_ATTEMPTS = env_int("OLLAMA_MAX_ATTEMPTS", 2)
+
+# Per-chunk network timeout for Ollama calls and health probes, in seconds
+OLLAMA_TIMEOUT = env_float("OLLAMA_TIMEOUT", 60.0)
+
+# Generation budgets: longest answer in tokens (num_predict) and the time a
+# request may spend on the LLM before falling back or returning a partial answer
+LLM_NUM_PREDICT = env_int("LLM_NUM_PREDICT", 500)
+LLM_DEADLINE = env_float("LLM_DEADLINE", 30.0)
+LLM_EMERGENCY_NUM_PREDICT = env_int("LLM_EMERGENCY_NUM_PREDICT", 250)
+LLM_EMERGENCY_DEADLINE = env_float("LLM_EMERGENCY_DEADLINE", 10.0)
+
+# Model routing (model_router.py): LLM_MODEL answers everything unless a small
+# model is set. Then the routes (query types) listed in LLM_SMALL_ROUTES go to
+# it, except questions of LLM_COMPLEX_QUERY_WORDS words or more and follow-ups,
+# and while LLM_DOWNGRADE_QUEUE_DEPTH or more LLM calls are in flight or
+# waiting, every route but LLM_PROTECTED_ROUTES does too (0 disables the downgrade)
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3.2:latest")
+LLM_SMALL_MODEL = os.getenv("LLM_SMALL_MODEL")  # e.g. llama3.2:1b
+LLM_SMALL_ROUTES = [
+    route.strip() for route in os.getenv("LLM_SMALL_ROUTES", "prevention,vaccination").split(",") if route.strip()
+]
+LLM_COMPLEX_QUERY_WORDS = env_int("LLM_COMPLEX_QUERY_WORDS", 25)
+LLM_DOWNGRADE_QUEUE_DEPTH = env_int("LLM_DOWNGRADE_QUEUE_DEPTH", 8)
+LLM_PROTECTED_ROUTES = [
+    route.strip() for route in os.getenv("LLM_PROTECTED_ROUTES", "emergency,symptom").split(",") if route.strip()
+]
+
+# Priority scheduling (concurrency.PriorityScheduler): LLM_TOTAL_IN_FLIGHT is
+# the Ollama generations all server processes run at once (what the hosts
+# process in parallel; past it Ollama queues requests in arrival order). A
+# single process (python app.py, batch.py) may use all of them and each
+# gunicorn worker gets its share (see slots_per_worker); LLM_MAX_IN_FLIGHT
+# sets the number per process instead (0: no limit and no queue; the async
+# server uses ASYNC_MAX_* instead). Emergencies are served first and may use
+# the last PRIORITY_EMERGENCY_RESERVE slots; symptom and general requests
+# share the rest by PRIORITY_WEIGHTS, and one that has waited
+# PRIORITY_AGING_SECONDS goes next. While PRIORITY_SHED_DEPTH or more requests
+# wait, new general ones get the static answer at once (0 disables shedding)
+LLM_TOTAL_IN_FLIGHT = env_int("LLM_TOTAL_IN_FLIGHT", 4 * max(1, len(OLLAMA_HOSTS)))
+LLM_MAX_IN_FLIGHT = env_int("LLM_MAX_IN_FLIGHT", LLM_TOTAL_IN_FLIGHT)
+LLM_MAX_WAITING = env_int("LLM_MAX_WAITING", 32)
+LLM_MAX_WAIT_SECONDS = env_float("LLM_MAX_WAIT_SECONDS", 10.0)
+PRIORITY_WEIGHTS = {
+    name.strip(): float(weight)
+    for name, _, weight in (item.partition("=") for item in os.getenv("PRIORITY_WEIGHTS", "symptom=3,general=1").split(","))
+    if name.strip() and weight.strip()
+}
+PRIORITY_EMERGENCY_RESERVE = env_int("PRIORITY_EMERGENCY_RESERVE", 1)
+PRIORITY_AGING_SECONDS = env_float("PRIORITY_AGING_SECONDS", 5.0)
+PRIORITY_SHED_DEPTH = env_int("PRIORITY_SHED_DEPTH", 0)
+
+# Async server (asgi.py): concurrent Ollama generations and the wait queue in front of them
+ASYNC_MAX_IN_FLIGHT = env_int("ASYNC_MAX_IN_FLIGHT", LLM_TOTAL_IN_FLIGHT)
+ASYNC_MAX_WAITING = env_int("ASYNC_MAX_WAITING", 32)
+ASYNC_MAX_WAIT_SECONDS = env_float("ASYNC_MAX_WAIT_SECONDS", 10.0)
+
+
+def slots_per_worker(setting: str, workers: int) -> int:
+    """
+    Generation slots for each of workers server processes: setting
+    (LLM_MAX_IN_FLIGHT or ASYNC_MAX_IN_FLIGHT) if it is set, else an even
+    share of LLM_TOTAL_IN_FLIGHT, but never so few that the emergency
+    reserve leaves no slot for routine answers
+    """
+    if os.getenv(setting):
+        return env_int(setting, 0)
+    return max(LLM_TOTAL_IN_FLIGHT // max(1, workers), PRIORITY_EMERGENCY_RESERVE + 1)
+
+# Ollama health checking (per host): circuit breaker and background prober
+HEALTH_FAILURE_THRESHOLD = env_int("HEALTH_FAILURE_THRESHOLD", 3)
+HEALTH_RESET_TIMEOUT = env_float("HEALTH_RESET_TIMEOUT", 30.0)
+HEALTH_PROBE_INTERVAL = env_float("HEALTH_PROBE_INTERVAL", 30.0)
+HEALTH_MAX_BACKOFF = env_float("HEALTH_MAX_BACKOFF", 60.0)
+
+# Ollama model residency and context size (keep both stable so the model is not reloaded)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_NUM_CTX = env_int("OLLAMA_NUM_CTX", 0) or None
+
+# Production server (gunicorn.conf.py): listen address, worker processes and
+# threads per worker, and how long a stopping worker may finish in-flight requests
+SERVER_BIND = os.getenv("SERVER_BIND", "0.0.0.0:5000")
+SERVER_WORKERS = env_int("WEB_CONCURRENCY", os.cpu_count() or 1)
+SERVER_THREADS = env_int("SERVER_THREADS", 8)
+SERVER_GRACEFUL_TIMEOUT = env_int("SERVER_GRACEFUL_TIMEOUT", int(LLM_DEADLINE) + 5)
+
+# Development server (python app.py): debug mode with the code reloader
+FLASK_DEBUG = env_bool("FLASK_DEBUG", False)
@@ -0,0 +1,101 @@
+"""
+Gunicorn settings for running the chatbot in production:
+
+    gunicorn -c gunicorn.conf.py                                                    # Flask app, threaded workers
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:application  # async server
+
+The app is imported once in the master process (preload_app) and the
+workers are forked from it, so the knowledge base, the compiled query
+matchers, the precomputed answers and the static tables are loaded once
+and shared copy-on-write instead of being rebuilt by every worker.
+
+Signals sent to the master:
+
+* TERM: graceful shutdown. Workers stop accepting connections and get
+  SERVER_GRACEFUL_TIMEOUT seconds (longer than the LLM deadline) to finish
+  the requests in flight, streams included.
+* HUP: graceful reload. New workers are forked from the preloaded app
+  and the old ones drain as above. Neither code nor settings are reloaded
+  this way: config.py was imported once in the master, whose environment
+  does not change. To deploy new code, send USR2 (starts a new master
+  running the new code alongside the old one), then TERM to the old master.
+  The new master inherits the old one's environment, so changing an
+  environment variable (LLM_*, OLLAMA_HOSTS, ...) needs a full restart.
+"""
+
+import gc
+import os
+import sys
+
+# Not imported as "config": Gunicorn would read that name as its own setting
+import config as settings
+
+wsgi_app = "app:app"
+bind = settings.SERVER_BIND
+workers = settings.SERVER_WORKERS
+# Threads cover the time a request spends waiting for Ollama; CPU-bound work
+# (intent detection, retrieval, fallbacks) is spread over the worker processes
+worker_class = "gthread"
+threads = settings.SERVER_THREADS
+preload_app = True
+graceful_timeout = settings.SERVER_GRACEFUL_TIMEOUT
+keepalive = 5
+
+
+def generation_slots(server):
+    """(setting, its value in each worker) for the LLM slots of the app being served"""
+    # asgi imports app, not the other way round
+    setting = "ASYNC_MAX_IN_FLIGHT" if "asgi" in sys.modules else "LLM_MAX_IN_FLIGHT"
+    return setting, settings.slots_per_worker(setting, server.cfg.workers)
+
+
+def when_ready(server):
+    """In the master, after the app is loaded and before any worker is forked"""
+    from app import app
+
+    # Compile the page template here, so workers share it instead of each compiling its own
+    app.jinja_env.get_template("index.html")
+
+    # Everything loaded so far lives as long as the process; freezing it keeps
+    # the garbage collector in the workers from writing to (and so copying)
+    # the shared pages
+    gc.collect()
+    gc.freeze()
+
+    workers = server.cfg.workers
+    if workers > 1 and not settings.SESSION_PATH:
+        server.log.warning(
+            "Sessions are kept per worker; set SESSION_PATH so a conversation "
+            "continues when its requests reach another worker"
+        )
+    setting, slots = generation_slots(server)
+    if os.getenv(setting) and workers * slots > settings.LLM_TOTAL_IN_FLIGHT:
+        server.log.warning(
+            f"{workers} workers x {setting}={slots} exceeds "
+            f"LLM_TOTAL_IN_FLIGHT={settings.LLM_TOTAL_IN_FLIGHT}; Ollama queues the excess in "
+            "arrival order, so emergencies can wait behind routine answers"
+        )
+    server.log.info(
+        f"App preloaded; forking {workers} workers x {server.cfg.threads} threads with {slots} LLM slots each "
+        f"(LLM_TOTAL_IN_FLIGHT={settings.LLM_TOTAL_IN_FLIGHT}), {gc.get_freeze_count()} objects shared"
+    )
+
+
+def post_fork(server, worker):
+    """In each new worker"""
+    from llama_service import llama_service
+
+    # Threads do not survive fork: start this worker's Ollama health probers
+    # now rather than on its first request (sqlite connections are reopened
+    # on first use, see persistence.SqlitePersisted)
+    llama_service.pool.start()
+
+    # The app was loaded for a single process; take this worker's share of the generation slots
+    setting, slots = generation_slots(server)
+    scheduler = sys.modules["asgi"].scheduler if setting == "ASYNC_MAX_IN_FLIGHT" else llama_service.scheduler
+    if scheduler is not None and slots:
+        scheduler.resize(slots)
+
+
+def worker_exit(server, worker):
+    server.log.info(f"Worker {worker.pid} drained and exiting")
@@ -0,0 +1,161 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open circuit breaker.
+
+    failure_threshold consecutive failures open the circuit; while open,
+    allow_request() answers False immediately. After reset_timeout seconds a
+    single trial request is let through (half-open): success closes the
+    circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def available(self) -> bool:
+        """Whether allow_request() would let a call through, without changing state"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            return self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit closed, LLM calls resumed")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+
+    def trip(self):
+        """Open the circuit at once, e.g. when a health probe fails"""
+        with self._lock:
+            self._open()
+
+    def _open(self):
+        if self.state != self.OPEN:
+            logger.warning("Circuit opened, skipping LLM calls")
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+
+
+class HealthMonitor:
+    """
+    Circuit breaker plus a background prober for one Ollama endpoint.
+
+    Nothing touches the network at construction: the prober thread starts
+    on first use (and again in a forked worker, since threads do not
+    survive fork). While the endpoint is healthy it is probed every
+    probe_interval seconds; after a failed probe the delay starts at one
+    second and doubles up to max_backoff, and the first successful probe
+    closes the circuit without waiting for a user request.
+    """
+
+    def __init__(self, check: Callable[[], bool], name: str = "ollama",
+                 failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 probe_interval: float = 30.0, max_backoff: float = 60.0):
+        self.check = check
+        self.name = name
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.probe_interval = probe_interval
+        self.max_backoff = max_backoff
+        self.last_probe: Optional[float] = None
+        self.last_probe_ok: Optional[bool] = None
+        self.next_probe_in = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the prober thread if it is not running in this process"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._probe_loop, name=f"health-{self.name}", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def allow_request(self) -> bool:
+        self.start()
+        return self.breaker.allow_request()
+
+    def available(self) -> bool:
+        self.start()
+        return self.breaker.available()
+
+    def record_success(self):
+        self.breaker.record_success()
+
+    def record_failure(self):
+        self.breaker.record_failure()
+
+    def _probe_loop(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                ok = self.check()
+            except Exception as e:
+                logger.error(f"Health probe for {self.name} failed: {e}")
+                ok = False
+
+            self.last_probe = time.time()
+            self.last_probe_ok = ok
+            if ok:
+                self.breaker.record_success()
+                backoff = 1.0
+                self.next_probe_in = self.probe_interval
+            else:
+                self.breaker.trip()
+                self.next_probe_in = backoff
+                backoff = min(backoff * 2, self.max_backoff)
+            self._stop.wait(self.next_probe_in)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "last_probe": self.last_probe,
+            "last_probe_ok": self.last_probe_ok,
+            "next_probe_in": self.next_probe_in,
+        }
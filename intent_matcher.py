@@ -0,0 +1,87 @@
+import re
+from typing import Dict, Iterable, List, Tuple
+
+# Inflections accepted after a term, so "aches", "preventing" and "urgently" still match
+INFLECTIONS = ("s", "es", "ed", "ing", "ly")
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Build a regex alternation factored into a prefix trie.
+
+    Python's re engine tries alternatives one by one; sharing prefixes
+    ("prevent" / "prevention" -> "prevent(?:ion)?") means each position is
+    rejected after a single character test instead of one per keyword.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node: Dict) -> str:
+        ends_here = "" in node
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends_here:
+            # Greedy: the longer keyword is tried first
+            return "(?:" + body + ")?"
+        return body
+
+    return render(trie)
+
+
+class TermMatcher:
+    """
+    Finds every known term in a message with a single precompiled regex.
+
+    Terms are grouped by category (e.g. "greeting", "disease"). Matching is
+    on word boundaries, so "hi" no longer fires inside "this". The regex is
+    a prefix trie inside a lookahead, which lets overlapping terms such as
+    "mild fever" and "fever" both be reported from one scan. Categories
+    listed in exact_categories do not accept inflections ("hi" must not
+    match "his").
+    """
+
+    def __init__(self, terms: Dict[str, Iterable[str]], exact_categories: Iterable[str] = ()):
+        exact_categories = set(exact_categories)
+        self._categories: Dict[str, List[str]] = {}
+        self._inflectable = set()
+        for category, phrases in terms.items():
+            for phrase in phrases:
+                phrase = phrase.lower()
+                categories = self._categories.setdefault(phrase, [])
+                if category not in categories:
+                    categories.append(category)
+                if category not in exact_categories:
+                    self._inflectable.add(phrase)
+
+        inflections = "|".join(INFLECTIONS)
+        self._pattern = re.compile(
+            rf"\b(?=({_trie_pattern(self._categories)}(?:{inflections})?)\b)"
+        )
+
+    def _resolve(self, text: str) -> Tuple[str, List[str]]:
+        """Map matched text back to its keyword, undoing an inflection if needed"""
+        categories = self._categories.get(text)
+        if categories is not None:
+            return text, categories
+        for suffix in INFLECTIONS:
+            base = text[: -len(suffix)]
+            if text.endswith(suffix) and base in self._inflectable:
+                return base, self._categories[base]
+        return text, []
+
+    def scan(self, message: str) -> Dict[str, List[str]]:
+        """Return category -> matched terms, in order of first appearance"""
+        found: Dict[str, List[str]] = {}
+        for text in self._pattern.findall(message.lower()):
+            phrase, categories = self._resolve(text)
+            for category in categories:
+                matched = found.setdefault(category, [])
+                if phrase not in matched:
+                    matched.append(phrase)
+        return found
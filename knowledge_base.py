@@ -0,0 +1,228 @@
+import csv
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from response_cache import STOPWORDS as QUERY_STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+# Query words that carry no topic, on top of the cache's stopwords
+STOPWORDS = QUERY_STOPWORDS | {
+    "after", "all", "at", "be", "been", "by", "from", "get", "got", "had", "has",
+    "have", "having", "how", "if", "in", "know", "much", "or", "out", "since",
+    "so", "some", "that", "they", "this", "up", "very", "was", "when", "why", "will",
+}
+
+# Record fields holding several values; in CSV files they are ";"-separated
+LIST_FIELDS = ("aliases", "symptoms", "prevention", "protects_against")
+
+# How much a word counts towards an entry, by the field it appears in
+FIELD_WEIGHTS = {
+    "name": 3,
+    "aliases": 3,
+    "symptoms": 2,
+    "protects_against": 2,
+    "summary": 1,
+    "prevention": 1,
+    "when_to_seek_help": 1,
+    "schedule": 1,
+    "notes": 1,
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words minus stopwords, with the plural 's' stripped like normalize_query()"""
+    tokens = []
+    for word in _WORD_RE.findall(text.lower()):
+        if len(word) < 2 or word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class KnowledgeBase:
+    """
+    Versioned medical knowledge base with a BM25 index.
+
+    Entries are plain dicts (name, aliases, summary, symptoms, prevention,
+    when_to_seek_help for conditions; name, aliases, group, schedule,
+    protects_against, notes for vaccines) loaded from the JSON and CSV
+    files listed in a manifest.json. The inverted index is built once at
+    load time with every posting holding its final BM25 weight, so a search
+    only sums weights for the query's terms. Posting lists are sorted by
+    weight and a search reads at most MAX_POSTINGS of each: for very common
+    terms the entries beyond that cut contribute too little to reach the
+    top k, and skipping them keeps searches fast on large knowledge bases.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    MAX_POSTINGS = 256
+
+    def __init__(self, entries: List[Dict[str, Any]], version: str = "unversioned"):
+        self.version = version
+        self.entries = entries
+        self.conditions: Dict[str, Dict[str, Any]] = {}
+        self.vaccines: List[Dict[str, Any]] = []
+        # Lowercase name or alias -> entry
+        self.names: Dict[str, Dict[str, Any]] = {}
+        # Symptom -> names of the conditions listing it
+        self.symptoms: Dict[str, List[str]] = {}
+        for entry in entries:
+            if entry["kind"] == "condition":
+                self.conditions[entry["name"]] = entry
+                for symptom in entry.get("symptoms", []):
+                    self.symptoms.setdefault(symptom, []).append(entry["name"])
+            elif entry["kind"] == "vaccine":
+                self.vaccines.append(entry)
+            for name in [entry["name"]] + entry.get("aliases", []):
+                self.names.setdefault(name.lower(), entry)
+        self._postings: Dict[str, List[Tuple[int, float]]] = {}
+        self._build_index()
+
+    @classmethod
+    def load(cls, path: str) -> "KnowledgeBase":
+        """Load every file listed in path/manifest.json; an empty base if there is none"""
+        started = time.perf_counter()
+        manifest_path = os.path.join(path, "manifest.json")
+        if not os.path.exists(manifest_path):
+            logger.warning(f"No knowledge base manifest at {manifest_path}, starting with an empty knowledge base")
+            return cls([])
+
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        entries = []
+        for item in manifest.get("files", []):
+            file_path = os.path.join(path, item["path"])
+            for record in cls._read_records(file_path):
+                entries.append(cls._make_entry(record, item["kind"]))
+
+        knowledge = cls(entries, version=manifest.get("version", "unversioned"))
+        logger.info(
+            f"Loaded knowledge base {knowledge.version}: {len(entries)} entries, "
+            f"{len(knowledge._postings)} terms in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return knowledge
+
+    @staticmethod
+    def _read_records(file_path: str) -> List[Dict[str, Any]]:
+        with open(file_path, encoding="utf-8", newline="") as f:
+            if file_path.endswith(".json"):
+                return json.load(f)
+            if file_path.endswith(".csv"):
+                return list(csv.DictReader(f))
+        raise ValueError(f"Unsupported knowledge base file: {file_path}")
+
+    @staticmethod
+    def _make_entry(record: Dict[str, Any], kind: str) -> Dict[str, Any]:
+        entry = {"kind": kind}
+        for field, value in record.items():
+            if field in LIST_FIELDS and isinstance(value, str):
+                value = [part.strip() for part in value.split(";") if part.strip()]
+            elif isinstance(value, str):
+                value = value.strip()
+            entry[field] = value
+        entry.setdefault("aliases", [])
+        return entry
+
+    def _build_index(self):
+        term_counts = []
+        for entry in self.entries:
+            counts = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                value = entry.get(field)
+                if not value:
+                    continue
+                text = " ".join(value) if isinstance(value, list) else str(value)
+                for token in tokenize(text):
+                    counts[token] += weight
+            term_counts.append(counts)
+
+        count = len(term_counts)
+        if not count:
+            return
+        lengths = [sum(counts.values()) for counts in term_counts]
+        average_length = sum(lengths) / count
+        document_frequency = Counter(term for counts in term_counts for term in counts)
+
+        for doc_id, counts in enumerate(term_counts):
+            norm = self.K1 * (1 - self.B + self.B * lengths[doc_id] / average_length)
+            for term, tf in counts.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                weight = idf * tf * (self.K1 + 1) / (tf + norm)
+                self._postings.setdefault(term, []).append((doc_id, weight))
+
+        for postings in self._postings.values():
+            postings.sort(key=lambda posting: posting[1], reverse=True)
+
+    def search(self, query: str, k: int = 3, kind: Optional[str] = None,
+               min_score: float = 0.0) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return up to k (score, entry) pairs, best first"""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            for doc_id, weight in self._postings.get(term, ())[:self.MAX_POSTINGS]:
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+
+        if kind is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if self.entries[doc_id]["kind"] == kind}
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(score, self.entries[doc_id]) for doc_id, score in best if score >= min_score]
+
+    def lookup(self, name: str) -> Optional[Dict[str, Any]]:
+        """Entry by name or alias, case-insensitive"""
+        return self.names.get(name.lower())
+
+    def condition_terms(self) -> List[str]:
+        """Condition names and aliases, for keyword matching"""
+        return [name for name, entry in self.names.items() if entry["kind"] == "condition"]
+
+    def vaccine_terms(self) -> List[str]:
+        """Vaccine names and aliases, for keyword matching"""
+        return [name for name, entry in self.names.items() if entry["kind"] == "vaccine"]
+
+    @staticmethod
+    def snippet(entry: Dict[str, Any], max_items: int = 5) -> str:
+        """One compact line about an entry, for prompts"""
+        if entry["kind"] == "vaccine":
+            text = f"{entry['name']} vaccine ({entry.get('group', '')}): {entry.get('schedule', '')}."
+            if entry.get("protects_against"):
+                text += f" Protects against {', '.join(entry['protects_against'])}."
+            if entry.get("notes"):
+                text += f" {entry['notes']}."
+            return text
+
+        text = f"{entry['name'].title()}: {entry.get('summary', '')}"
+        if entry.get("symptoms"):
+            text += f" Symptoms: {', '.join(entry['symptoms'][:max_items])}."
+        if entry.get("prevention"):
+            text += f" Prevention: {'; '.join(entry['prevention'][:max_items])}."
+        if entry.get("when_to_seek_help"):
+            text += f" Seek help: {entry['when_to_seek_help']}."
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "entries": len(self.entries),
+            "conditions": len(self.conditions),
+            "vaccines": len(self.vaccines),
+            "terms": len(self._postings),
+        }
+
+
+# Global instance
+knowledge_base = KnowledgeBase.load(config.KNOWLEDGE_PATH)
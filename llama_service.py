@@ -1,183 +1,651 @@
-import ollama
-import json
-import logging
-from typing import Optional, Dict, Any
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-class LlamaService:
-    def __init__(self, model_name: str = "llama3.2:latest"):
-        self.model_name = model_name
-        self.client = ollama
-        self.is_available = self._check_availability()
-        
-    def _check_availability(self) -> bool:
-        """Check if Ollama and the model are available"""
-        try:
-            # Test if ollama is running and model is available
-            response = self.client.list()
-            available_models = [model['name'] for model in response.get('models', [])]
-            
-            if self.model_name in available_models:
-                logger.info(f"Llama model {self.model_name} is available")
-                return True
-            else:
-                logger.warning(f"Model {self.model_name} not found. Available models: {available_models}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Ollama not available: {e}")
-            return False
-    
-    def get_medical_response(self, user_query: str, context: Dict[str, Any] = None) -> Optional[str]:
-        """
-        Get AI-powered medical response from Llama 3.2
-        
-        Args:
-            user_query: The user's medical question
-            context: Additional context (symptoms, patient info, etc.)
-            
-        Returns:
-            AI-generated medical response or None if unavailable
-        """
-        if not self.is_available:
-            logger.warning("Llama service not available, falling back to static responses")
-            return None
-            
-        try:
-            # Create a comprehensive medical prompt
-            prompt = self._create_medical_prompt(user_query, context)
-            
-            # Get response from Llama
-            response = self.client.chat(
-                model=self.model_name,
-                messages=[
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ],
-                options={
-                    'temperature': 0.3,  # Lower temperature for more consistent medical advice
-                    'top_p': 0.9,
-                    'max_tokens': 500,
-                }
-            )
-            
-            ai_response = response['message']['content'].strip()
-            logger.info("Successfully generated AI medical response")
-            return ai_response
-            
-        except Exception as e:
-            logger.error(f"Error generating AI response: {e}")
-            return None
-    
-    def _create_medical_prompt(self, user_query: str, context: Dict[str, Any] = None) -> str:
-        """Create a specialized medical prompt for Llama"""
-        
-        base_prompt = """You are an AI medical education assistant designed to provide helpful health information for educational purposes. Your responses should be:
-
-1. ACCURATE and based on established medical knowledge
-2. EDUCATIONAL - focus on general health information and awareness
-3. SAFE - always include disclaimers about consulting healthcare professionals
-4. APPROPRIATE for rural and semi-urban populations
-5. CONCISE but comprehensive
-6. Include prevention tips when relevant
-
-IMPORTANT DISCLAIMERS TO ALWAYS INCLUDE:
-- This information is for educational purposes only
-- Not a substitute for professional medical advice
-- Consult a healthcare provider for proper diagnosis and treatment
-- For emergencies, contact emergency services immediately
-
-"""
-        
-        # Add context if provided
-        if context:
-            base_prompt += f"\nAdditional context: {json.dumps(context, indent=2)}\n"
-        
-        # Add the user query
-        base_prompt += f"\nUser Question: {user_query}\n"
-        
-        # Add specific medical response guidelines
-        base_prompt += """
-Please provide a helpful response that includes:
-1. Direct answer to the question (if appropriate)
-2. Key symptoms or signs to watch for
-3. Prevention or self-care tips
-4. When to seek professional medical help
-5. Appropriate medical disclaimers
-
-Format your response in a clear, easy-to-read manner suitable for general public education.
-"""
-        
-        return base_prompt
-    
-    def get_disease_info(self, disease_name: str) -> Optional[str]:
-        """Get comprehensive disease information"""
-        prompt = f"""Provide comprehensive educational information about {disease_name} including:
-
-1. **Overview**: Brief description of the condition
-2. **Common Symptoms**: List main symptoms people should watch for
-3. **Causes**: What typically causes this condition
-4. **Prevention**: Practical prevention tips
-5. **When to Seek Help**: Clear guidance on when to see a doctor
-6. **Self-Care**: Safe home management tips (if applicable)
-
-Focus on information relevant to rural and semi-urban populations. Include appropriate medical disclaimers.
-"""
-        return self.get_medical_response(prompt)
-    
-    def analyze_symptoms(self, symptoms: str) -> Optional[str]:
-        """Analyze symptoms and provide general guidance"""
-        prompt = f"""A person is experiencing these symptoms: {symptoms}
-
-Please provide:
-1. **General Assessment**: What these symptoms might commonly indicate (be careful not to diagnose)
-2. **Immediate Care**: Safe self-care measures they can take
-3. **Warning Signs**: Symptoms that would require immediate medical attention
-4. **Next Steps**: Recommended actions (rest, hydration, when to see doctor)
-5. **Important Reminders**: That this is not a diagnosis and professional consultation is needed
-
-Be very careful to avoid making specific diagnoses. Focus on general health education and when to seek professional help.
-"""
-        return self.get_medical_response(prompt, {"symptoms": symptoms})
-    
-    def get_prevention_tips(self, condition_or_general: str = "general health") -> Optional[str]:
-        """Get prevention tips for specific conditions or general health"""
-        prompt = f"""Provide practical prevention tips for {condition_or_general} that are:
-
-1. **Actionable**: Things people can realistically do
-2. **Accessible**: Suitable for rural/semi-urban populations  
-3. **Evidence-based**: Based on established medical knowledge
-4. **Culturally appropriate**: Suitable for diverse populations
-
-Include tips about:
-- Diet and nutrition
-- Exercise and physical activity
-- Hygiene practices
-- Lifestyle modifications
-- When to get check-ups or screenings
-
-Focus on practical, everyday measures people can take to stay healthy.
-"""
-        return self.get_medical_response(prompt)
-    
-    def get_emergency_guidance(self, situation: str) -> Optional[str]:
-        """Get emergency medical guidance"""
-        prompt = f"""Provide emergency guidance for: {situation}
-
-Include:
-1. **Immediate Actions**: What to do right now
-2. **Emergency Contacts**: Remind about calling emergency services
-3. **Do NOT Do**: Important things to avoid
-4. **While Waiting**: Safe actions while waiting for help
-
-Keep responses focused on immediate safety and getting professional help quickly. Emphasize calling emergency services (108 in India) for true emergencies.
-"""
-        return self.get_medical_response(prompt, {"emergency": True})
-
-# Global instance
-llama_service = LlamaService()
+import ollama
+import hashlib
+import json
+import logging
+import time
+from contextlib import nullcontext
+from typing import Optional, Dict, Any, Iterator, AsyncIterator, List, Tuple
+
+import config
+import metrics
+from answer_store import AnswerStore, answer_store
+from backends import BackendPool
+from concurrency import (
+    AsyncPriorityScheduler, GenerationInterrupted, OverloadedError, PartialAnswer, PriorityScheduler, priority_for,
+)
+from knowledge_base import KnowledgeBase, knowledge_base
+from model_router import ModelRouter, route_for
+from response_cache import ResponseCache
+from single_flight import SingleFlight, AsyncSingleFlight
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Fixed preamble sent as the system message of every request. Keep it free of
+# per-request data: Ollama can only reuse its KV cache for a byte-identical prefix.
+SYSTEM_PROMPT = """You are an AI medical education assistant designed to provide helpful health information for educational purposes. Your responses should be:
+
+1. ACCURATE and based on established medical knowledge
+2. EDUCATIONAL - focus on general health information and awareness
+3. SAFE - always include disclaimers about consulting healthcare professionals
+4. APPROPRIATE for rural and semi-urban populations
+5. CONCISE but comprehensive
+6. Include prevention tips when relevant
+7. GROUNDED - when reference notes are given with a question, base your answer on them
+
+IMPORTANT DISCLAIMERS TO ALWAYS INCLUDE:
+- This information is for educational purposes only
+- Not a substitute for professional medical advice
+- Consult a healthcare provider for proper diagnosis and treatment
+- For emergencies, contact emergency services immediately
+
+For every question, provide a helpful response that includes:
+1. Direct answer to the question (if appropriate)
+2. Key symptoms or signs to watch for
+3. Prevention or self-care tips
+4. When to seek professional medical help
+5. Appropriate medical disclaimers
+
+Format your response in a clear, easy-to-read manner suitable for general public education.
+"""
+
+# Methods that may be answered from the precomputed answer store; emergency
+# guidance always goes to the LLM
+PRECOMPUTED_METHODS = {"get_medical_response", "get_disease_info", "analyze_symptoms", "get_prevention_tips"}
+
+# Retrieved snippets scoring below this fraction of the best one are left out
+REFERENCE_MIN_RATIO = 0.5
+
+# Output cap (Ollama's num_predict) and wall-clock deadline in seconds per
+# route (query type, see model_router.route_for). Emergency guidance gets the
+# tightest budget: a short answer now is worth more than a complete one later.
+GENERATION_BUDGETS = {
+    "general": {"num_predict": config.LLM_NUM_PREDICT, "deadline": config.LLM_DEADLINE},
+    "disease": {"num_predict": config.LLM_NUM_PREDICT, "deadline": config.LLM_DEADLINE},
+    "symptom": {"num_predict": 400, "deadline": config.LLM_DEADLINE},
+    "prevention": {"num_predict": 400, "deadline": config.LLM_DEADLINE},
+    "vaccination": {"num_predict": 400, "deadline": config.LLM_DEADLINE},
+    "emergency": {
+        "num_predict": config.LLM_EMERGENCY_NUM_PREDICT,
+        "deadline": config.LLM_EMERGENCY_DEADLINE,
+    },
+}
+
+class LlamaService:
+    def __init__(self, model_name: str = "llama3.2:latest", cache: Optional[ResponseCache] = None,
+                 cache_emergency: bool = False, pool: Optional[BackendPool] = None,
+                 hosts: Optional[List[str]] = None, keep_alive: Optional[str] = None,
+                 num_ctx: Optional[int] = None, budgets: Optional[Dict[str, Dict[str, float]]] = None,
+                 knowledge: Optional[KnowledgeBase] = None, knowledge_top_k: int = 3,
+                 answers: Optional[AnswerStore] = None, router: Optional[ModelRouter] = None,
+                 scheduler: Optional[PriorityScheduler] = None):
+        self.model_name = model_name  # answers everything the router does not send elsewhere
+        self.keep_alive = keep_alive  # how long Ollama keeps the model loaded, e.g. "30m"
+        self.num_ctx = num_ctx
+        self.budgets = budgets or GENERATION_BUDGETS
+        self.knowledge = knowledge  # snippets relevant to the query are added to the prompt
+        self.knowledge_top_k = knowledge_top_k
+        self.answers = answers  # precomputed answers, consulted before the cache and the LLM
+        self.router = router  # picks a smaller model for simple queries and under load
+        self.scheduler = scheduler  # bounds generations in flight and orders the wait by priority
+        self.cache = cache
+        self.cache_emergency = cache_emergency
+        self.single_flight = SingleFlight()
+        # Construction does no network I/O; the first request starts the health probers
+        self.pool = pool or BackendPool(
+            hosts or [None],
+            model_name,
+            max_attempts=config.OLLAMA_MAX_ATTEMPTS,
+            timeout=config.OLLAMA_TIMEOUT,
+            # A host with only the small model still serves what the router sends it
+            other_models=[router.small_model] if router is not None and router.small_model else [],
+            failure_threshold=config.HEALTH_FAILURE_THRESHOLD,
+            reset_timeout=config.HEALTH_RESET_TIMEOUT,
+            probe_interval=config.HEALTH_PROBE_INTERVAL,
+            max_backoff=config.HEALTH_MAX_BACKOFF,
+        )
+    
+    @property
+    def is_available(self) -> bool:
+        """False while every backend's circuit is open, so callers skip the LLM without waiting"""
+        return self.pool.available()
+    
+    def get_medical_response(self, user_query: str, context: Dict[str, Any] = None,
+                             history: Optional[List[Dict[str, str]]] = None) -> Optional[str]:
+        """
+        Get AI-powered medical response from Llama 3.2
+        
+        Args:
+            user_query: The user's medical question
+            context: Additional context (symptoms, patient info, etc.)
+            history: Earlier messages of the conversation, see SessionStore.history()
+            
+        Returns:
+            AI-generated medical response or None if unavailable
+            
+        Raises:
+            PartialAnswer: The time budget ran out (DeadlineExceeded) or the
+                host failed mid-answer (GenerationInterrupted); its partial
+                attribute holds whatever text was generated by then
+        """
+        return self._respond("get_medical_response", user_query, user_query, context, history=history)
+    
+    def stream_medical_response(self, user_query: str, context: Dict[str, Any] = None,
+                                history: Optional[List[Dict[str, str]]] = None) -> Iterator[str]:
+        """
+        Stream an AI-powered medical response from Llama 3.2 token by token
+        
+        Args:
+            user_query: The user's medical question
+            context: Additional context (symptoms, patient info, etc.)
+            history: Earlier messages of the conversation, see SessionStore.history()
+            
+        Yields:
+            Response text chunks as Ollama produces them. Nothing is yielded
+            if the service is unavailable or fails before the first token;
+            PartialAnswer is raised if the time budget runs out or the host
+            fails mid-answer.
+        """
+        return self._respond("get_medical_response", user_query, user_query, context, stream=True,
+                             history=history)
+    
+    def _respond(self, method: str, query: str, prompt: str, context: Dict[str, Any] = None,
+                 stream: bool = False, cacheable: bool = True,
+                 history: Optional[List[Dict[str, str]]] = None):
+        """
+        Answer one request, serving it from the response cache when possible
+        
+        Args:
+            method: Public method name, part of the cache key; with context
+                it gives the route (see model_router.route_for)
+            query: The caller's raw query, normalized into the cache key
+            prompt: Text handed to _create_medical_prompt
+            context: Additional context for the prompt
+            stream: Return a chunk iterator instead of the full text
+            cacheable: Whether the cache may be consulted and filled
+            history: Earlier conversation messages; an answer that depends on
+                them is neither looked up nor cached
+        """
+        if history:
+            context = dict(context or {}, history=history)
+        
+        precomputed = self._lookup_answer(method, query, context)
+        if precomputed is not None:
+            return iter([precomputed]) if stream else precomputed
+        
+        route = route_for(method, context)
+        options, deadline = self._plan(route)
+        model, reason = self._choose_model(route, query, bool(history))
+        cache_key, cached = self._lookup_cache(method, query, options, cacheable and not history, model)
+        if cached is not None:
+            return iter([cached]) if stream else cached
+        
+        if not self.is_available:
+            logger.warning("Llama service not available, falling back to static responses")
+            return iter(()) if stream else None
+        
+        metrics.LLM_ROUTED.inc(route=route, model=model, reason=reason)
+        context = self._with_references(query, context)
+        priority = priority_for(route)
+        if stream:
+            return self._stream_response(prompt, context, options, deadline, cache_key, model, priority)
+        return self._complete_response(prompt, context, options, deadline, cache_key, model, priority)
+    
+    def _plan(self, route: str):
+        """Return (options, deadline) for one request; deadline is a time.monotonic() value"""
+        budget = self.budgets.get(route, self.budgets["general"])
+        return self._chat_options(budget["num_predict"]), time.monotonic() + budget["deadline"]
+    
+    def queue_depth(self) -> int:
+        """LLM calls in flight in this process plus those waiting for a scheduler slot"""
+        waiting = self.scheduler.waiting if self.scheduler is not None else 0
+        return self.pool.outstanding() + waiting
+    
+    def _choose_model(self, route: str, query: str, follow_up: bool = False) -> Tuple[str, str]:
+        """Return (model, reason) for one request, see ModelRouter.choose()"""
+        if self.router is None:
+            return self.model_name, "default"
+        model, reason = self.router.choose(route, query, follow_up, self.queue_depth())
+        if model != self.model_name and not self.pool.available(model):
+            # No healthy host has the smaller model (not pulled, or its hosts are down)
+            return self.model_name, "unavailable"
+        return model, reason
+    
+    def _lookup_answer(self, method: str, query: str, context: Dict[str, Any] = None) -> Optional[str]:
+        """Return the precomputed answer for query, if the store has one"""
+        if self.answers is None or method not in PRECOMPUTED_METHODS or (context and "history" in context):
+            return None
+        with metrics.STAGE_SECONDS.time(stage="answer_lookup"):
+            answer = self.answers.lookup(query)
+        if answer is not None:
+            logger.info("Serving precomputed AI medical response")
+        return answer
+    
+    def _lookup_cache(self, method: str, query: str, options: Dict[str, Any], cacheable: bool = True,
+                      model: Optional[str] = None):
+        """
+        Return (cache_key, cached_response); the key is None when caching does not apply
+        
+        The key is for model's answer. When that is not the default model,
+        the default model's answer is served if it is cached instead.
+        """
+        if self.cache is None or not cacheable:
+            return None, None
+        model = model or self.model_name
+        knowledge_version = self.knowledge.version if self.knowledge is not None else None
+        cache_key = self.cache.make_key(method, query, model, options, knowledge_version)
+        cached = self.cache.get(cache_key)
+        if cached is None and model != self.model_name:
+            cached = self.cache.get(self.cache.make_key(method, query, self.model_name, options, knowledge_version))
+        if cached is not None:
+            logger.info("Serving cached AI medical response")
+        return cache_key, cached
+    
+    def _with_references(self, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Add knowledge base snippets relevant to query to the prompt context"""
+        if self.knowledge is None:
+            return context
+        with metrics.STAGE_SECONDS.time(stage="retrieval"):
+            results = self.knowledge.search(query, k=self.knowledge_top_k, min_score=config.KNOWLEDGE_MIN_SCORE)
+        if not results:
+            return context
+        best = results[0][0]
+        references = [
+            self.knowledge.snippet(entry) for score, entry in results if score >= best * REFERENCE_MIN_RATIO
+        ]
+        return dict(context or {}, reference=references)
+    
+    def _complete_response(self, prompt: str, context: Dict[str, Any], options: Dict[str, Any],
+                           deadline: float, cache_key: Optional[str] = None,
+                           model: Optional[str] = None, priority: str = "general") -> Optional[str]:
+        # Collected from a stream so a missed deadline still leaves the text generated so far
+        parts = []
+        try:
+            for chunk in self._stream_response(prompt, context, options, deadline, cache_key, model, priority):
+                parts.append(chunk)
+        except PartialAnswer as e:
+            e.partial = "".join(parts).strip()
+            raise
+        return "".join(parts).strip() or None
+    
+    def _stream_response(self, prompt: str, context: Dict[str, Any], options: Dict[str, Any],
+                         deadline: float, cache_key: Optional[str] = None,
+                         model: Optional[str] = None, priority: str = "general") -> Iterator[str]:
+        model = model or self.model_name
+        messages = self._build_messages(prompt, context)
+        return self.single_flight.stream(
+            self._flight_key(messages, options, model),
+            lambda: self._chat_stream(messages, options, deadline, cache_key, model, priority),
+            deadline=deadline,
+        )
+    
+    def _slot(self, priority: str, deadline: float):
+        """A scheduler slot for one generation, or no limit without a scheduler"""
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.slot(priority, deadline - time.monotonic())
+    
+    def _flight_key(self, messages: List[Dict[str, str]], options: Dict[str, Any],
+                    model: Optional[str] = None) -> str:
+        """Identify a generation by its model and fully built prompt, so identical requests can share it"""
+        raw = json.dumps([model or self.model_name, messages, options], sort_keys=True)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
+    def _chat_stream(self, messages: List[Dict[str, str]], options: Dict[str, Any], deadline: float,
+                     cache_key: Optional[str] = None, model: Optional[str] = None,
+                     priority: str = "general") -> Iterator[str]:
+        model = model or self.model_name
+        parts = []
+        tried = []
+        completed = False
+        try:
+            with self._slot(priority, deadline):
+                while not completed and len(tried) < self.pool.max_attempts:
+                    if time.monotonic() >= deadline:
+                        # Every reader has given up by now; do not start (or retry) a generation
+                        break
+                    # Least busy healthy host; after a failure, try a different one
+                    backend = self.pool.pick(exclude=tried, model=model)
+                    if backend is None:
+                        break
+                    tried.append(backend)
+                    started = time.perf_counter()
+                    outcome = "cancelled"  # unless the loop below finishes or raises
+                    try:
+                        with self.pool.track(backend):
+                            stream = backend.client.chat(
+                                model=model,
+                                messages=messages,
+                                options=options,
+                                keep_alive=self.keep_alive,
+                                stream=True,
+                            )
+                        
+                            for chunk in stream:
+                                content = chunk.get('message', {}).get('content', '')
+                                if content:
+                                    if not parts:
+                                        metrics.LLM_TTFT_SECONDS.observe(time.perf_counter() - started, model=model)
+                                    parts.append(content)
+                                    yield content
+                                if chunk.get('done'):
+                                    metrics.observe_generation(chunk)
+                        outcome = "ok"
+                        logger.info(f"Successfully generated AI medical response with {model} on {backend.host}")
+                        completed = True
+                    
+                    except Exception as e:
+                        outcome = "error"
+                        logger.error(f"Error generating AI response on {backend.host}: {e}")
+                        if parts:
+                            # Text already went out; another host cannot continue it
+                            raise GenerationInterrupted() from e
+                    finally:
+                        metrics.LLM_SECONDS.observe(time.perf_counter() - started, model=model, outcome=outcome)
+        except OverloadedError as e:
+            logger.warning(f"No LLM slot for {priority} request ({e}), falling back to static responses")
+            return
+        
+        # Only complete generations are cached; an abandoned generator never gets here
+        if completed and cache_key and parts:
+            self.cache.set(cache_key, "".join(parts).strip())
+    
+    def _build_messages(self, user_query: str, context: Dict[str, Any] = None) -> List[Dict[str, str]]:
+        """
+        Build the chat messages sent to Ollama
+        
+        The fixed preamble goes first as its own system message and the
+        request-specific text goes last, so consecutive requests share the
+        longest possible prompt prefix and Ollama only evaluates the tail.
+        A conversation's earlier messages (context["history"]) go in between.
+        """
+        with metrics.STAGE_SECONDS.time(stage="prompt_build"):
+            context = dict(context or {})
+            history = context.pop("history", None) or []
+            return [
+                {
+                    'role': 'system',
+                    'content': SYSTEM_PROMPT
+                },
+                *history,
+                {
+                    'role': 'user',
+                    'content': self._create_medical_prompt(user_query, context)
+                }
+            ]
+    
+    def _chat_options(self, num_predict: Optional[int] = None) -> Dict[str, Any]:
+        """Generation options; num_predict caps the answer length in tokens"""
+        options = {
+            'temperature': 0.3,  # Lower temperature for more consistent medical advice
+            'top_p': 0.9,
+            'num_predict': num_predict or config.LLM_NUM_PREDICT,
+        }
+        if self.num_ctx:
+            # A fixed context size stops Ollama reloading the model between requests
+            options['num_ctx'] = self.num_ctx
+        return options
+    
+    def _create_medical_prompt(self, user_query: str, context: Dict[str, Any] = None) -> str:
+        """Create the request-specific part of the prompt; the preamble lives in SYSTEM_PROMPT"""
+        
+        context = dict(context or {})
+        prompt = f"User Question: {user_query}"
+        
+        # Knowledge base snippets follow the question, one per line, so the
+        # method's fixed instructions at the start of user_query stay a
+        # byte-identical prefix across requests
+        references = context.pop("reference", None)
+        if references:
+            prompt += "\n\nReference notes:\n" + "\n".join(f"- {reference}" for reference in references)
+        
+        # Add context if provided, compact and in a stable key order
+        if context:
+            prompt += f"\n\nAdditional context: {json.dumps(context, sort_keys=True, separators=(',', ':'))}"
+        
+        return prompt
+    
+    # Each helper puts its fixed instructions first and the caller's text last
+    
+    def get_disease_info(self, disease_name: str, stream: bool = False,
+                         history: Optional[List[Dict[str, str]]] = None):
+        """Get comprehensive disease information"""
+        prompt = f"""Provide comprehensive educational information about the condition named at the end, including:
+
+1. **Overview**: Brief description of the condition
+2. **Common Symptoms**: List main symptoms people should watch for
+3. **Causes**: What typically causes this condition
+4. **Prevention**: Practical prevention tips
+5. **When to Seek Help**: Clear guidance on when to see a doctor
+6. **Self-Care**: Safe home management tips (if applicable)
+
+Focus on information relevant to rural and semi-urban populations. Include appropriate medical disclaimers.
+
+Condition: {disease_name}"""
+        return self._respond("get_disease_info", disease_name, prompt, stream=stream, history=history)
+    
+    def analyze_symptoms(self, symptoms: str, stream: bool = False,
+                         history: Optional[List[Dict[str, str]]] = None):
+        """Analyze symptoms and provide general guidance"""
+        prompt = f"""A person is experiencing the symptoms described at the end.
+
+Please provide:
+1. **General Assessment**: What these symptoms might commonly indicate (be careful not to diagnose)
+2. **Immediate Care**: Safe self-care measures they can take
+3. **Warning Signs**: Symptoms that would require immediate medical attention
+4. **Next Steps**: Recommended actions (rest, hydration, when to see doctor)
+5. **Important Reminders**: That this is not a diagnosis and professional consultation is needed
+
+Be very careful to avoid making specific diagnoses. Focus on general health education and when to seek professional help.
+
+Symptoms: {symptoms}"""
+        return self._respond("analyze_symptoms", symptoms, prompt, stream=stream, history=history)
+    
+    def get_prevention_tips(self, condition_or_general: str = "general health", stream: bool = False,
+                            history: Optional[List[Dict[str, str]]] = None):
+        """Get prevention tips for specific conditions or general health"""
+        prompt = f"""Provide practical prevention tips for the topic named at the end that are:
+
+1. **Actionable**: Things people can realistically do
+2. **Accessible**: Suitable for rural/semi-urban populations
+3. **Evidence-based**: Based on established medical knowledge
+4. **Culturally appropriate**: Suitable for diverse populations
+
+Include tips about:
+- Diet and nutrition
+- Exercise and physical activity
+- Hygiene practices
+- Lifestyle modifications
+- When to get check-ups or screenings
+
+Focus on practical, everyday measures people can take to stay healthy.
+
+Topic: {condition_or_general}"""
+        return self._respond("get_prevention_tips", condition_or_general, prompt, stream=stream,
+                             history=history)
+    
+    def get_emergency_guidance(self, situation: str, stream: bool = False,
+                               history: Optional[List[Dict[str, str]]] = None):
+        """Get emergency medical guidance"""
+        prompt = f"""Provide emergency guidance for the situation described at the end.
+
+Include:
+1. **Immediate Actions**: What to do right now
+2. **Emergency Contacts**: Remind about calling emergency services
+3. **Do NOT Do**: Important things to avoid
+4. **While Waiting**: Safe actions while waiting for help
+
+Keep responses focused on immediate safety and getting professional help quickly. Emphasize calling emergency services (108 in India) for true emergencies.
+
+Situation: {situation}"""
+        return self._respond("get_emergency_guidance", situation, prompt, {"emergency": True},
+                             stream=stream, cacheable=self.cache_emergency, history=history)
+
+class AsyncLlamaService(LlamaService):
+    """
+    LlamaService using each backend's ollama.AsyncClient, for the ASGI server.
+    
+    The public helpers keep their signatures but return a coroutine, or an
+    async iterator of chunks when stream is True. Cache hits are answered
+    directly; every Ollama call holds a scheduler slot and raises
+    OverloadedError when none can be had, or PartialAnswer when the
+    time budget runs out or the host fails mid-answer. Identical in-flight prompts share
+    one generation (and one slot).
+    """
+    
+    def __init__(self, model_name: str = "llama3.2:latest", cache: Optional[ResponseCache] = None,
+                 cache_emergency: bool = False, pool: Optional[BackendPool] = None,
+                 hosts: Optional[List[str]] = None, keep_alive: Optional[str] = None,
+                 num_ctx: Optional[int] = None, budgets: Optional[Dict[str, Dict[str, float]]] = None,
+                 knowledge: Optional[KnowledgeBase] = None, knowledge_top_k: int = 3,
+                 answers: Optional[AnswerStore] = None, router: Optional[ModelRouter] = None,
+                 scheduler: Optional[AsyncPriorityScheduler] = None):
+        super().__init__(model_name, cache=cache, cache_emergency=cache_emergency, pool=pool,
+                         hosts=hosts, keep_alive=keep_alive, num_ctx=num_ctx, budgets=budgets,
+                         knowledge=knowledge, knowledge_top_k=knowledge_top_k, answers=answers,
+                         router=router, scheduler=scheduler or AsyncPriorityScheduler())
+        self.single_flight = AsyncSingleFlight()
+    
+    def _respond(self, method: str, query: str, prompt: str, context: Dict[str, Any] = None,
+                 stream: bool = False, cacheable: bool = True,
+                 history: Optional[List[Dict[str, str]]] = None):
+        if history:
+            context = dict(context or {}, history=history)
+        route = route_for(method, context)
+        options, deadline = self._plan(route)
+        model, reason = self._choose_model(route, query, bool(history))
+        cache_key, cached = None, self._lookup_answer(method, query, context)
+        if cached is None:
+            cache_key, cached = self._lookup_cache(method, query, options, cacheable and not history, model)
+        if cached is None:
+            if self.is_available:
+                metrics.LLM_ROUTED.inc(route=route, model=model, reason=reason)
+            context = self._with_references(query, context)
+        priority = priority_for(route)
+        if stream:
+            return self._stream_response(prompt, context, options, deadline, cache_key, cached, model, priority)
+        return self._complete_response(prompt, context, options, deadline, cache_key, cached, model, priority)
+    
+    async def _complete_response(self, prompt: str, context: Dict[str, Any], options: Dict[str, Any],
+                                 deadline: float, cache_key: Optional[str] = None,
+                                 cached: Optional[str] = None, model: Optional[str] = None,
+                                 priority: str = "general") -> Optional[str]:
+        parts = []
+        try:
+            async for chunk in self._stream_response(prompt, context, options, deadline, cache_key, cached,
+                                                     model, priority):
+                parts.append(chunk)
+        except PartialAnswer as e:
+            e.partial = "".join(parts).strip()
+            raise
+        return "".join(parts).strip() or None
+    
+    async def _stream_response(self, prompt: str, context: Dict[str, Any], options: Dict[str, Any],
+                               deadline: float, cache_key: Optional[str] = None,
+                               cached: Optional[str] = None, model: Optional[str] = None,
+                               priority: str = "general") -> AsyncIterator[str]:
+        if cached is not None:
+            yield cached
+            return
+        if not self.is_available:
+            logger.warning("Llama service not available, falling back to static responses")
+            return
+        
+        model = model or self.model_name
+        messages = self._build_messages(prompt, context)
+        chunks = self.single_flight.stream(
+            self._flight_key(messages, options, model),
+            lambda: self._chat_stream(messages, options, deadline, cache_key, model, priority),
+            deadline=deadline,
+        )
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+    
+    async def _chat_stream(self, messages: List[Dict[str, str]], options: Dict[str, Any], deadline: float,
+                           cache_key: Optional[str] = None, model: Optional[str] = None,
+                           priority: str = "general") -> AsyncIterator[str]:
+        model = model or self.model_name
+        parts = []
+        tried = []
+        completed = False
+        async with self.scheduler.slot(priority, deadline - time.monotonic()):
+            while not completed and len(tried) < self.pool.max_attempts:
+                if time.monotonic() >= deadline:
+                    break
+                backend = self.pool.pick(exclude=tried, model=model)
+                if backend is None:
+                    break
+                tried.append(backend)
+                started = time.perf_counter()
+                outcome = "cancelled"  # unless the loop below finishes or raises
+                try:
+                    with self.pool.track(backend):
+                        stream = await backend.async_client.chat(
+                            model=model,
+                            messages=messages,
+                            options=options,
+                            keep_alive=self.keep_alive,
+                            stream=True,
+                        )
+                        
+                        async for chunk in stream:
+                            content = chunk.get('message', {}).get('content', '')
+                            if content:
+                                if not parts:
+                                    metrics.LLM_TTFT_SECONDS.observe(time.perf_counter() - started, model=model)
+                                parts.append(content)
+                                yield content
+                            if chunk.get('done'):
+                                metrics.observe_generation(chunk)
+                    outcome = "ok"
+                    logger.info(f"Successfully generated AI medical response with {model} on {backend.host}")
+                    completed = True
+                    
+                except Exception as e:
+                    outcome = "error"
+                    logger.error(f"Error generating AI response on {backend.host}: {e}")
+                    if parts:
+                        raise GenerationInterrupted() from e
+                finally:
+                    metrics.LLM_SECONDS.observe(time.perf_counter() - started, model=model, outcome=outcome)
+        
+        if completed and cache_key and parts:
+            self.cache.set(cache_key, "".join(parts).strip())
+
+# Global instance
+llama_service = LlamaService(
+    config.LLM_MODEL,
+    cache=ResponseCache(
+        max_entries=config.RESPONSE_CACHE_SIZE,
+        ttl_seconds=config.RESPONSE_CACHE_TTL,
+        persist_path=config.RESPONSE_CACHE_PATH,
+    ),
+    cache_emergency=config.CACHE_EMERGENCY_RESPONSES,
+    hosts=config.OLLAMA_HOSTS,
+    keep_alive=config.OLLAMA_KEEP_ALIVE,
+    num_ctx=config.OLLAMA_NUM_CTX,
+    knowledge=knowledge_base,
+    knowledge_top_k=config.KNOWLEDGE_TOP_K,
+    answers=answer_store,
+    router=ModelRouter(
+        config.LLM_MODEL,
+        config.LLM_SMALL_MODEL,
+        small_routes=config.LLM_SMALL_ROUTES,
+        complex_words=config.LLM_COMPLEX_QUERY_WORDS,
+        downgrade_depth=config.LLM_DOWNGRADE_QUEUE_DEPTH,
+        protected_routes=config.LLM_PROTECTED_ROUTES,
+    ),
+    scheduler=PriorityScheduler(
+        max_in_flight=config.LLM_MAX_IN_FLIGHT,
+        max_waiting=config.LLM_MAX_WAITING,
+        max_wait_seconds=config.LLM_MAX_WAIT_SECONDS,
+        weights=config.PRIORITY_WEIGHTS,
+        emergency_reserve=config.PRIORITY_EMERGENCY_RESERVE,
+        aging_seconds=config.PRIORITY_AGING_SECONDS,
+        shed_depth=config.PRIORITY_SHED_DEPTH,
+    ) if config.LLM_MAX_IN_FLIGHT else None,
+)
@@ -0,0 +1,261 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are plain dicts behind a lock, so recording one
+sample costs a dict lookup and a few additions. Components that already
+keep their own counters (response cache, single-flight, limiter, backend
+pool) are exported through collectors that read their stats() only when
+/metrics is scraped.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; spans an in-memory lookup up to a slow CPU-only generation
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+RATE_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 200)
+
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the with-block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, [list(s[0]), s[1], s[2]]) for key, s in self._series.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                bucket_labels = dict(labels, le=_format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Registry:
+    """Holds metrics and collectors and renders them for a scrape"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]):
+        """
+        Add a callable run on every scrape.
+
+        It yields (name, type, help, samples) where type is "gauge" or
+        "counter" and samples is a list of (labels, value).
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "chatbot_http_requests_total", "HTTP requests by route and status code", ["route", "status"]
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "chatbot_http_request_duration_seconds", "Time until the response headers were ready", ["route"]
+)
+HTTP_RESPONSE_BYTES = REGISTRY.counter(
+    "chatbot_http_response_bytes_total", "Response body bytes sent by route and content encoding", ["route", "encoding"]
+)
+QUERIES = REGISTRY.counter(
+    "chatbot_queries_total", "Chat queries by detected query type", ["query_type"]
+)
+FALLBACKS = REGISTRY.counter(
+    "chatbot_fallbacks_total", "Chat queries answered from static fallbacks instead of the LLM", ["query_type"]
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "chatbot_stage_duration_seconds",
+    "Time spent per request stage (intent_detection, answer_lookup, retrieval, prompt_build, fallback_render)",
+    ["stage"],
+)
+BATCH_ITEMS = REGISTRY.counter(
+    "chatbot_batch_items_total", "Batch API items by outcome (answered, duplicate, invalid, error)", ["outcome"]
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "chatbot_llm_duration_seconds", "Ollama chat call duration by model and outcome (ok, error, cancelled)",
+    ["model", "outcome"],
+)
+LLM_TTFT_SECONDS = REGISTRY.histogram(
+    "chatbot_llm_time_to_first_token_seconds", "Time from sending a chat call to its first token by model", ["model"]
+)
+LLM_ROUTED = REGISTRY.counter(
+    "chatbot_llm_routed_total", "LLM requests by route, chosen model and routing reason (see model_router.py)",
+    ["route", "model", "reason"],
+)
+LLM_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "chatbot_llm_queue_wait_seconds",
+    "Time LLM requests waited for a generation slot by priority class (emergency, symptom, general)",
+    ["priority"],
+)
+LLM_QUEUE_REJECTED = REGISTRY.counter(
+    "chatbot_llm_queue_rejected_total",
+    "LLM requests given no generation slot by priority class and reason (full, shed, displaced, timeout)",
+    ["priority", "reason"],
+)
+DEADLINES_EXCEEDED = REGISTRY.counter(
+    "chatbot_llm_deadline_exceeded_total", "Queries whose LLM time budget ran out", ["query_type", "partial"]
+)
+LLM_TOKENS_PER_SECOND = REGISTRY.histogram(
+    "chatbot_llm_tokens_per_second", "Generation speed reported by Ollama (eval_count / eval_duration)",
+    buckets=RATE_BUCKETS,
+)
+LLM_TOKENS = REGISTRY.counter(
+    "chatbot_llm_tokens_total", "Tokens processed by Ollama by model (prompt = evaluated prompt tokens)",
+    ["model", "kind"],
+)
+
+
+def observe_generation(response: Optional[Dict[str, Any]]):
+    """Record Ollama's eval counters from a final (done) response or chunk"""
+    if not response:
+        return
+    prompt_tokens = response.get("prompt_eval_count") or 0
+    eval_count = response.get("eval_count") or 0
+    eval_duration = response.get("eval_duration") or 0
+    model = response.get("model") or "unknown"
+    LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+    LLM_TOKENS.inc(eval_count, model=model, kind="completion")
+    if eval_count and eval_duration:
+        LLM_TOKENS_PER_SECOND.observe(eval_count / (eval_duration / 1e9))
+
+
+def stats_collector(prefix: str, documentation: str, stats: Callable[[], Dict[str, Any]],
+                    counters: Iterable[str] = ()) -> Callable:
+    """
+    Export the numeric fields of a component's stats() dict as metrics
+    named prefix_field; fields listed in counters are typed as counters.
+    """
+    counters = set(counters)
+
+    def collect():
+        for field, value in stats().items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            kind = "counter" if field in counters else "gauge"
+            name = f"{prefix}_{field}" + ("_total" if kind == "counter" else "")
+            yield name, kind, f"{documentation}: {field}", [({}, value)]
+
+    return collect
@@ -0,0 +1,58 @@
+import re
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+_WORD_RE = re.compile(r"\w+")
+
+# Route (query type) of each LlamaService method; get_medical_response is
+# "vaccination" when its context says so, else "general"
+METHOD_ROUTES = {
+    "get_medical_response": "general",
+    "get_disease_info": "disease",
+    "analyze_symptoms": "symptom",
+    "get_prevention_tips": "prevention",
+    "get_emergency_guidance": "emergency",
+}
+
+
+def route_for(method: str, context: Optional[Dict[str, Any]] = None) -> str:
+    if context and context.get("topic") == "vaccination":
+        return "vaccination"
+    return METHOD_ROUTES.get(method, "general")
+
+
+class ModelRouter:
+    """
+    Picks the model for each LLM request from its route and the current load.
+
+    Routes listed in small_routes go to small_model unless the question is
+    complex: at least complex_words words long, or a follow-up in a
+    conversation. Everything else goes to large_model, except that while
+    queue_depth (LLM calls in flight or waiting) is at or above
+    downgrade_depth, every route not in protected_routes is downgraded to
+    small_model so the queue drains faster.
+    """
+
+    def __init__(self, large_model: str, small_model: Optional[str] = None,
+                 small_routes: Iterable[str] = ("prevention", "vaccination"),
+                 complex_words: int = 25, downgrade_depth: int = 0,
+                 protected_routes: Iterable[str] = ("emergency", "symptom")):
+        self.large_model = large_model
+        self.small_model = small_model
+        self.small_routes = set(small_routes)
+        self.complex_words = complex_words
+        self.downgrade_depth = downgrade_depth
+        self.protected_routes = set(protected_routes)
+
+    def choose(self, route: str, query: str, follow_up: bool = False,
+               queue_depth: int = 0) -> Tuple[str, str]:
+        """Return (model, reason); reason is "default", "route", "complex" or "downgraded" """
+        if not self.small_model:
+            return self.large_model, "default"
+        if route in self.small_routes:
+            if follow_up or len(_WORD_RE.findall(query)) >= self.complex_words:
+                return self.large_model, "complex"
+            return self.small_model, "route"
+        if (self.downgrade_depth and queue_depth >= self.downgrade_depth
+                and route not in self.protected_routes):
+            return self.small_model, "downgraded"
+        return self.large_model, "default"
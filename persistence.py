@@ -0,0 +1,33 @@
+import os
+import sqlite3
+from typing import Optional
+
+
+class SqlitePersisted:
+    """
+    Mixin for in-memory stores optionally persisted to a sqlite file.
+
+    The file is shared by the pre-fork server workers, but a connection
+    must not be: the first use in a forked worker opens one of its own.
+    Call _init_db() from __init__ and get the connection with _connection()
+    while holding the store's lock.
+    """
+
+    def _init_db(self, path: Optional[str]):
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_path = path
+        self._db_pid = os.getpid()
+        self._forked_db = None
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path, check_same_thread=False)
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """The sqlite connection of this process; call with the lock held"""
+        if self._db is not None and self._db_pid != os.getpid():
+            # A pre-fork server worker must not use (or close) the parent's
+            # connection, so keep it referenced and open one of its own
+            self._forked_db = self._db
+            self._db = self._connect()
+            self._db_pid = os.getpid()
+        return self._db
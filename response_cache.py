@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+from persistence import SqlitePersisted
+
+logger = logging.getLogger(__name__)
+
+# Words that do not change the meaning of a health question
+STOPWORDS = {
+    "a", "about", "am", "an", "and", "any", "are", "can", "could", "do", "does",
+    "for", "give", "i", "is", "it", "me", "my", "of", "on", "please", "should",
+    "tell", "the", "there", "to", "what", "whats", "which", "with", "you",
+}
+
+# Words that relate two terms, so that swapping the terms changes the question
+RELATION_WORDS = {
+    "affect", "affected", "caused", "cause", "causing", "lead", "leading", "led",
+    "trigger", "triggered", "triggering", "worsen", "worsened", "worsening",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Reduce a question to a canonical form so rephrasings share a cache entry.
+
+    "What are symptoms of dengue" and "Dengue symptoms?" both become
+    "dengue symptom": lowercase words, stopwords dropped, trailing plural
+    's' removed, sorted and de-duplicated.
+
+    Order only matters around a relation word with terms on both sides:
+    the terms after it are tagged with it, so "can diabetes cause kidney
+    disease" becomes "cause>disease cause>kidney diabete" and "can kidney
+    disease cause diabetes" becomes "cause>diabete disease kidney".
+    """
+    words = []
+    for word in _WORD_RE.findall(query.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    for i, word in enumerate(words):
+        if word in RELATION_WORDS and 0 < i < len(words) - 1:
+            words = words[:i] + [f"{word}>{after}" for after in words[i + 1:]]
+            break
+    return " ".join(sorted(set(words)))
+
+
+class ResponseCache(SqlitePersisted):
+    """Bounded LRU + TTL cache for generated responses, optionally persisted to sqlite"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600,
+                 persist_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._init_db(persist_path)
+        if persist_path:
+            self._open_db(persist_path)
+
+    def _open_db(self, path: str):
+        try:
+            self._db = self._connect()
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, created REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,))
+            self._db.commit()
+            logger.info(f"Response cache persisted to {path}")
+        except sqlite3.Error as e:
+            logger.error(f"Could not open response cache at {path}: {e}")
+            self._db = None
+
+    @staticmethod
+    def make_key(method: str, query: str, model_name: str, options: Dict[str, Any] = None,
+                 knowledge_version: Optional[str] = None) -> str:
+        """
+        Build a cache key from the method, normalized query, model and generation options
+
+        knowledge_version is the version of the knowledge base whose snippets
+        went into the prompt, so answers are not reused across data updates.
+        """
+        parts = [method, normalize_query(query), model_name, options or {}]
+        if knowledge_version:
+            parts.append(knowledge_version)
+        raw = json.dumps(parts, sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._connection() is not None:
+                entry = self._load(key)
+                if entry is not None:
+                    self._entries[key] = entry
+            if entry is not None and now - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str):
+        """Store a response, evicting the least recently used entry when full"""
+        created = time.time()
+        with self._lock:
+            self._entries[key] = (created, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self._connection() is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, created, value) VALUES (?, ?, ?)",
+                        (key, created, value),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Could not persist cached response: {e}")
+
+    def _load(self, key: str) -> Optional[Tuple[float, str]]:
+        try:
+            row = self._db.execute(
+                "SELECT created, value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Could not read cached response: {e}")
+            return None
+        return (row[0], row[1]) if row else None
+
+    def clear(self):
+        """Drop every cached response, including persisted ones"""
+        with self._lock:
+            self._entries.clear()
+            if self._connection() is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,221 @@
+import json
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from persistence import SqlitePersisted
+
+logger = logging.getLogger(__name__)
+
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)"""
+    return len(text) // 4 + 1
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def valid_session_id(session_id: Any) -> bool:
+    return isinstance(session_id, str) and bool(_SESSION_ID_RE.match(session_id))
+
+
+def clip(text: str, max_chars: int) -> str:
+    """The leading sentences of text that fit in max_chars (or a hard cut)"""
+    # Only the head can survive, so skip normalizing the rest of a long answer
+    text = " ".join(text[:max_chars * 2].split())
+    if len(text) <= max_chars:
+        return text
+    clipped = ""
+    for sentence in _SENTENCE_END_RE.split(text):
+        if len(clipped) + len(sentence) + 1 > max_chars:
+            break
+        clipped = f"{clipped} {sentence}" if clipped else sentence
+    return clipped or text[:max_chars].rstrip() + "..."
+
+
+class Session:
+    """One conversation: a rolling summary plus the most recent (question, answer) turns"""
+
+    __slots__ = ("updated", "summary", "turns")
+
+    def __init__(self, updated: float, summary: str = "", turns: Optional[List[Tuple[str, str]]] = None):
+        self.updated = updated
+        self.summary = summary
+        self.turns = turns if turns is not None else []
+
+    def tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(
+            estimate_tokens(question) + estimate_tokens(answer) for question, answer in self.turns
+        )
+
+
+class SessionStore(SqlitePersisted):
+    """
+    Bounded LRU + TTL store of conversation sessions, optionally persisted to sqlite.
+
+    Answers are stored clipped to their first sentences (reply_chars), and
+    the turns kept verbatim are trimmed to history_tokens: the oldest turns
+    are folded into a short extractive summary of the questions asked,
+    itself capped at summary_tokens. The history sent with each prompt is
+    therefore bounded however long the conversation runs.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 1800,
+                 history_tokens: int = 400, summary_tokens: int = 120, reply_chars: int = 300,
+                 persist_path: Optional[str] = None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.reply_chars = reply_chars
+        self.summarized = 0
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._init_db(persist_path)
+        if persist_path:
+            self._open_db(persist_path)
+
+    def _open_db(self, path: str):
+        try:
+            self._db = self._connect()
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(id TEXT PRIMARY KEY, updated REAL NOT NULL, summary TEXT NOT NULL, turns TEXT NOT NULL)"
+            )
+            self._db.execute("DELETE FROM sessions WHERE updated < ?", (time.time() - self.ttl_seconds,))
+            self._db.commit()
+            logger.info(f"Sessions persisted to {path}")
+        except sqlite3.Error as e:
+            logger.error(f"Could not open session store at {path}: {e}")
+            self._db = None
+
+    def _get(self, session_id: str, now: float) -> Optional[Session]:
+        """Live session from memory or sqlite; call with the lock held"""
+        session = self._sessions.get(session_id)
+        if self._connection() is not None:
+            # sqlite is shared by all server workers: another one may have
+            # recorded a newer turn of this conversation
+            stored = self._load(session_id)
+            if stored is not None and (session is None or stored.updated > session.updated):
+                session = self._sessions[session_id] = stored
+        if session is None:
+            return None
+        if now - session.updated >= self.ttl_seconds:
+            self._sessions.pop(session_id, None)
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def history(self, session_id: Optional[str]) -> List[Dict[str, str]]:
+        """Chat messages to send before the next question: the summary, then recent turns"""
+        if not session_id:
+            return []
+        with self._lock:
+            session = self._get(session_id, time.time())
+            if session is None:
+                return []
+            summary, turns = session.summary, list(session.turns)
+
+        messages = []
+        if summary:
+            messages.append({"role": "system", "content": f"Earlier in this conversation the user asked: {summary}"})
+        for question, answer in turns:
+            messages.append({"role": "user", "content": question})
+            messages.append({"role": "assistant", "content": answer})
+        return messages
+
+    def append(self, session_id: str, question: str, answer: str):
+        """Record one turn, trimming the session back under its token budget"""
+        now = time.time()
+        with self._lock:
+            session = self._get(session_id, now)
+            if session is None:
+                session = self._sessions[session_id] = Session(now)
+            session.updated = now
+            session.turns.append((clip(question, self.reply_chars), clip(answer, self.reply_chars)))
+            self._trim(session)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            if self._connection() is not None:
+                self._save(session_id, session)
+
+    def _trim(self, session: Session):
+        # The newest turn always stays, even if it alone exceeds the budget
+        while len(session.turns) > 1 and session.tokens() > self.history_tokens:
+            question, _ = session.turns.pop(0)
+            session.summary = self._summarize(session.summary, question)
+            self.summarized += 1
+
+    def _summarize(self, summary: str, question: str) -> str:
+        """Append an old question to the summary, dropping its oldest entries past summary_tokens"""
+        entries = [entry for entry in summary.split("; ") if entry] + [clip(question, 100)]
+        while len(entries) > 1 and estimate_tokens("; ".join(entries)) > self.summary_tokens:
+            entries.pop(0)
+        return "; ".join(entries)
+
+    def _load(self, session_id: str) -> Optional[Session]:
+        try:
+            row = self._db.execute(
+                "SELECT updated, summary, turns FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Session store read failed: {e}")
+            return None
+        if row is None:
+            return None
+        return Session(row[0], row[1], [tuple(turn) for turn in json.loads(row[2])])
+
+    def _save(self, session_id: str, session: Session):
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (id, updated, summary, turns) VALUES (?, ?, ?, ?)",
+                (session_id, session.updated, session.summary, json.dumps(session.turns)),
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Session store write failed: {e}")
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the in-memory sessions"""
+        with self._lock:
+            items = list(self._sessions.items())
+        total = sys.getsizeof(self._sessions)
+        for session_id, session in items:
+            total += sys.getsizeof(session_id) + sys.getsizeof(session) + sys.getsizeof(session.summary)
+            total += sys.getsizeof(session.turns)
+            for turn in session.turns:
+                total += sys.getsizeof(turn) + sum(sys.getsizeof(text) for text in turn)
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        sessions = len(self._sessions)
+        memory = self.memory_bytes()
+        return {
+            "sessions": sessions,
+            "max_sessions": self.max_sessions,
+            "summarized": self.summarized,
+            "memory_bytes": memory,
+            "bytes_per_1000_sessions": round(memory / sessions * 1000) if sessions else 0,
+        }
+
+
+# Global instance
+session_store = SessionStore(
+    max_sessions=config.SESSION_MAX,
+    ttl_seconds=config.SESSION_TTL,
+    history_tokens=config.SESSION_HISTORY_TOKENS,
+    summary_tokens=config.SESSION_SUMMARY_TOKENS,
+    persist_path=config.SESSION_PATH,
+)
@@ -0,0 +1,211 @@
+import asyncio
+import copy
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from concurrency import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One in-flight generation shared by every caller with the same key"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.readers = 0
+        self.cond = None  # notified as stream chunks arrive
+        self.task = None  # the asyncio producer; the event loop only keeps a weak reference
+
+
+def _reader_error(error: BaseException) -> BaseException:
+    """A copy of a shared generation's error for one reader, so readers never raise (or change) the same object"""
+    try:
+        return copy.copy(error)
+    except Exception:
+        # The exception's constructor does not take its own args
+        return RuntimeError(str(error))
+
+
+class _Stats:
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+        self._streams: Dict[str, _Flight] = {}
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.leaders + self.followers
+        return {
+            "generations": self.leaders,
+            "coalesced": self.followers,
+            # Share of requests that piggy-backed on someone else's generation
+            "coalescing_ratio": self.followers / requests if requests else 0.0,
+            "in_flight": self.in_flight(),
+        }
+
+    def in_flight(self) -> int:
+        return len(self._streams)
+
+
+class SingleFlight(_Stats):
+    """
+    Coalesces identical concurrent LLM calls (thread version).
+
+    stream() runs a chunk generator once per key on a producer thread and
+    fans the chunks out to every reader, including late joiners, who first
+    replay what was already produced. A reader with a deadline
+    (a time.monotonic() value) raises DeadlineExceeded once it passes and
+    leaves; when every reader has gone away the producer stops and closes
+    the upstream generator. An error raised by the generator (e.g.
+    GenerationInterrupted) is raised in every reader, as a copy of its own,
+    after the chunks produced before it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+
+    def stream(self, key: str, fn: Callable[[], Iterator[str]],
+               deadline: Optional[float] = None) -> Iterator[str]:
+        with self._lock:
+            flight = self._streams.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._streams[key] = _Flight()
+                flight.cond = threading.Condition()
+                self.leaders += 1
+            else:
+                self.followers += 1
+            flight.readers += 1
+
+        if leader:
+            threading.Thread(target=self._produce, args=(key, flight, fn), daemon=True).start()
+        return self._read(flight, deadline)
+
+    def _produce(self, key: str, flight: _Flight, fn: Callable[[], Iterator[str]]):
+        chunks = fn()
+        try:
+            for chunk in chunks:
+                with flight.cond:
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+                with self._lock:
+                    if flight.readers == 0:
+                        # Under the same lock as stream(), so nobody joins a generation that is stopping
+                        del self._streams[key]
+                        logger.info("All readers disconnected, stopping shared generation")
+                        break
+        except Exception as e:
+            flight.error = e
+        finally:
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+            with self._lock:
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    def _read(self, flight: _Flight, deadline: Optional[float] = None) -> Iterator[str]:
+        index = 0
+        try:
+            while True:
+                with flight.cond:
+                    while index >= len(flight.chunks) and not flight.done:
+                        timeout = None if deadline is None else deadline - time.monotonic()
+                        if timeout is not None and timeout <= 0:
+                            raise DeadlineExceeded()
+                        flight.cond.wait(timeout)
+                    pending = flight.chunks[index:]
+                    done = flight.done
+                yield from pending
+                index += len(pending)
+                if done:
+                    if flight.error is not None:
+                        raise _reader_error(flight.error) from flight.error
+                    return
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise DeadlineExceeded()
+        finally:
+            with self._lock:
+                flight.readers -= 1
+
+
+class AsyncSingleFlight(_Stats):
+    """
+    asyncio version of SingleFlight for AsyncLlamaService.
+
+    Errors raised by the shared generation (e.g. OverloadedError) are
+    re-raised in every reader.
+    """
+
+    def stream(self, key: str, fn: Callable[[], AsyncIterator[str]],
+               deadline: Optional[float] = None) -> AsyncIterator[str]:
+        flight = self._streams.get(key)
+        if flight is not None:
+            self.followers += 1
+        else:
+            self.leaders += 1
+            flight = self._streams[key] = _Flight()
+            flight.cond = asyncio.Condition()
+            flight.task = asyncio.ensure_future(self._produce(key, flight, fn))
+        flight.readers += 1
+        return self._read(flight, deadline)
+
+    async def _produce(self, key: str, flight: _Flight, fn: Callable[[], AsyncIterator[str]]):
+        chunks = fn()
+        try:
+            async for chunk in chunks:
+                async with flight.cond:
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+                if flight.readers == 0:
+                    # Before the next await, so nobody joins a generation that is stopping
+                    del self._streams[key]
+                    logger.info("All readers disconnected, stopping shared generation")
+                    break
+        except Exception as e:
+            flight.error = e
+        finally:
+            await chunks.aclose()
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            async with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+            flight.task = None
+
+    async def _read(self, flight: _Flight, deadline: Optional[float] = None) -> AsyncIterator[str]:
+        index = 0
+
+        def ready():
+            return index < len(flight.chunks) or flight.done
+
+        try:
+            while True:
+                async with flight.cond:
+                    if not ready():
+                        timeout = None if deadline is None else deadline - time.monotonic()
+                        try:
+                            await asyncio.wait_for(flight.cond.wait_for(ready), timeout)
+                        except asyncio.TimeoutError:
+                            raise DeadlineExceeded() from None
+                    pending = flight.chunks[index:]
+                    done = flight.done
+                for chunk in pending:
+                    yield chunk
+                index += len(pending)
+                if done:
+                    if flight.error is not None:
+                        raise _reader_error(flight.error) from flight.error
+                    return
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise DeadlineExceeded()
+        finally:
+            flight.readers -= 1
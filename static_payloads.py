@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from compression import ENCODINGS, compress, negotiate
+
+logger = logging.getLogger(__name__)
+
+
+class StaticPayload:
+    """
+    A JSON document serialized and compressed once, served with a strong ETag.
+
+    Every representation (identity, gzip, br) gets its own ETag derived
+    from a hash of the JSON, so it changes exactly when the data does.
+    """
+
+    def __init__(self, data: Any, max_age: int = 60):
+        self.data = data
+        self.max_age = max_age
+        body = (json.dumps(data, sort_keys=True, separators=(",", ":")) + "\n").encode("utf-8")
+        self.version = hashlib.sha256(body).hexdigest()[:20]
+        self.bodies: Dict[Optional[str], bytes] = {None: body}
+        for encoding in ENCODINGS:
+            compressed = compress(body, encoding)
+            if len(compressed) < len(body):
+                self.bodies[encoding] = compressed
+        self.etags = {
+            encoding: f'"{self.version}-{encoding}"' if encoding else f'"{self.version}"'
+            for encoding in self.bodies
+        }
+        # Response headers per representation, and the representation chosen
+        # per Accept-Encoding value seen (clients send only a handful of them)
+        self._headers = {encoding: self._build_headers(encoding) for encoding in self.bodies}
+        self._negotiated: Dict[Optional[str], Optional[str]] = {}
+
+    def _build_headers(self, encoding: Optional[str]) -> List[Tuple[str, str]]:
+        headers = [
+            ("Content-Type", "application/json"),
+            ("ETag", self.etags[encoding]),
+            ("Cache-Control", f"public, max-age={self.max_age}"),
+            ("Vary", "Accept-Encoding"),
+        ]
+        if encoding:
+            headers.append(("Content-Encoding", encoding))
+        return headers
+
+    def not_modified(self, if_none_match: Optional[str]) -> bool:
+        """True if If-None-Match names any representation of this version"""
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            # If-None-Match uses the weak comparison
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag in self.etags.values():
+                return True
+        return False
+
+    def encoding_for(self, accept_encoding: Optional[str]) -> Optional[str]:
+        try:
+            return self._negotiated[accept_encoding]
+        except KeyError:
+            encoding = negotiate(accept_encoding, [e for e in ENCODINGS if e in self.bodies])
+            if len(self._negotiated) >= 256:
+                self._negotiated.clear()
+            self._negotiated[accept_encoding] = encoding
+            return encoding
+
+    def respond(self, if_none_match: Optional[str] = None,
+                accept_encoding: Optional[str] = None) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        """(status, headers, body) for a GET with these request headers"""
+        encoding = self.encoding_for(accept_encoding)
+        headers = self._headers[encoding]
+        if self.not_modified(if_none_match):
+            # A 304 describes the representation but carries no body or Content-Encoding
+            return 304, headers[:4], b""
+        return 200, headers, self.bodies[encoding]
+
+    def stats(self) -> Dict[str, Any]:
+        return {f"{encoding or 'identity'}_bytes": len(body) for encoding, body in self.bodies.items()}
+
+
+class JSONFilePayload:
+    """
+    StaticPayload of a JSON file, rebuilt when the file changes.
+
+    The file's modification time and size are checked on use, at most
+    every check_interval seconds, so edits go live without a restart. A
+    file that cannot be read or parsed keeps the previous payload.
+    """
+
+    def __init__(self, path: str, max_age: int = 60, check_interval: float = 5.0, default: Any = None):
+        self.path = path
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self.default = [] if default is None else default
+        self.reloads = 0
+        self._payload = StaticPayload(self.default, max_age)
+        self._signature = None
+        self._checked = None
+        self._lock = threading.Lock()
+        self.current()
+
+    def current(self) -> StaticPayload:
+        """The payload for the file as of at most check_interval seconds ago"""
+        now = time.monotonic()
+        if self._checked is None or now - self._checked >= self.check_interval:
+            with self._lock:
+                if self._checked is None or now - self._checked >= self.check_interval:
+                    self._checked = now
+                    self._refresh()
+        return self._payload
+
+    def _refresh(self):
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        if signature == self._signature:
+            return
+        self._signature = signature
+
+        if signature is None:
+            logger.warning(f"{self.path} not found; serving {self.default!r}")
+            data = self.default
+        else:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not load {self.path}, keeping the previous version: {e}")
+                return
+        self._payload = StaticPayload(data, self.max_age)
+        self.reloads += 1
+        logger.info(f"Loaded {self.path} (version {self._payload.version})")
+
+    def respond(self, if_none_match: Optional[str] = None,
+                accept_encoding: Optional[str] = None) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        return self.current().respond(if_none_match, accept_encoding)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"reloads": self.reloads, **self.current().stats()}
@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+import asgi
+from app import PARTIAL_ANSWER_NOTE
+from sessions import new_session_id
+
+MESSAGE = "I have a fever and a headache"
+
+
+def stream_with(monkeypatch, chunks):
+    """Run answer_stream with ask_llama streaming chunks (an exception is raised where it appears)"""
+    async def fake_ask_llama(*args, **kwargs):
+        for chunk in chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    monkeypatch.setattr(asgi, "ask_llama", fake_ask_llama)
+    events = []
+
+    async def send(event):
+        events.append(event)
+
+    asyncio.run(asgi.answer_stream(send, MESSAGE, new_session_id()))
+    body = b"".join(event.get("body", b"") for event in events if event["type"] == "http.response.body")
+    return events[0]["status"], [json.loads(line) for line in body.decode().splitlines()]
+
+
+def test_error_before_the_first_chunk_falls_back_to_the_static_answer(monkeypatch):
+    status, lines = stream_with(monkeypatch, [ConnectionResetError("connection reset")])
+    assert status == 200
+    assert lines[0]["token"] == asgi.static_response("symptom", MESSAGE)
+    assert lines[-1]["done"] is True
+
+
+def test_error_mid_stream_keeps_the_partial_answer(monkeypatch):
+    status, lines = stream_with(monkeypatch, ["Rest and ", "drink fluids", ValueError("bad JSON")])
+    assert status == 200
+    assert [line.get("token") for line in lines[:-1]] == ["Rest and ", "drink fluids", PARTIAL_ANSWER_NOTE]
+    assert lines[-1]["done"] is True
@@ -0,0 +1,12 @@
+from response_cache import ResponseCache, normalize_query
+
+
+def test_rephrasings_share_a_key():
+    assert normalize_query("What are symptoms of dengue") == normalize_query("Dengue symptoms?")
+    assert ResponseCache.make_key("get_medical_response", "What are symptoms of dengue", "m") == \
+        ResponseCache.make_key("get_medical_response", "Dengue symptoms?", "m")
+
+
+def test_swapped_relation_terms_do_not_share_a_key():
+    assert normalize_query("can diabetes cause kidney disease") != normalize_query("can kidney disease cause diabetes")
+    assert normalize_query("can diabetes cause kidney disease") == normalize_query("Can diabetes causes kidney diseases?")
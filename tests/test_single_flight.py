@@ -0,0 +1,31 @@
+import threading
+import time
+
+from concurrency import GenerationInterrupted
+from single_flight import SingleFlight
+
+
+def test_each_reader_gets_its_own_error():
+    def generate():
+        yield "partial"
+        time.sleep(0.1)
+        raise GenerationInterrupted()
+
+    flight = SingleFlight()
+    errors = []
+
+    def read():
+        try:
+            list(flight.stream("key", generate))
+        except GenerationInterrupted as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+
+    assert flight.stats()["generations"] == 1
+    assert len(errors) == 3
+    assert len({id(error) for error in errors}) == 3